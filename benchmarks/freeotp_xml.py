@@ -0,0 +1,117 @@
+"""Benchmark peak memory of FreeOTP XML parsing: whole tree vs iterparse.
+
+Writes a synthetic FreeOTP backup with the requested number of tokens and
+parses it in a fresh interpreter per approach, so each peak RSS figure
+covers that parser alone:
+
+    python benchmarks/freeotp_xml.py --tokens 500000 --json freeotp.json
+
+"tree" is the previous parser (read_text, ET.fromstring, findall);
+"iterparse" is cli.importers.iter_freeotp_xml.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+SECRET = "JBSWY3DPEHPK3PXP"
+
+# Each snippet parses sys.argv[1] and prints its result as JSON.
+PARSERS = {
+    "tree": """
+import json, resource, sys, time
+from pathlib import Path
+from xml.etree import ElementTree as ET
+start = time.perf_counter()
+root = ET.fromstring(Path(sys.argv[1]).read_text())
+first = None
+count = 0
+for token in root.findall(".//token"):
+    if token.findtext("secret", ""):
+        count += 1
+        if first is None:
+            first = time.perf_counter() - start
+""",
+    "iterparse": """
+import json, resource, sys, time
+from desktop_2fa.cli.importers import iter_freeotp_xml
+start = time.perf_counter()
+first = None
+count = 0
+for entry in iter_freeotp_xml(sys.argv[1]):
+    count += 1
+    if first is None:
+        first = time.perf_counter() - start
+""",
+}
+
+REPORT = """
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == "darwin":
+    rss //= 1024
+print(json.dumps({
+    "tokens": count,
+    "seconds": time.perf_counter() - start,
+    "first_token_ms": (first or 0) * 1000,
+    "max_rss_kib": rss,
+}))
+"""
+
+
+def write_backup(path: Path, tokens: int) -> None:
+    with open(path, "w") as f:
+        f.write('<?xml version="1.0"?>\n<tokens>\n')
+        for i in range(tokens):
+            f.write(
+                f"  <token><issuer>issuer{i}</issuer>"
+                f"<label>issuer{i}:account{i}</label>"
+                f"<secret>{SECRET}</secret></token>\n"
+            )
+        f.write("</tokens>\n")
+
+
+def run(parser: str, path: Path) -> dict[str, float]:
+    out = subprocess.run(
+        [sys.executable, "-c", PARSERS[parser] + REPORT, str(path)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    result: dict[str, float] = json.loads(out)
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=200_000)
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "freeotp.xml"
+        write_backup(path, args.tokens)
+        size_mib = path.stat().st_size / 2**20
+        results = {name: run(name, path) for name in PARSERS}
+
+    print(f"{args.tokens:,} tokens, {size_mib:.1f} MiB")
+    for name, r in results.items():
+        print(
+            f"{name:<10} {r['max_rss_kib'] / 1024:>8.1f} MiB peak RSS"
+            f" {r['seconds']:>8.2f} s  first token after {r['first_token_ms']:.1f} ms"
+        )
+
+    if args.json:
+        args.json.write_text(
+            json.dumps(
+                {"tokens": args.tokens, "size_mib": size_mib, "results": results},
+                indent=2,
+            )
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
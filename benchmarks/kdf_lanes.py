@@ -0,0 +1,75 @@
+"""Benchmark Argon2id unlock latency against the number of lanes.
+
+The total work (time_cost x memory_cost) is held at the vault defaults and
+only the lane count varies, which is exactly what default_kdf_params()
+changes between hosts. Run it on each machine class of interest:
+
+    python benchmarks/kdf_lanes.py --lanes 1 2 4 8 16 --json kdf_lanes.json
+
+Lanes beyond the number of available CPUs cannot run concurrently, so on a
+host with N cores the curve flattens after N lanes.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+from pathlib import Path
+
+from desktop_2fa.crypto.argon2 import (
+    DEFAULT_KDF_PARAMS,
+    KdfParams,
+    available_cpus,
+    default_kdf_params,
+    measure_kdf,
+)
+
+
+def bench(lanes: list[int], rounds: int) -> list[dict[str, float]]:
+    results = []
+    for n in lanes:
+        params = KdfParams(
+            time_cost=DEFAULT_KDF_PARAMS.time_cost,
+            memory_cost=DEFAULT_KDF_PARAMS.memory_cost,
+            parallelism=n,
+        )
+        measure_kdf(params)  # warm up the allocator
+        samples = [measure_kdf(params) * 1000 for _ in range(rounds)]
+        results.append(
+            {
+                "lanes": n,
+                "median_ms": statistics.median(samples),
+                "min_ms": min(samples),
+                "max_ms": max(samples),
+            }
+        )
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lanes", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    args = parser.parse_args()
+
+    results = bench(args.lanes, args.rounds)
+    cpus = available_cpus()
+    baseline = results[0]["median_ms"]
+
+    print(f"host CPUs: {cpus}, default lanes: {default_kdf_params().parallelism}")
+    print(f"{'lanes':>5} {'median ms':>10} {'min ms':>8} {'speedup':>8}")
+    for r in results:
+        speedup = baseline / r["median_ms"]
+        print(
+            f"{r['lanes']:>5} {r['median_ms']:>10.1f} {r['min_ms']:>8.1f} "
+            f"{speedup:>7.2f}x"
+        )
+
+    if args.json:
+        args.json.write_text(json.dumps({"cpus": cpus, "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,305 @@
+"""Benchmark CLI command latency and the vault's cryptographic building blocks.
+
+Measures, for every command registered in cli/main.py:
+
+- cold latency: a fresh interpreter running the command (what a user sees),
+- warm latency: the command invoked again in an already-initialised process,
+
+plus Argon2id key derivation, AES-GCM encryption/decryption and JSON and
+binary (de)serialization of vault payloads with 10, 1k and 100k entries. Results
+are written as JSON so runs from different commits can be compared:
+
+    python benchmarks/suite.py --json before.json
+    git checkout other-branch
+    python benchmarks/suite.py --json after.json --compare before.json
+
+Commands run against a throwaway vault under a temporary HOME, never the
+user's own vault.
+"""
+
+import argparse
+import base64
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+PASSWORD = "benchmark-password"
+SECRET = "JBSWY3DPEHPK3PXP"
+PAYLOAD_SIZES = (10, 1_000, 100_000)
+
+# Runs the Typer app in a fresh interpreter; arguments follow on argv.
+CLI_STUB = "from desktop_2fa.cli.main import app; app()"
+
+# Commands that cannot be timed meaningfully in a loop.
+SKIPPED = {"agent start": "forks a long-running daemon"}
+
+
+def cli_cases(work: Path) -> dict[str, list[str]]:
+    """Arguments for one representative invocation of each command."""
+    pw = ["--password", PASSWORD]
+    return {
+        "--version": ["--version"],
+        "--help": ["--help"],
+        "list": [*pw, "list"],
+        "add": [*pw, "add", "NewIssuer", SECRET],
+        "code": [*pw, "code", "issuer0"],
+        "codes": [*pw, "codes"],
+        "remove": [*pw, "remove", "issuer0"],
+        "rename": [*pw, "rename", "issuer0", "renamed"],
+        "export": [*pw, "export", str(work / "export.bin")],
+        "import": [*pw, "import", str(work / "source.bin"), "--force"],
+        "import-from": [*pw, "import-from", "bitwarden", str(work / "export.csv")],
+        "backup": [*pw, "backup"],
+        "init-vault": [*pw, "init-vault", "--force"],
+        "tune-kdf": [
+            *pw,
+            "tune-kdf",
+            "--dry-run",
+            "--target-ms",
+            "50",
+            "--max-memory-mib",
+            "32",
+        ],
+        "compress": [*pw, "compress", "zlib"],
+        "format": [*pw, "format", "segmented"],
+        "agent status": ["agent", "status", "--socket", str(work / "none.sock")],
+        "agent lock": ["agent", "lock", "--socket", str(work / "none.sock")],
+        "agent stop": ["agent", "stop", "--socket", str(work / "none.sock")],
+    }
+
+
+def registered_commands() -> set[str]:
+    """Names of the commands cli/main.py exposes, including agent ones."""
+    from desktop_2fa.cli.main import agent_app, app
+
+    names = {c.name or "" for c in app.registered_commands}
+    names |= {f"agent {c.name}" for c in agent_app.registered_commands}
+    return names
+
+
+def make_home(root: Path, entries: int) -> Path:
+    """Create a HOME directory holding a vault with the given entries."""
+    from desktop_2fa.vault import Vault
+
+    home = root / "home"
+    vault = Vault()
+    for i in range(entries):
+        vault.add_entry(f"issuer{i}", SECRET, f"account{i}")
+    vault.save(home / ".desktop-2fa" / "vault", PASSWORD)
+    vault.save(root / "source.bin", PASSWORD)
+    rows = "".join(f"imported{i},{SECRET}\n" for i in range(entries))
+    (root / "export.csv").write_text("name,totp\n" + rows)
+    return home
+
+
+def timed(fn: Callable[[], Any], rounds: int) -> dict[str, float]:
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": statistics.median(samples), "min_ms": min(samples)}
+
+
+def bench_cli(rounds: int, entries: int) -> dict[str, dict[str, float]]:
+    from typer.testing import CliRunner
+
+    from desktop_2fa.cli.main import app
+
+    runner = CliRunner()
+    results: dict[str, dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        work = Path(tmp)
+        pristine = make_home(work / "pristine", entries)
+        cases = cli_cases(work / "pristine")
+        for name in sorted(registered_commands() - set(cases) - set(SKIPPED)):
+            print(f"warning: no benchmark case for command {name!r}", file=sys.stderr)
+
+        home = work / "home"
+        env = {**os.environ, "HOME": str(home)}
+        env.pop("DESKTOP_2FA_AGENT_SOCK", None)
+        old_env = dict(os.environ)
+
+        def fresh_home() -> None:
+            shutil.rmtree(home, ignore_errors=True)
+            shutil.copytree(pristine, home)
+
+        def cold(args: list[str]) -> float:
+            fresh_home()
+            start = time.perf_counter()
+            subprocess.run(
+                [sys.executable, "-c", CLI_STUB, *args], env=env, capture_output=True
+            )
+            return (time.perf_counter() - start) * 1000
+
+        def warm(args: list[str]) -> float:
+            fresh_home()
+            start = time.perf_counter()
+            runner.invoke(app, args)
+            return (time.perf_counter() - start) * 1000
+
+        os.environ.clear()
+        os.environ.update(env)
+        try:
+            for name, args in cases.items():
+                warm(args)  # import the command's modules before timing
+                cold_ms = [cold(args) for _ in range(rounds)]
+                warm_ms = [warm(args) for _ in range(rounds)]
+                results[name] = {
+                    "cold_ms": statistics.median(cold_ms),
+                    "warm_ms": statistics.median(warm_ms),
+                }
+                print(
+                    f"{name:<14} cold {results[name]['cold_ms']:>8.1f} ms"
+                    f"   warm {results[name]['warm_ms']:>8.1f} ms"
+                )
+        finally:
+            os.environ.clear()
+            os.environ.update(old_env)
+    return results
+
+
+def bench_kdf(rounds: int) -> dict[str, Any]:
+    from desktop_2fa.crypto.argon2 import default_kdf_params, measure_kdf
+
+    params = default_kdf_params()
+    measure_kdf(params)
+    samples = [measure_kdf(params) * 1000 for _ in range(rounds)]
+    return {
+        "params": {
+            "time_cost": params.time_cost,
+            "memory_cost": params.memory_cost,
+            "parallelism": params.parallelism,
+        },
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+    }
+
+
+def bench_payload(n: int, rounds: int) -> dict[str, Any]:
+    from desktop_2fa.crypto.aesgcm import decrypt, encrypt
+    from desktop_2fa.vault import payload
+    from desktop_2fa.vault.models import TotpEntry, VaultData
+
+    data = VaultData(
+        entries=[
+            TotpEntry(
+                issuer=f"issuer{i}",
+                account_name=f"account{i}@example.com",
+                secret=base64.b32encode(i.to_bytes(10, "big")).decode(),
+            )
+            for i in range(n)
+        ]
+    )
+    key = os.urandom(32)
+    plaintext = data.model_dump_json().encode()
+    ciphertext = encrypt(key, plaintext)
+    binary = payload.encode(data)
+    return {
+        "bytes": len(plaintext),
+        "binary_bytes": len(binary),
+        "json_dump": timed(data.model_dump_json, rounds),
+        "json_load": timed(lambda: VaultData.model_validate_json(plaintext), rounds),
+        "binary_dump": timed(lambda: payload.encode(data), rounds),
+        "binary_load": timed(lambda: payload.decode(binary), rounds),
+        "aesgcm_encrypt": timed(lambda: encrypt(key, plaintext), rounds),
+        "aesgcm_decrypt": timed(lambda: decrypt(key, ciphertext), rounds),
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def flatten(results: dict[str, Any], prefix: str = "") -> dict[str, float]:
+    """Map dotted paths to every *_ms value, for comparing two runs."""
+    flat: dict[str, float] = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{path}."))
+        elif key.endswith("_ms"):
+            flat[path] = value
+    return flat
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any]) -> None:
+    old, new = flatten(baseline["results"]), flatten(current["results"])
+    print(f"\nchange vs {baseline['meta'].get('commit') or 'baseline'}:")
+    for path in sorted(old.keys() & new.keys()):
+        if path.endswith("min_ms") or not old[path]:
+            continue
+        # Ignore sub-millisecond jitter on the tiny payloads.
+        slower = new[path] > old[path] * 1.2 and new[path] - old[path] > 1
+        flag = "  <-- slower" if slower else ""
+        print(f"  {path:<45} {old[path]:>9.2f} -> {new[path]:>9.2f} ms{flag}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument(
+        "--cli-entries", type=int, default=10, help="Entries in the CLI test vault"
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(PAYLOAD_SIZES))
+    parser.add_argument("--skip-cli", action="store_true")
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    parser.add_argument("--compare", type=Path, help="Earlier --json output")
+    args = parser.parse_args()
+
+    results: dict[str, Any] = {}
+    if not args.skip_cli:
+        results["cli"] = bench_cli(args.rounds, args.cli_entries)
+    results["kdf"] = bench_kdf(args.rounds)
+    print(f"{'argon2id':<14} {results['kdf']['median_ms']:>8.1f} ms")
+    results["payload"] = {}
+    for n in args.sizes:
+        r = bench_payload(n, args.rounds)
+        results["payload"][str(n)] = r
+        print(
+            f"{n:>7} entries  dump {r['json_dump']['median_ms']:>8.2f} ms"
+            f"  load {r['json_load']['median_ms']:>8.2f} ms"
+            f"  binary dump {r['binary_dump']['median_ms']:>8.2f} ms"
+            f"  load {r['binary_load']['median_ms']:>8.2f} ms"
+            f"  encrypt {r['aesgcm_encrypt']['median_ms']:>7.2f} ms"
+            f"  decrypt {r['aesgcm_decrypt']['median_ms']:>7.2f} ms"
+        )
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "rounds": args.rounds,
+        },
+        "results": results,
+    }
+    if args.compare:
+        compare(report, json.loads(args.compare.read_text()))
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
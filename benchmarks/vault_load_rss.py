@@ -0,0 +1,149 @@
+"""Benchmark peak memory of Vault.load: read() into bytes vs mmap.
+
+Saves a vault with the requested number of entries and loads it in a fresh
+interpreter per approach, so each peak RSS figure covers that load alone
+("load RSS" excludes the interpreter and imports, measured just before
+loading). The vault is built in a child process too, since Linux carries a
+parent's peak RSS over into its children:
+
+    python benchmarks/vault_load_rss.py --entries 100000 300000
+
+"decrypt RSS" is the growth in peak RSS up to the end of decryption, where
+the file is read and sliced, and "load RSS" the growth over the whole load,
+which for large vaults is dominated by the decoded entries.
+
+"read" swaps the mapping for a plain read() into bytes, as Vault.load did
+before, so slicing out the salt, ciphertext and nonce copies them; "mmap" is
+Vault.load as it is, decrypting straight from a read-only mapping.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+PASSWORD = "benchmark"
+FORMATS = ("binary", "segmented")
+
+# Run with the vault path, entry count and payload format as arguments.
+WRITE = """
+import sys
+from desktop_2fa.crypto.argon2 import KdfParams
+from desktop_2fa.vault.models import TotpEntry, VaultData
+from desktop_2fa.vault.vault import Vault
+
+path, entries, payload_format, password = sys.argv[1:]
+vault = Vault(
+    VaultData(
+        entries=[
+            TotpEntry(
+                issuer=f"issuer{i}",
+                account_name=f"user{i}@example.com",
+                secret="JBSWY3DPEHPK3PXP",
+            )
+            for i in range(int(entries))
+        ]
+    )
+)
+vault.payload_format = payload_format
+vault.rekey(password, kdf_params=KdfParams(time_cost=1, memory_cost=8 * 1024, parallelism=1))
+vault.save(path, password)
+"""
+
+# Each snippet is run with the vault path and password as arguments.
+LOADERS = {
+    "read": """
+from desktop_2fa.vault import vault as vault_module
+vault_module._map = lambda fd, size: open(fd, "rb", closefd=False).read()
+""",
+    "mmap": "",
+}
+
+LOAD = """
+import json, sys, time
+from desktop_2fa.utils.profiling import Profiler, _max_rss_kib
+from desktop_2fa.vault.vault import Vault
+
+profiler = Profiler(trace_memory=False)
+before = _max_rss_kib()
+start = time.perf_counter()
+profiler.start()
+vault = Vault.load(sys.argv[1], sys.argv[2])
+profiler.stop()
+rss = {r.name: r.max_rss_kib for r in profiler.records}
+print(json.dumps({
+    "seconds": time.perf_counter() - start,
+    "decrypt_rss_kib": rss["vault.load/decrypt"] - before,
+    "load_rss_kib": _max_rss_kib() - before,
+}))
+"""
+
+
+def write_vault(path: Path, entries: int, payload_format: str) -> None:
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            WRITE,
+            str(path),
+            str(entries),
+            payload_format,
+            PASSWORD,
+        ],
+        check=True,
+    )
+
+
+def run(loader: str, path: Path) -> dict[str, float]:
+    out = subprocess.run(
+        [sys.executable, "-c", LOADERS[loader] + LOAD, str(path), PASSWORD],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    result: dict[str, float] = json.loads(out)
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, nargs="+", default=[100_000, 300_000])
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default=FORMATS[0],
+        help="Payload format of the vault",
+    )
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    args = parser.parse_args()
+
+    results: dict[str, dict[str, object]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.entries:
+            path = Path(tmp) / f"vault-{n}.bin"
+            write_vault(path, n, args.format)
+            results[str(n)] = {
+                "size_mib": path.stat().st_size / 2**20,
+                **{name: run(name, path) for name in LOADERS},
+            }
+
+    for n, r in results.items():
+        print(f"{int(n):,} entries ({args.format}), {r['size_mib']:.1f} MiB")
+        for name in LOADERS:
+            res = r[name]
+            assert isinstance(res, dict)
+            print(
+                f"  {name:<6} {res['decrypt_rss_kib'] / 1024:>8.1f} MiB decrypt RSS"
+                f" {res['load_rss_kib'] / 1024:>8.1f} MiB load RSS"
+                f" {res['seconds'] * 1000:>8.1f} ms"
+            )
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
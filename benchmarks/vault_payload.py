@@ -0,0 +1,145 @@
+"""Benchmark vault load/save time and file size per payload encoding.
+
+Builds vaults of the requested sizes and saves and loads each with every
+payload encoding and compression codec, using cheap Argon2id parameters so
+the figures cover serialization, compression, encryption and I/O rather
+than key derivation:
+
+    python benchmarks/vault_payload.py --entries 1000 10000 100000
+
+"json" is the version 2 payload (pydantic model_dump_json /
+model_validate_json); "binary" is the version 3 payload in vault/payload.py;
+"binary+zlib" and "binary+zstd" are version 4 (zstd only when the zstd extra
+is installed); "segmented" is version 5 (vault/segments.py), optionally with
+its pages and index compressed. "code" is a load followed by one lookup, as
+in `d2fa code NAME`, "edit" a load, one rename and a save, and "append" the
+same with the rename appended to the journal (Vault.save_changes) instead.
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+from desktop_2fa.crypto.argon2 import KdfParams
+from desktop_2fa.vault import compression
+from desktop_2fa.vault.models import TotpEntry, VaultData
+from desktop_2fa.vault.vault import (
+    PAYLOAD_BINARY,
+    PAYLOAD_JSON,
+    PAYLOAD_SEGMENTED,
+    Vault,
+)
+
+# Variant name -> (payload format, compression codec).
+FORMATS = {
+    PAYLOAD_JSON: (PAYLOAD_JSON, compression.NONE),
+    **{
+        fmt if codec == compression.NONE else f"{fmt}+{codec}": (fmt, codec)
+        for fmt in (PAYLOAD_BINARY, PAYLOAD_SEGMENTED)
+        for codec in compression.available()
+    },
+}
+FAST_KDF = KdfParams(time_cost=1, memory_cost=8 * 1024, parallelism=1)
+PASSWORD = "benchmark"
+
+
+def make_vault(entries: int) -> Vault:
+    vault = Vault(
+        VaultData(
+            entries=[
+                TotpEntry(
+                    issuer=f"issuer{i}",
+                    account_name=f"user{i}@example.com",
+                    secret="JBSWY3DPEHPK3PXP",
+                )
+                for i in range(entries)
+            ]
+        )
+    )
+    vault.rekey(PASSWORD, kdf_params=FAST_KDF)
+    return vault
+
+
+def best_ms(fn: Callable[[], object], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def measure(entries: int, variant: str, tmp: Path, repeat: int) -> dict[str, float]:
+    vault = make_vault(entries)
+    vault.payload_format, vault.compression = FORMATS[variant]
+    path = tmp / f"{variant}-{entries}.bin"
+    save_ms = best_ms(lambda: vault.save(path, PASSWORD), repeat)
+    load_ms = best_ms(lambda: Vault.load(path, PASSWORD), repeat)
+    size = path.stat().st_size
+    name = f"issuer{entries // 2}"
+    code_ms = best_ms(lambda: Vault.load(path, PASSWORD).get_entry(name), repeat)
+
+    def edit() -> None:
+        edited = Vault.load(path, PASSWORD)
+        edited.rename_entry(name, name)
+        edited.save(path, PASSWORD)
+
+    edit_ms = best_ms(edit, repeat)
+
+    def append() -> None:
+        edited = Vault.load(path, PASSWORD)
+        edited.rename_entry(name, name)
+        edited.save_changes(path, PASSWORD)
+
+    append_ms = best_ms(append, repeat)
+    return {
+        "save_ms": save_ms,
+        "load_ms": load_ms,
+        "code_ms": code_ms,
+        "edit_ms": edit_ms,
+        "append_ms": append_ms,
+        "bytes": size,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--entries", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    args = parser.parse_args()
+
+    results: dict[str, dict[str, dict[str, float]]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.entries:
+            results[str(n)] = {
+                fmt: measure(n, fmt, Path(tmp), args.repeat) for fmt in FORMATS
+            }
+
+    print(
+        f"{'entries':>8} {'format':<15} {'save ms':>9} {'load ms':>9}"
+        f" {'code ms':>9} {'edit ms':>9} {'append ms':>10} {'size':>11}"
+        f" {'vs json':>8}"
+    )
+    for n, by_fmt in results.items():
+        json_bytes = by_fmt[PAYLOAD_JSON]["bytes"]
+        for fmt, r in by_fmt.items():
+            print(
+                f"{int(n):>8,} {fmt:<15} {r['save_ms']:>9.1f} {r['load_ms']:>9.1f}"
+                f" {r['code_ms']:>9.1f} {r['edit_ms']:>9.1f} {r['append_ms']:>10.1f}"
+                f" {r['bytes'] / 1024:>7.0f} KiB {r['bytes'] / json_bytes:>8.0%}"
+            )
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
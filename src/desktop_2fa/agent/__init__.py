@@ -0,0 +1,28 @@
+"""Desktop 2FA session key agent package."""
+
+from typing import TYPE_CHECKING, Any
+
+# Seconds an unused key is kept. Defined here so the CLI can show it as an
+# option default without importing the server.
+DEFAULT_IDLE_TIMEOUT = 900
+
+if TYPE_CHECKING:
+    from .client import AgentClient, agent_from_env
+    from .server import AgentServer
+
+_LAZY = {
+    "AgentClient": ".client",
+    "agent_from_env": ".client",
+    "AgentServer": ".server",
+}
+
+__all__ = ["DEFAULT_IDLE_TIMEOUT", "AgentClient", "AgentServer", "agent_from_env"]
+
+
+def __getattr__(name: str) -> Any:
+    """Import the client and server modules on first attribute access."""
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+
+    return getattr(importlib.import_module(_LAZY[name], __name__), name)
@@ -0,0 +1,82 @@
+"""Client side of the session key agent protocol."""
+
+import base64
+import json
+import os
+import socket
+from pathlib import Path
+from typing import Any, Optional
+
+AGENT_SOCK_ENV = "DESKTOP_2FA_AGENT_SOCK"
+CONNECT_TIMEOUT = 2.0
+
+
+class AgentClient:
+    """Talks to a running agent over its Unix socket.
+
+    Every failure to reach the agent is treated as a cache miss, so vault
+    operations silently fall back to deriving keys themselves.
+    """
+
+    def __init__(self, socket_path: str | Path):
+        """Initialize the client.
+
+        Args:
+            socket_path: Filesystem path of the agent socket.
+        """
+        self.socket_path = Path(socket_path)
+
+    def request(self, payload: dict[str, Any]) -> Optional[dict[str, Any]]:
+        """Send one request and return the decoded response.
+
+        Returns:
+            The response object, or None if the agent is unreachable.
+        """
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(CONNECT_TIMEOUT)
+                sock.connect(str(self.socket_path))
+                sock.sendall(json.dumps(payload).encode() + b"\n")
+                with sock.makefile("rb") as f:
+                    line = f.readline()
+            response = json.loads(line)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(response, dict):
+            return None
+        return response
+
+    def get_key(self, key_id: bytes, password: str) -> Optional[bytes]:
+        """Fetch a cached key, or None on a miss."""
+        response = self.request(
+            {
+                "op": "get",
+                "id": base64.b64encode(key_id).decode(),
+                "password": password,
+            }
+        )
+        if not response or not response.get("ok"):
+            return None
+        try:
+            return base64.b64decode(response["key"])
+        except (KeyError, ValueError):
+            return None
+
+    def put_key(self, key_id: bytes, password: str, key: bytes) -> None:
+        """Hand a freshly derived key to the agent."""
+        self.request(
+            {
+                "op": "put",
+                "id": base64.b64encode(key_id).decode(),
+                "password": password,
+                "key": base64.b64encode(key).decode(),
+            }
+        )
+
+
+def agent_from_env() -> Optional[AgentClient]:
+    """Return a client for the agent advertised in the environment, if any."""
+    path = os.getenv(AGENT_SOCK_ENV)
+    if not path or not hasattr(socket, "AF_UNIX"):
+        return None
+    return AgentClient(path)
@@ -0,0 +1,175 @@
+"""In-memory key store used by the session agent."""
+
+import ctypes
+import ctypes.util
+import hashlib
+import hmac
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+
+def _load_libc() -> Optional[ctypes.CDLL]:
+    name = ctypes.util.find_library("c")
+    if name is None:
+        return None
+    try:
+        return ctypes.CDLL(name, use_errno=True)
+    except OSError:
+        return None
+
+
+_libc = _load_libc()
+
+# Wrong passwords tolerated per key before the key is wiped, so a client
+# cannot use the agent as an unthrottled password oracle.
+MAX_FAILURES = 5
+# Keys held at once; the least recently used one is wiped to make room.
+MAX_SLOTS = 16
+
+
+class LockedBuffer:
+    """A bytearray pinned in RAM with mlock(2) and wiped on release.
+
+    Locking is best effort: on platforms without mlock, or when the
+    RLIMIT_MEMLOCK budget is exhausted, the buffer still works but may be
+    swapped out.
+    """
+
+    def __init__(self, data: bytes):
+        """Copy data into a freshly allocated, locked buffer.
+
+        Args:
+            data: The secret bytes to hold.
+        """
+        self._buf = bytearray(data)
+        self.locked = False
+        if _libc is not None and self._buf:
+            n = len(self._buf)
+            addr = ctypes.addressof((ctypes.c_char * n).from_buffer(self._buf))
+            self.locked = _libc.mlock(ctypes.c_void_p(addr), len(self._buf)) == 0
+
+    def value(self) -> bytes:
+        """Return a copy of the held bytes."""
+        return bytes(self._buf)
+
+    def wipe(self) -> None:
+        """Zero the buffer and release the memory lock."""
+        n = len(self._buf)
+        if not n:
+            return
+        addr = ctypes.addressof((ctypes.c_char * n).from_buffer(self._buf))
+        ctypes.memset(addr, 0, n)
+        if self.locked and _libc is not None:
+            _libc.munlock(ctypes.c_void_p(addr), n)
+            self.locked = False
+        self._buf = bytearray()
+
+
+@dataclass
+class _Slot:
+    key: LockedBuffer
+    verifier: bytes
+    last_used: float = field(default=0.0)
+    failures: int = field(default=0)
+
+
+def _verifier(key: bytes, password: str) -> bytes:
+    return hmac.digest(key, password.encode(), hashlib.sha256)
+
+
+class KeyStore:
+    """Thread-safe map of key ids to derived vault keys with idle expiry.
+
+    A key is only handed back to a caller that presents the same password
+    it was stored with, so a running agent never unlocks a vault for a
+    wrong password. After MAX_FAILURES wrong passwords the key is wiped,
+    and at most MAX_SLOTS keys are held at once.
+    """
+
+    def __init__(
+        self,
+        idle_timeout: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize an empty key store.
+
+        Args:
+            idle_timeout: Seconds a key may stay unused before it is wiped.
+            clock: Monotonic time source (injectable for tests).
+        """
+        self.idle_timeout = idle_timeout
+        self._clock = clock
+        self._slots: dict[bytes, _Slot] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._slots)
+
+    def put(self, key_id: bytes, password: str, key: bytes) -> None:
+        """Store a derived key, replacing any previous key for the same id.
+
+        When the store is full the least recently used key is wiped first.
+        """
+        slot = _Slot(LockedBuffer(key), _verifier(key, password), self._clock())
+        with self._lock:
+            evicted: list[_Slot] = []
+            old = self._slots.pop(key_id, None)
+            if old is not None:
+                evicted.append(old)
+            while len(self._slots) >= MAX_SLOTS:
+                lru = min(self._slots, key=lambda k: self._slots[k].last_used)
+                evicted.append(self._slots.pop(lru))
+            self._slots[key_id] = slot
+        for old in evicted:
+            old.key.wipe()
+
+    def get(self, key_id: bytes, password: str) -> Optional[bytes]:
+        """Return the key for key_id if present, unexpired and password matches.
+
+        A wrong password counts against the key, which is wiped once
+        MAX_FAILURES have been presented.
+        """
+        self.expire()
+        with self._lock:
+            slot = self._slots.get(key_id)
+            if slot is None:
+                return None
+            key = slot.key.value()
+            if hmac.compare_digest(slot.verifier, _verifier(key, password)):
+                slot.last_used = self._clock()
+                return key
+            slot.failures += 1
+            if slot.failures < MAX_FAILURES:
+                return None
+            del self._slots[key_id]
+        slot.key.wipe()
+        return None
+
+    def expire(self) -> int:
+        """Wipe keys idle for longer than the timeout.
+
+        Returns:
+            The number of keys removed.
+        """
+        now = self._clock()
+        with self._lock:
+            stale = [
+                k
+                for k, s in self._slots.items()
+                if now - s.last_used >= self.idle_timeout
+            ]
+            slots = [self._slots.pop(k) for k in stale]
+        for slot in slots:
+            slot.key.wipe()
+        return len(slots)
+
+    def clear(self) -> None:
+        """Wipe every stored key."""
+        with self._lock:
+            slots = list(self._slots.values())
+            self._slots.clear()
+        for slot in slots:
+            slot.key.wipe()
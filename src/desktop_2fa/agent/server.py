@@ -0,0 +1,135 @@
+"""Unix-socket server for the session key agent.
+
+The agent speaks a tiny line-oriented JSON protocol: every connection
+sends one request object terminated by a newline and receives one
+response object. Binary values are base64-encoded.
+
+Requests:
+    {"op": "get", "id": ..., "password": ...} -> {"ok": true, "key": ...}
+    {"op": "put", "id": ..., "password": ..., "key": ...} -> {"ok": true}
+    {"op": "lock"} -> {"ok": true}  (wipe all keys)
+    {"op": "status"} -> {"ok": true, "keys": n, "timeout": seconds}
+    {"op": "stop"} -> {"ok": true}  (wipe all keys and exit)
+"""
+
+import base64
+import json
+import os
+import socketserver
+import stat
+import threading
+from pathlib import Path
+from typing import Any
+
+from .keystore import KeyStore
+
+MAX_REQUEST_LEN = 64 * 1024
+
+
+def harden_process() -> None:
+    """Disable core dumps so held keys never end up on disk."""
+    try:
+        import resource
+
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    except (ImportError, OSError, ValueError):
+        pass
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "AgentServer"
+
+    def handle(self) -> None:
+        line = self.rfile.readline(MAX_REQUEST_LEN)
+        try:
+            request = json.loads(line)
+            response = self.server.dispatch(request)
+        except (ValueError, KeyError, TypeError):
+            response = {"ok": False, "error": "bad request"}
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+class AgentServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Agent holding derived vault keys in locked memory."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str | Path, idle_timeout: float):
+        """Bind the agent socket.
+
+        The socket file is created with mode 0600 so only the owning user
+        can talk to the agent. A stale socket left at socket_path is
+        replaced; anything else there is left alone.
+
+        Args:
+            socket_path: Filesystem path of the Unix socket.
+            idle_timeout: Seconds an unused key is kept before being wiped.
+
+        Raises:
+            FileExistsError: If socket_path exists and is not a socket.
+        """
+        self.socket_path = Path(socket_path)
+        self.keys = KeyStore(idle_timeout)
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+        try:
+            st = os.lstat(self.socket_path)
+        except FileNotFoundError:
+            pass
+        else:
+            if not stat.S_ISSOCK(st.st_mode):
+                raise FileExistsError(f"{self.socket_path} exists and is not a socket")
+            self.socket_path.unlink()
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(str(self.socket_path), _Handler)
+        finally:
+            os.umask(old_umask)
+        # Identifies the socket file this server created, so server_close()
+        # never removes a file put in its place since.
+        st = os.lstat(self.socket_path)
+        self._socket_file = (st.st_dev, st.st_ino)
+
+    def dispatch(self, request: dict[str, Any]) -> dict[str, Any]:
+        """Execute a single protocol request."""
+        op = request["op"]
+        if op == "get":
+            key = self.keys.get(base64.b64decode(request["id"]), request["password"])
+            if key is None:
+                return {"ok": False}
+            return {"ok": True, "key": base64.b64encode(key).decode()}
+        if op == "put":
+            self.keys.put(
+                base64.b64decode(request["id"]),
+                request["password"],
+                base64.b64decode(request["key"]),
+            )
+            return {"ok": True}
+        if op == "lock":
+            self.keys.clear()
+            return {"ok": True}
+        if op == "status":
+            return {
+                "ok": True,
+                "keys": len(self.keys),
+                "timeout": self.keys.idle_timeout,
+            }
+        if op == "stop":
+            self.keys.clear()
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {"ok": True}
+        return {"ok": False, "error": f"unknown op: {op}"}
+
+    def service_actions(self) -> None:
+        """Expire idle keys between requests."""
+        self.keys.expire()
+
+    def server_close(self) -> None:
+        """Wipe keys and remove the socket file this server created."""
+        self.keys.clear()
+        super().server_close()
+        try:
+            st = os.lstat(self.socket_path)
+            if (st.st_dev, st.st_ino) == self._socket_file:
+                self.socket_path.unlink()
+        except FileNotFoundError:
+            pass
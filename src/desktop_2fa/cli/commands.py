@@ -2,25 +2,40 @@
 
 from __future__ import annotations
 
+import os
+import signal
+import socket
+import sys
+import time
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import typer
 
 import desktop_2fa.cli.helpers as helpers
-from desktop_2fa.vault import Vault
+from desktop_2fa.agent.client import AGENT_SOCK_ENV, AgentClient
+from desktop_2fa.vault import TotpEntry, Vault
 from desktop_2fa.vault.vault import (
+    PAYLOAD_BINARY,
+    PAYLOAD_JSON,
+    PAYLOAD_SEGMENTED,
     CorruptedVault,
     InvalidPassword,
     UnsupportedFormat,
     VaultIOError,
 )
 
+if TYPE_CHECKING:
+    from desktop_2fa.cli.import_validation import RowError
+
 
 def _path() -> Path:
     return Path(helpers.get_vault_path())
 
 
-def list_entries(ctx: typer.Context) -> None:
+def list_entries(
+    ctx: typer.Context, query: str | None = None, fuzzy: bool = False
+) -> None:
     path = _path()
     interactive = ctx.obj.get("interactive", False)
     if not path.exists():
@@ -53,7 +68,10 @@ def list_entries(ctx: typer.Context) -> None:
             if interactive:
                 helpers.print_error("Failed to access vault file.")
             return
-        if vault.entries:
+        if query is not None:
+            hits = vault.search(query, fuzzy=fuzzy)
+            helpers.print_entries_table([hit.entry for hit in hits])
+        elif vault.entries:
             helpers.print_entries_table(vault.entries)
         else:
             if interactive:
@@ -96,7 +114,7 @@ def add_entry(issuer: str, secret: str, ctx: typer.Context) -> None:
         try:
             vault = Vault.load(path, password)
             vault.add_entry(issuer=issuer, account_name=account_name, secret=secret)
-            vault.save(path, password)
+            vault.save_changes(path, password)
             helpers.print_success(f"Entry added: {issuer}")
         except InvalidPassword:
             helpers.print_error("Invalid vault password.")
@@ -108,7 +126,34 @@ def add_entry(issuer: str, secret: str, ctx: typer.Context) -> None:
             helpers.print_error("Failed to access vault file.")
 
 
-def generate_code(name: str, ctx: typer.Context) -> None:
+def _describe(entry: TotpEntry) -> str:
+    return f"{entry.issuer} ({entry.account_name})"
+
+
+def _find_entry(vault: Vault, name: str) -> TotpEntry:
+    """Resolve a name exactly, falling back to the best search hit.
+
+    The entry a fallback resolved to is named on stderr. If several entries
+    tie for the best score the name is refused and they are listed instead,
+    so an ambiguous name never yields another account's code.
+    """
+    try:
+        return vault.get_entry(name)
+    except ValueError:
+        hits = vault.search(name)
+        if not hits:
+            raise
+    best = [hit.entry for hit in hits if hit.score == hits[0].score]
+    if len(best) > 1:
+        print(f"'{name}' matches several entries equally well:", file=sys.stderr)
+        for entry in best:
+            print(f"  {_describe(entry)}", file=sys.stderr)
+        raise typer.Exit(1)
+    print(f"Using {_describe(best[0])}", file=sys.stderr)
+    return best[0]
+
+
+def generate_code(name: str, ctx: typer.Context, fuzzy: bool = False) -> None:
     path = _path()
     if not path.exists():
         helpers.print_warning("No vault found.")
@@ -117,7 +162,7 @@ def generate_code(name: str, ctx: typer.Context) -> None:
     password = helpers.get_password_for_vault(ctx, new_vault=False)
     try:
         vault = Vault.load(path, password)
-        entry = vault.get_entry(name)
+        entry = _find_entry(vault, name) if fuzzy else vault.get_entry(name)
         from desktop_2fa.totp.generator import generate
 
         code = generate(
@@ -141,6 +186,59 @@ def generate_code(name: str, ctx: typer.Context) -> None:
         helpers.print_error("Failed to access vault file.")
 
 
+CODES_FORMATS = ("table", "json", "ndjson")
+
+
+def generate_codes(patterns: list[str], fmt: str, ctx: typer.Context) -> None:
+    """Print the current code of every entry matching any of the patterns."""
+    if fmt not in CODES_FORMATS:
+        helpers.print_error(
+            f"Unknown format '{fmt}'. Choose from: {', '.join(CODES_FORMATS)}"
+        )
+        raise typer.Exit(1)
+    path = _path()
+    if not path.exists():
+        helpers.print_warning("No vault found.")
+        helpers.print_info("Nothing to generate.")
+        return
+    password = helpers.get_password_for_vault(ctx, new_vault=False)
+    try:
+        vault = Vault.load(path, password)
+    except InvalidPassword:
+        helpers.print_error("Invalid vault password.")
+        return
+    except CorruptedVault:
+        helpers.print_error("Vault file is corrupted.")
+        return
+    except UnsupportedFormat:
+        helpers.print_error("Vault file format is unsupported.")
+        return
+    except VaultIOError:
+        helpers.print_error("Failed to access vault file.")
+        return
+
+    from desktop_2fa.totp.generator import generate
+
+    now = int(time.time())
+    rows = [
+        {
+            "issuer": entry.issuer,
+            "account_name": entry.account_name,
+            "code": generate(
+                secret=entry.secret,
+                timestamp=now,
+                digits=entry.digits,
+                period=entry.period,
+                algorithm=entry.algorithm,
+            ),
+            "remaining": entry.period - now % entry.period,
+        }
+        for entry in vault.entries
+        if helpers.entry_matches(entry, patterns)
+    ]
+    helpers.print_codes(rows, fmt)
+
+
 def remove_entry(name: str, ctx: typer.Context) -> None:
     path = _path()
     if not path.exists():
@@ -150,7 +248,7 @@ def remove_entry(name: str, ctx: typer.Context) -> None:
     try:
         vault = Vault.load(path, password)
         vault.remove_entry(name)
-        vault.save(path, password)
+        vault.save_changes(path, password)
         helpers.print_success(f"Removed entry: {name}")
     except ValueError as e:
         if "not found" in str(e):
@@ -174,10 +272,8 @@ def rename_entry(old: str, new: str, ctx: typer.Context) -> None:
     password = helpers.get_password_for_vault(ctx, new_vault=False)
     try:
         vault = Vault.load(path, password)
-        entry = vault.get_entry(old)
-        entry.account_name = new
-        entry.issuer = new
-        vault.save(path, password)
+        vault.rename_entry(old, new)
+        vault.save_changes(path, password)
         helpers.print_success(f"Renamed '{old}' → '{new}'")
     except ValueError as e:
         if "not found" in str(e):
@@ -201,6 +297,8 @@ def export_vault(export_path: str, ctx: typer.Context) -> None:
     password = helpers.get_password_for_vault(ctx, new_vault=False)
     try:
         vault = Vault.load(path, password)
+        # Copies get their own salt and key rather than the vault's.
+        vault.rekey(password)
         vault.save(Path(export_path), password)
         helpers.print_success(f"Exported vault to: {export_path}")
     except InvalidPassword:
@@ -223,6 +321,7 @@ def import_vault(source: str, force: bool, ctx: typer.Context) -> None:
     password = helpers.get_password_for_vault(ctx, new_vault=False)
     try:
         vault = Vault.load(Path(source), password)
+        vault.rekey(password)
         vault.save(path, password)
         helpers.print_success(f"Vault imported from {source}")
     except VaultIOError:
@@ -235,6 +334,101 @@ def import_vault(source: str, force: bool, ctx: typer.Context) -> None:
         helpers.print_error("Source vault file format is unsupported.")
 
 
+def _read_import(
+    fmt: str, source: str, source_password: str | None
+) -> tuple[list[TotpEntry], list[RowError]]:
+    """Parse and validate an export, returning entries and rejected rows."""
+    from desktop_2fa.cli.import_validation import validate_rows
+    from desktop_2fa.cli.importers import iter_from_format
+
+    return validate_rows(iter_from_format(fmt, source, source_password))
+
+
+# Rejected rows listed individually before the rest are summarized.
+MAX_REPORTED_ERRORS = 10
+
+
+def import_entries(
+    fmt: str, source: str, ctx: typer.Context, source_password: str | None = None
+) -> None:
+    """Import another authenticator's export with one unlock and one save."""
+    from desktop_2fa.cli.importers import SUPPORTED_FORMATS, AegisPasswordRequired
+
+    if fmt.lower() not in SUPPORTED_FORMATS:
+        helpers.print_error(
+            f"Unknown format '{fmt}'. Choose from: {', '.join(SUPPORTED_FORMATS)}"
+        )
+        raise typer.Exit(1)
+
+    start = time.perf_counter()
+    try:
+        try:
+            entries, errors = _read_import(fmt, source, source_password)
+        except AegisPasswordRequired:
+            if not ctx.obj.get("interactive", False):
+                helpers.print_error(
+                    "The export is encrypted. Pass its password with --source-password."
+                )
+                raise typer.Exit(1)
+            source_password = typer.prompt("Export password", hide_input=True)
+            entries, errors = _read_import(fmt, source, source_password)
+    except OSError as e:
+        helpers.print_error(f"Failed to read {source}: {e}")
+        raise typer.Exit(1)
+    except (ValueError, SyntaxError) as e:
+        # json/csv/otpauth errors are ValueErrors, XML ones SyntaxErrors.
+        helpers.print_error(f"Could not parse {fmt} export: {e}")
+        raise typer.Exit(1)
+
+    path = _path()
+    created = not path.exists()
+    if created:
+        helpers.print_warning("No vault found.")
+        helpers.print_info("A new encrypted vault will be created.")
+        password = helpers.get_password_for_vault(ctx, new_vault=True)
+        vault = Vault()
+    else:
+        password = helpers.get_password_for_vault(ctx, new_vault=False)
+        try:
+            vault = Vault.load(path, password)
+        except InvalidPassword:
+            helpers.print_error("Invalid vault password.")
+            return
+        except CorruptedVault:
+            helpers.print_error("Vault file is corrupted.")
+            return
+        except UnsupportedFormat:
+            helpers.print_error("Vault file format is unsupported.")
+            return
+        except VaultIOError:
+            helpers.print_error("Failed to access vault file.")
+            return
+
+    added = vault.add_entries(entries)
+    if added or created:
+        try:
+            vault.save(path, password)
+        except VaultIOError:
+            helpers.print_error("Failed to access vault file.")
+            return
+        if created:
+            helpers.print_success("Vault created.")
+
+    elapsed = time.perf_counter() - start
+    rate = (len(entries) + len(errors)) / elapsed if elapsed > 0 else 0.0
+    helpers.print_success(f"Imported {len(added)} entries from {fmt}.")
+    helpers.print_info(
+        f"Skipped {len(entries) - len(added)} duplicates and {len(errors)} invalid "
+        f"rows ({elapsed:.2f}s, {rate:.0f} rows/s)."
+    )
+    for error in errors[:MAX_REPORTED_ERRORS]:
+        helpers.print_warning(f"Row {error.row}: {error.reason}")
+    if len(errors) > MAX_REPORTED_ERRORS:
+        helpers.print_warning(
+            f"... and {len(errors) - MAX_REPORTED_ERRORS} more invalid rows."
+        )
+
+
 def _get_backup_path(base_path: Path) -> Path:
     """Get the next available backup path with auto-suffixing."""
     backup_path = base_path.with_suffix(".backup.bin")
@@ -257,6 +451,7 @@ def backup_vault(ctx: typer.Context) -> None:
     try:
         vault = Vault.load(path, password)
         backup_path = _get_backup_path(path)
+        vault.rekey(password)
         vault.save(backup_path, password)
         helpers.print_success(f"Backup created: {backup_path}")
     except InvalidPassword:
@@ -284,3 +479,207 @@ def init_vault(force: bool, ctx: typer.Context) -> None:
     vault = Vault()
     vault.save(path, password)
     helpers.print_success("Vault created.")
+
+
+def tune_kdf(
+    target_ms: int, max_memory_mib: int, dry_run: bool, ctx: typer.Context
+) -> None:
+    """Benchmark Argon2id on this host and store tuned parameters in the vault.
+
+    The vault is unlocked before benchmarking, so a missing vault or a wrong
+    password is reported without first spending seconds on the benchmark.
+    """
+    from desktop_2fa.crypto.argon2 import MAX_MEMORY_COST, tune_kdf_params
+
+    if target_ms <= 0:
+        helpers.print_error("Target time must be positive.")
+        raise typer.Exit(1)
+    max_mib = MAX_MEMORY_COST // 1024
+    if not 0 < max_memory_mib <= max_mib:
+        helpers.print_error(f"Memory limit must be between 1 and {max_mib} MiB.")
+        raise typer.Exit(1)
+
+    vault = None
+    if not dry_run:
+        path = _path()
+        if not path.exists():
+            helpers.print_warning("No vault found.")
+            return
+        password = helpers.get_password_for_vault(ctx, new_vault=False)
+        try:
+            vault = Vault.load(path, password)
+        except InvalidPassword:
+            helpers.print_error("Invalid vault password.")
+            return
+        except CorruptedVault:
+            helpers.print_error("Vault file is corrupted.")
+            return
+        except UnsupportedFormat:
+            helpers.print_error("Vault file format is unsupported.")
+            return
+        except VaultIOError:
+            helpers.print_error("Failed to access vault file.")
+            return
+
+    params = tune_kdf_params(target_ms, max_memory_cost=max_memory_mib * 1024)
+    helpers.print_info(
+        f"Tuned KDF: time_cost={params.time_cost}, "
+        f"memory_cost={params.memory_cost // 1024} MiB, "
+        f"parallelism={params.parallelism}"
+    )
+    if vault is None:
+        return
+
+    try:
+        vault.rekey(password, kdf_params=params)
+        vault.save(path, password)
+        helpers.print_success("Vault KDF parameters updated.")
+    except ValueError as e:
+        helpers.print_error(f"Cannot use tuned parameters: {e}")
+        raise typer.Exit(1)
+    except VaultIOError:
+        helpers.print_error("Failed to access vault file.")
+
+
+def set_compression(codec: str, ctx: typer.Context) -> None:
+    """Re-save the vault with its payload compressed by the given codec."""
+    from desktop_2fa.vault import compression
+
+    try:
+        compression.check(codec)
+    except ValueError as e:
+        helpers.print_error(str(e))
+        raise typer.Exit(1)
+
+    path = _path()
+    if not path.exists():
+        helpers.print_warning("No vault found.")
+        return
+    password = helpers.get_password_for_vault(ctx, new_vault=False)
+    try:
+        before = path.stat().st_size
+        vault = Vault.load(path, password)
+        vault.compression = codec
+        vault.save(path, password)
+        after = path.stat().st_size
+        helpers.print_success(
+            f"Vault compression set to {codec} ({before:,} -> {after:,} bytes)."
+        )
+    except InvalidPassword:
+        helpers.print_error("Invalid vault password.")
+    except CorruptedVault:
+        helpers.print_error("Vault file is corrupted.")
+    except UnsupportedFormat:
+        helpers.print_error("Vault file format is unsupported.")
+    except VaultIOError:
+        helpers.print_error("Failed to access vault file.")
+
+
+def set_payload_format(payload_format: str, ctx: typer.Context) -> None:
+    """Re-save the vault with the given payload encoding."""
+    formats = (PAYLOAD_BINARY, PAYLOAD_JSON, PAYLOAD_SEGMENTED)
+    if payload_format not in formats:
+        helpers.print_error(
+            f"Unknown vault format: {payload_format!r} "
+            f"(expected one of {', '.join(formats)})"
+        )
+        raise typer.Exit(1)
+
+    path = _path()
+    if not path.exists():
+        helpers.print_warning("No vault found.")
+        return
+    password = helpers.get_password_for_vault(ctx, new_vault=False)
+    try:
+        vault = Vault.load(path, password)
+        vault.payload_format = payload_format
+        vault.save(path, password)
+        helpers.print_success(f"Vault format set to {payload_format}.")
+    except InvalidPassword:
+        helpers.print_error("Invalid vault password.")
+    except CorruptedVault:
+        helpers.print_error("Vault file is corrupted.")
+    except UnsupportedFormat:
+        helpers.print_error("Vault file format is unsupported.")
+    except VaultIOError:
+        helpers.print_error("Failed to access vault file.")
+
+
+def _agent_path(socket_path: str | None) -> Path:
+    if socket_path:
+        return Path(socket_path)
+    return Path(os.getenv(AGENT_SOCK_ENV) or helpers.get_agent_socket_path())
+
+
+def _exit_on_signal(signum: int, frame: object) -> None:
+    raise SystemExit(0)
+
+
+def agent_start(socket_path: str | None, timeout: int, foreground: bool) -> None:
+    """Start the session key agent and print its environment setup."""
+    if not hasattr(socket, "AF_UNIX") or (not foreground and not hasattr(os, "fork")):
+        helpers.print_error("The session agent requires a Unix-like system.")
+        raise typer.Exit(1)
+
+    from desktop_2fa.agent.server import AgentServer, harden_process
+
+    path = _agent_path(socket_path)
+    if AgentClient(path).request({"op": "status"}) is not None:
+        helpers.print_error(f"An agent is already running at {path}")
+        raise typer.Exit(1)
+
+    try:
+        server = AgentServer(path, timeout)
+    except OSError as e:
+        helpers.print_error(f"Cannot start the agent: {e}")
+        raise typer.Exit(1)
+    print(f"{AGENT_SOCK_ENV}={path}; export {AGENT_SOCK_ENV};")
+    sys.stdout.flush()
+
+    if not foreground:
+        pid = os.fork()
+        if pid:
+            # Parent: keep the socket file, only drop our copy of the listener.
+            server.socket.close()
+            print(f"echo Agent pid {pid};")
+            return
+        os.setsid()
+        devnull = os.open(os.devnull, os.O_RDWR)
+        for fd in (0, 1, 2):
+            os.dup2(devnull, fd)
+
+    harden_process()
+    # Unwind through the finally below on kill, so the socket is removed.
+    signal.signal(signal.SIGTERM, _exit_on_signal)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if not foreground:
+            os._exit(0)
+
+
+def agent_stop(socket_path: str | None) -> None:
+    if AgentClient(_agent_path(socket_path)).request({"op": "stop"}) is None:
+        helpers.print_warning("No agent running.")
+        return
+    helpers.print_success("Agent stopped.")
+
+
+def agent_lock(socket_path: str | None) -> None:
+    if AgentClient(_agent_path(socket_path)).request({"op": "lock"}) is None:
+        helpers.print_warning("No agent running.")
+        return
+    helpers.print_success("Agent keys wiped.")
+
+
+def agent_status(socket_path: str | None) -> None:
+    path = _agent_path(socket_path)
+    response = AgentClient(path).request({"op": "status"})
+    if response is None:
+        helpers.print_warning("No agent running.")
+        return
+    helpers.print_info(
+        f"Agent at {path}: {response['keys']} cached key(s), "
+        f"idle timeout {response['timeout']}s"
+    )
@@ -1,24 +1,40 @@
 """CLI helper functions for Desktop 2FA."""
 
+from __future__ import annotations
+
 import base64
+import fnmatch
+import json
 import time
 import urllib.parse
+from functools import lru_cache
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 import typer
-from rich.console import Console
 
-from desktop_2fa.vault import Vault
+from desktop_2fa.utils.profiling import phase
 
 if TYPE_CHECKING:
+    from rich.console import Console
+
+    from desktop_2fa.vault import Vault
     from desktop_2fa.vault.models import TotpEntry
 
-console = Console()
+
+@lru_cache(maxsize=1)
+def _console() -> Console:
+    """Create the rich console on first use; rich is slow to import."""
+    with phase("output.init"):
+        from rich.console import Console
+
+        return Console()
 
 
 def list_entries(path: Path, password: str) -> None:
     """List all entries in the vault."""
+    from desktop_2fa.vault import Vault
+
     vault = Vault.load(path, password)
     for entry in vault.entries:
         print(f"- {entry.account_name} ({entry.issuer})")
@@ -28,6 +44,8 @@ def add_entry(
     path: Path, issuer: str, account: str, secret: str, password: str
 ) -> None:
     """Add a new entry to the vault."""
+    from desktop_2fa.vault import Vault
+
     vault = Vault.load(path, password)
     vault.add_entry(issuer=issuer, account_name=account, secret=secret)
     vault.save(path, password)
@@ -36,6 +54,8 @@ def add_entry(
 
 def generate_code(path: Path, name: str, password: str) -> None:
     """Generate and print the TOTP code for the given issuer."""
+    from desktop_2fa.vault import Vault
+
     vault = Vault.load(path, password)
     entry = vault.get_entry(name)
 
@@ -53,6 +73,8 @@ def generate_code(path: Path, name: str, password: str) -> None:
 
 def remove_entry(path: Path, name: str, password: str) -> None:
     """Remove an entry from the vault."""
+    from desktop_2fa.vault import Vault
+
     vault = Vault.load(path, password)
     vault.remove_entry(name)
     vault.save(path, password)
@@ -61,17 +83,18 @@ def remove_entry(path: Path, name: str, password: str) -> None:
 
 def rename_entry(path: Path, old: str, new: str, password: str) -> None:
     """Rename an entry."""
-    vault = Vault.load(path, password)
-    entry = vault.get_entry(old)
-    entry.account_name = new
-    entry.issuer = new
+    from desktop_2fa.vault import Vault
 
+    vault = Vault.load(path, password)
+    vault.rename_entry(old, new)
     vault.save(path, password)
     print(f"Renamed '{old}' → '{new}'")
 
 
 def export_vault(path: Path, export_path: Path, password: str) -> None:
     """Export the vault file."""
+    from desktop_2fa.vault import Vault
+
     vault = Vault.load(path, password)
     vault.save(export_path, password)
     print(f"Exported vault to: {export_path}")
@@ -79,6 +102,8 @@ def export_vault(path: Path, export_path: Path, password: str) -> None:
 
 def import_vault(path: Path, import_path: Path, password: str) -> None:
     """Import the vault file."""
+    from desktop_2fa.vault import Vault
+
     vault = Vault.load(import_path, password=password)
     vault.save(path, password)
     print("Vault imported from")
@@ -86,6 +111,8 @@ def import_vault(path: Path, import_path: Path, password: str) -> None:
 
 def backup_vault(path: Path, backup_path: Path, password: str) -> None:
     """Create a backup of the vault file."""
+    from desktop_2fa.vault import Vault
+
     vault = Vault.load(path, password)
     vault.save(backup_path, password)
     print("Backup created:")
@@ -96,8 +123,15 @@ def get_vault_path() -> str:
     return str(Path.home() / ".desktop-2fa" / "vault")
 
 
+def get_agent_socket_path() -> str:
+    """Get the default path for the session agent socket."""
+    return str(Path(get_vault_path()).parent / "agent.sock")
+
+
 def load_vault(path: Path, password: str) -> Vault:
     """Load the vault from the specified path."""
+    from desktop_2fa.vault import Vault
+
     return Vault.load(path, password)
 
 
@@ -162,35 +196,35 @@ def timestamp() -> str:
 # Rich-based output helpers
 def print_success(message: str) -> None:
     """Print a success message in green."""
-    console.print(f"[green]{message}[/green]")
+    _console().print(f"[green]{message}[/green]")
 
 
 def print_warning(message: str) -> None:
     """Print a warning message in yellow."""
-    console.print(f"[yellow]{message}[/yellow]")
+    _console().print(f"[yellow]{message}[/yellow]")
 
 
 def print_error(message: str) -> None:
     """Print an error message in red."""
-    console.print(f"[red]{message}[/red]")
+    _console().print(f"[red]{message}[/red]")
 
 
 def print_info(message: str) -> None:
     """Print an info message in blue."""
-    console.print(f"[blue]{message}[/blue]")
+    _console().print(f"[blue]{message}[/blue]")
 
 
 def print_prompt(message: str) -> None:
     """Print a prompt message in cyan."""
-    console.print(f"[cyan]{message}[/cyan]")
+    _console().print(f"[cyan]{message}[/cyan]")
 
 
 def print_header(message: str) -> None:
     """Print a header message in bold white."""
-    console.print(f"[bold white]{message}[/bold white]")
+    _console().print(f"[bold white]{message}[/bold white]")
 
 
-def print_entries_table(entries: list["TotpEntry"]) -> None:
+def print_entries_table(entries: list[TotpEntry]) -> None:
     """Print entries in a formatted table."""
     if not entries:
         print_info("No entries found.")
@@ -201,6 +235,47 @@ def print_entries_table(entries: list["TotpEntry"]) -> None:
         print(f"- {entry.account_name} ({entry.issuer})")
 
 
+def entry_matches(entry: TotpEntry, patterns: list[str]) -> bool:
+    """Check whether issuer or account name matches any glob pattern.
+
+    Matching is case-insensitive; an empty pattern list matches everything.
+    """
+    if not patterns:
+        return True
+    names = [n.casefold() for n in (entry.issuer, entry.account_name) if n]
+    return any(
+        fnmatch.fnmatchcase(name, pattern.casefold())
+        for pattern in patterns
+        for name in names
+    )
+
+
+def print_codes(rows: list[dict[str, Any]], fmt: str) -> None:
+    """Print generated codes as an aligned table, a JSON array or NDJSON."""
+    if fmt == "json":
+        print(json.dumps(rows, indent=2))
+        return
+    if fmt == "ndjson":
+        for row in rows:
+            print(json.dumps(row))
+        return
+
+    if not rows:
+        print_info("No matching entries.")
+        return
+    labels = [
+        (
+            row["issuer"]
+            if row["issuer"] == row["account_name"] or not row["account_name"]
+            else f"{row['issuer']} ({row['account_name']})"
+        )
+        for row in rows
+    ]
+    width = max(len(label) for label in labels)
+    for label, row in zip(labels, rows):
+        print(f"{label:<{width}}  {row['code']}  {row['remaining']:>2}s")
+
+
 def validate_base32(secret: str) -> bool:
     """Validate if a string is valid Base32."""
     try:
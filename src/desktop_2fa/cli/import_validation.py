@@ -0,0 +1,141 @@
+"""Validation of parsed import rows, spread over a process pool for big imports."""
+
+import os
+import re
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import chain, islice
+from typing import Any, Iterable, Iterator, Optional
+
+from pydantic import ValidationError
+
+from desktop_2fa.vault.models import TotpEntry
+
+# Below this many rows the pool's start-up and IPC cost outweighs the extra
+# cores and rows are validated in-process.
+POOL_MIN_ROWS = 20_000
+
+# Rows shipped to a worker per task.
+CHUNK_ROWS = 2_000
+
+# Chunks submitted ahead of the results collected, per worker: enough to keep
+# every worker busy, few enough that parsing never runs far ahead.
+CHUNKS_IN_FLIGHT = 2
+
+_BASE32 = re.compile(r"[A-Z2-7]+")
+
+
+@dataclass
+class RowError:
+    """A parsed row that could not be imported.
+
+    Attributes:
+        row: 1-based position of the row among the parsed entries.
+        reason: Why the row was rejected.
+    """
+
+    row: int
+    reason: str
+
+
+def normalize_row(row: dict[str, Any]) -> TotpEntry:
+    """Build a validated entry from a parsed import row.
+
+    The secret is stripped of spaces, upper-cased and re-padded so
+    base64.b32decode accepts it.
+
+    Raises:
+        ValueError: If the row does not describe a valid TOTP entry.
+    """
+    secret = str(row.get("secret") or "").replace(" ", "").rstrip("=").upper()
+    if not secret or not _BASE32.fullmatch(secret):
+        raise ValueError("secret is not valid Base32")
+    secret += "=" * (-len(secret) % 8)
+    try:
+        return TotpEntry(**{**row, "secret": secret})
+    except ValidationError as e:
+        raise ValueError(
+            "; ".join(
+                f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()
+            )
+        ) from None
+
+
+_Result = tuple[int, Optional[dict[str, Any]], Optional[str]]
+
+
+def _validate_chunk(start: int, rows: list[dict[str, Any]]) -> list[_Result]:
+    """Validate rows in a worker, returning plain data to keep pickling cheap."""
+    results: list[_Result] = []
+    for i, row in enumerate(rows, start):
+        try:
+            results.append((i, normalize_row(row).model_dump(), None))
+        except ValueError as e:
+            results.append((i, None, str(e)))
+    return results
+
+
+def _chunks(
+    rows: Iterator[dict[str, Any]], size: int
+) -> Iterator[tuple[int, list[dict[str, Any]]]]:
+    start = 1
+    while chunk := list(islice(rows, size)):
+        yield start, chunk
+        start += len(chunk)
+
+
+def validate_rows(
+    rows: Iterable[dict[str, Any]],
+    workers: Optional[int] = None,
+    threshold: int = POOL_MIN_ROWS,
+) -> tuple[list[TotpEntry], list[RowError]]:
+    """Validate parsed import rows, in row order.
+
+    Rows are read up to ``threshold`` at first; if the input ends there
+    they are validated in-process. Otherwise the rest is validated in
+    chunks by a ProcessPoolExecutor while the parser keeps reading, so a
+    large import is bound by parsing rather than by one core. At most
+    CHUNKS_IN_FLIGHT chunks per worker are queued ahead of the results
+    collected, so memory stays bounded however long the input is.
+
+    Args:
+        rows: Parsed rows as produced by the importers.
+        workers: Number of worker processes (defaults to the CPU count).
+        threshold: Minimum number of rows before a pool is used.
+
+    Returns:
+        The valid entries and the rejected rows, both in input order.
+    """
+    it = iter(rows)
+    head = list(islice(it, threshold))
+    workers = workers or os.cpu_count() or 1
+    entries: list[TotpEntry] = []
+    errors: list[RowError] = []
+
+    if workers <= 1 or len(head) < threshold:
+        for i, row in enumerate(chain(head, it), 1):
+            try:
+                entries.append(normalize_row(row))
+            except ValueError as e:
+                errors.append(RowError(i, str(e)))
+        return entries, errors
+
+    chunks = _chunks(chain(head, it), CHUNK_ROWS)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: deque[Future[list[_Result]]] = deque(
+            pool.submit(_validate_chunk, start, chunk)
+            for start, chunk in islice(chunks, CHUNKS_IN_FLIGHT * workers)
+        )
+        while pending:
+            results = pending.popleft().result()
+            # Replace the chunk just collected before processing it.
+            for start, chunk in islice(chunks, 1):
+                pending.append(pool.submit(_validate_chunk, start, chunk))
+            for i, data, reason in results:
+                if data is None:
+                    errors.append(RowError(i, reason or "invalid row"))
+                else:
+                    # Already validated by the worker.
+                    entries.append(TotpEntry.model_construct(**data))
+    return entries, errors
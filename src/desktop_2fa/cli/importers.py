@@ -1,19 +1,197 @@
 """Importers for various TOTP formats."""
 
+import base64
 import csv
+import hashlib
+import io
 import json
+import re
 import urllib.parse
-from pathlib import Path
-from typing import Any, Dict, List
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional
 from xml.etree import ElementTree as ET
 
+SUPPORTED_FORMATS = ("aegis", "bitwarden", "1password", "otpauth", "freeotp")
 
-def parse_aegis_json(content: str) -> List[Dict[str, Any]]:
+
+class AegisPasswordRequired(ValueError):
+    """Raised when an encrypted Aegis export is read without a password."""
+
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# First character that cannot continue a JSON number.
+_NUMBER_END = re.compile(r"[^-+0-9.eE]")
+
+
+class _JsonStream:
+    """Pull reader over JSON text that is read from a file in chunks.
+
+    Objects and arrays are walked key by key and item by item with keys()
+    and items(); every other value is decoded straight from the buffer by
+    the C scanner in value(). Only the unread tail of the current chunk
+    and the value being decoded are held in memory.
+    """
+
+    def __init__(self, f: IO[str], chunk_size: int = 1 << 16):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self, size: int) -> bool:
+        """Append up to size characters; return False at end of input."""
+        if self._eof:
+            return False
+        data = self._f.read(size)
+        if not data:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos :] + data
+        self._pos = 0
+        return True
+
+    def _error(self, message: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(message, self._buf, self._pos)
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character without consuming it."""
+        while True:
+            match = _WHITESPACE.match(self._buf, self._pos)
+            self._pos = match.end() if match else self._pos
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill(self._chunk_size):
+                raise self._error("Unexpected end of JSON input")
+
+    def _take(self, char: str) -> None:
+        if self.peek() != char:
+            raise self._error(f"Expecting {char!r}")
+        self._pos += 1
+
+    def value(self) -> Any:
+        """Decode and return the value at the cursor."""
+        size = self._chunk_size
+        if self.peek() in "-0123456789":
+            # A number cut by a chunk boundary still decodes ("12" of
+            # "12.5"), so read up to the character that ends it first.
+            while _NUMBER_END.search(self._buf, self._pos) is None and self._fill(size):
+                size *= 2
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill(size):
+                    raise
+                # Grow reads so a large value is not rescanned per chunk.
+                size *= 2
+                continue
+            self._pos = end
+            return value
+
+    def keys(self) -> Iterator[str]:
+        """Iterate over the keys of the object at the cursor.
+
+        The caller must consume each key's value before advancing.
+        """
+        self._take("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            if self.peek() != '"':
+                raise self._error("Expecting property name")
+            key = self.value()
+            self._take(":")
+            yield key
+            if self.peek() == ",":
+                self._pos += 1
+                continue
+            self._take("}")
+            return
+
+    def items(self) -> Iterator[None]:
+        """Iterate over the array at the cursor, stopping before each item.
+
+        The caller must consume each item before advancing.
+        """
+        self._take("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield None
+            if self.peek() == ",":
+                self._pos += 1
+                continue
+            self._take("]")
+            return
+
+
+def parse_aegis_json(
+    content: str, password: Optional[str] = None
+) -> List[Dict[str, Any]]:
     """Parse Aegis JSON format."""
-    data = json.loads(content)
-    entries = []
-    for entry in data.get("entries", []):
-        if entry.get("type") != "totp":
+    return list(iter_aegis_json(io.StringIO(content), password))
+
+
+def iter_aegis_json(
+    source: str | IO[str], password: Optional[str] = None
+) -> Iterator[Dict[str, Any]]:
+    """Yield TOTP entries from an Aegis export as the file is read.
+
+    Plain exports are streamed: entries are decoded one at a time and
+    non-TOTP entries are dropped straight away. Encrypted exports are
+    decrypted in one pass with the password slot's scrypt key and then
+    streamed the same way.
+
+    Args:
+        source: A file name or a file object opened for reading.
+        password: Password of an encrypted export.
+
+    Raises:
+        AegisPasswordRequired: If the export is encrypted and no password
+            was given.
+        ValueError: If the JSON is malformed or the password is wrong.
+    """
+    if isinstance(source, str):
+        with open(source, encoding="utf-8") as f:
+            yield from _iter_aegis(_JsonStream(f), password)
+    else:
+        yield from _iter_aegis(_JsonStream(source), password)
+
+
+def _iter_aegis(
+    stream: _JsonStream, password: Optional[str]
+) -> Iterator[Dict[str, Any]]:
+    header: Any = None
+    encrypted_db: Any = None
+    for key in stream.keys():
+        if key == "entries":
+            yield from _iter_aegis_entries(stream)
+        elif key == "db" and stream.peek() == "{":
+            for db_key in stream.keys():
+                if db_key == "entries":
+                    yield from _iter_aegis_entries(stream)
+                else:
+                    stream.value()
+        elif key == "db":
+            encrypted_db = stream.value()
+        elif key == "header":
+            header = stream.value()
+        else:
+            stream.value()
+
+    if encrypted_db is not None:
+        plaintext = _decrypt_aegis_db(header, encrypted_db, password)
+        del encrypted_db
+        yield from _iter_aegis(_JsonStream(io.StringIO(plaintext)), None)
+
+
+def _iter_aegis_entries(stream: _JsonStream) -> Iterator[Dict[str, Any]]:
+    for _ in stream.items():
+        entry = stream.value()
+        if not isinstance(entry, dict) or entry.get("type") != "totp":
             continue
 
         issuer = entry.get("issuer", "")
@@ -24,18 +202,68 @@ def parse_aegis_json(content: str) -> List[Dict[str, Any]]:
         if not secret:
             continue
 
-        entries.append(
-            {
-                "issuer": issuer,
-                "account_name": name,
-                "secret": secret,
-                "digits": info.get("digits", 6),
-                "period": info.get("period", 30),
-                "algorithm": info.get("algorithm", "SHA1").upper(),
-            }
+        # Aegis itself writes "algo"; "algorithm" is accepted as well.
+        algorithm = info.get("algo") or info.get("algorithm") or "SHA1"
+        yield {
+            "issuer": issuer,
+            "account_name": name,
+            "secret": secret,
+            "digits": info.get("digits", 6),
+            "period": info.get("period", 30),
+            "algorithm": algorithm.upper(),
+        }
+
+
+_AEGIS_PASSWORD_SLOT = 1
+_MAX_SCRYPT_N = 1 << 20
+
+
+def _decrypt_aegis_db(header: Any, db: Any, password: Optional[str]) -> str:
+    """Decrypt the base64 "db" of an encrypted Aegis export."""
+    from desktop_2fa.crypto.aesgcm import decrypt
+
+    if password is None:
+        raise AegisPasswordRequired("Encrypted Aegis export requires a password")
+    try:
+        params = header["params"]
+        sealed = (
+            bytes.fromhex(params["nonce"])
+            + base64.b64decode(db, validate=True)
+            + bytes.fromhex(params["tag"])
         )
+        slots = [s for s in header["slots"] if s.get("type") == _AEGIS_PASSWORD_SLOT]
+    except (TypeError, KeyError, AttributeError, ValueError) as e:
+        raise ValueError("Invalid encrypted Aegis export") from e
+
+    for slot in slots:
+        try:
+            n, r, p = int(slot["n"]), int(slot["r"]), int(slot["p"])
+            if not 1 < n <= _MAX_SCRYPT_N:
+                continue
+            key = hashlib.scrypt(
+                password.encode("utf-8"),
+                salt=bytes.fromhex(slot["salt"]),
+                n=n,
+                r=r,
+                p=p,
+                maxmem=256 * r * (n + p),
+                dklen=32,
+            )
+            key_params = slot["key_params"]
+            master_key = decrypt(
+                key,
+                bytes.fromhex(key_params["nonce"])
+                + bytes.fromhex(slot["key"])
+                + bytes.fromhex(key_params["tag"]),
+            )
+        except (TypeError, KeyError, AttributeError, ValueError):
+            continue
+        try:
+            return decrypt(master_key, sealed).decode("utf-8")
+        except ValueError as e:
+            raise ValueError("Encrypted Aegis export is corrupted") from e
 
-    return entries
+    raise ValueError("Invalid password for encrypted Aegis export")
 
 
 def parse_bitwarden_csv(content: str) -> List[Dict[str, Any]]:
@@ -48,10 +276,18 @@ def parse_bitwarden_csv(content: str) -> List[Dict[str, Any]]:
             issuer,account,secret
             issuer,secret
     """
-    reader = csv.DictReader(content.splitlines())
-    entries: List[Dict[str, Any]] = []
+    return list(iter_bitwarden_csv(io.StringIO(content, newline="")))
 
-    for row in reader:
+
+def iter_bitwarden_csv(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Yield entries from Bitwarden-like CSV one row at a time.
+
+    Args:
+        lines: The CSV lines, typically a file opened with newline="".
+            Rows are read as entries are consumed, so memory use does not
+            grow with the size of the export.
+    """
+    for row in csv.DictReader(lines):
         name = (row.get("name") or "").strip()
         totp = (row.get("totp") or "").strip()
         extras = row.get(None) or []
@@ -76,44 +312,42 @@ def parse_bitwarden_csv(content: str) -> List[Dict[str, Any]]:
         if not secret:
             continue
 
-        entries.append(
-            {
-                "issuer": issuer,
-                "account_name": account,
-                "secret": secret,
-                "digits": 6,
-                "period": 30,
-                "algorithm": "SHA1",
-            }
-        )
-
-    return entries
+        yield {
+            "issuer": issuer,
+            "account_name": account,
+            "secret": secret,
+            "digits": 6,
+            "period": 30,
+            "algorithm": "SHA1",
+        }
 
 
 def parse_1password_csv(content: str) -> List[Dict[str, Any]]:
     """Parse 1Password CSV format."""
-    reader = csv.DictReader(content.splitlines())
-    entries = []
+    return list(iter_1password_csv(io.StringIO(content, newline="")))
+
 
-    for row in reader:
+def iter_1password_csv(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Yield entries from 1Password CSV one row at a time.
+
+    Args:
+        lines: The CSV lines, typically a file opened with newline="".
+    """
+    for row in csv.DictReader(lines):
         otp = (row.get("otp") or row.get("one-time password") or "").strip()
         if not otp:
             continue
 
         title = (row.get("title") or "").strip()
 
-        entries.append(
-            {
-                "issuer": title,
-                "account_name": title,
-                "secret": otp,
-                "digits": 6,
-                "period": 30,
-                "algorithm": "SHA1",
-            }
-        )
-
-    return entries
+        yield {
+            "issuer": title,
+            "account_name": title,
+            "secret": otp,
+            "digits": 6,
+            "period": 30,
+            "algorithm": "SHA1",
+        }
 
 
 def parse_otpauth_uri(uri: str) -> List[Dict[str, Any]]:
@@ -158,13 +392,37 @@ def parse_otpauth_uri(uri: str) -> List[Dict[str, Any]]:
 
 def parse_freeotp_xml(content: str) -> List[Dict[str, Any]]:
     """Parse FreeOTP XML format."""
-    root = ET.fromstring(content)
-    entries = []
+    return list(iter_freeotp_xml(io.StringIO(content)))
+
+
+def iter_freeotp_xml(source: str | IO[Any]) -> Iterator[Dict[str, Any]]:
+    """Yield entries from FreeOTP XML as each token element is parsed.
+
+    Tokens are removed from the tree once read, so memory stays bounded
+    however many tokens the backup holds.
+
+    Args:
+        source: A file name or a file object opened for reading.
+
+    Raises:
+        xml.etree.ElementTree.ParseError: If the XML is malformed.
+    """
+    stack: List[ET.Element] = []
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            continue
+        stack.pop()
+        if elem.tag != "token":
+            continue
 
-    for token in root.findall(".//token"):
-        issuer = token.findtext("issuer", "")
-        label = token.findtext("label", "")
-        secret = token.findtext("secret", "")
+        issuer = elem.findtext("issuer", "")
+        label = elem.findtext("label", "")
+        secret = elem.findtext("secret", "")
+        # Detach the token so neither it nor its children accumulate.
+        if stack:
+            stack[-1].remove(elem)
+        elem.clear()
 
         if not secret:
             continue
@@ -176,37 +434,59 @@ def parse_freeotp_xml(content: str) -> List[Dict[str, Any]]:
         else:
             account = label
 
-        entries.append(
-            {
-                "issuer": issuer,
-                "account_name": account,
-                "secret": secret,
-                "digits": 6,
-                "period": 30,
-                "algorithm": "SHA1",
-            }
-        )
-
-    return entries
+        yield {
+            "issuer": issuer,
+            "account_name": account,
+            "secret": secret,
+            "digits": 6,
+            "period": 30,
+            "algorithm": "SHA1",
+        }
 
 
-def import_from_format(format_name: str, source: str) -> List[Dict[str, Any]]:
+def import_from_format(
+    format_name: str, source: str, password: Optional[str] = None
+) -> List[Dict[str, Any]]:
     """Import entries from the given format and source."""
-    fmt = format_name.lower()
+    return list(iter_from_format(format_name, source, password))
 
-    if fmt == "aegis":
-        return parse_aegis_json(Path(source).read_text())
 
-    if fmt == "bitwarden":
-        return parse_bitwarden_csv(Path(source).read_text())
+def iter_from_format(
+    format_name: str, source: str, password: Optional[str] = None
+) -> Iterator[Dict[str, Any]]:
+    """Yield entries from the given format and source as they are parsed.
+
+    Exports are streamed from the file, so importing a large export keeps
+    only the current entry in memory (plus the decrypted payload of an
+    encrypted Aegis export). The file stays open until the iterator is
+    exhausted or closed.
 
-    if fmt == "1password":
-        return parse_1password_csv(Path(source).read_text())
+    Args:
+        format_name: One of SUPPORTED_FORMATS.
+        source: The export file, or the URI itself for "otpauth".
+        password: Password of an encrypted Aegis export.
 
-    if fmt == "otpauth":
-        return parse_otpauth_uri(source)
+    Raises:
+        ValueError: If the format is unsupported (raised on creation).
+    """
+    fmt = format_name.lower()
+    if fmt not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported format: {format_name}")
+    return _iter_from_format(fmt, source, password)
 
-    if fmt == "freeotp":
-        return parse_freeotp_xml(Path(source).read_text())
 
-    raise ValueError(f"Unsupported format: {format_name}")
+def _iter_from_format(
+    fmt: str, source: str, password: Optional[str]
+) -> Iterator[Dict[str, Any]]:
+    if fmt == "aegis":
+        yield from iter_aegis_json(source, password)
+    elif fmt == "bitwarden":
+        with open(source, newline="") as f:
+            yield from iter_bitwarden_csv(f)
+    elif fmt == "1password":
+        with open(source, newline="") as f:
+            yield from iter_1password_csv(f)
+    elif fmt == "otpauth":
+        yield from parse_otpauth_uri(source)
+    else:
+        yield from iter_freeotp_xml(source)
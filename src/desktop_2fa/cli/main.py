@@ -6,8 +6,11 @@ import sys
 import typer
 
 from desktop_2fa import __version__
+from desktop_2fa.agent import DEFAULT_IDLE_TIMEOUT
+from desktop_2fa.utils.metrics import METRICS_FILE_ENV
 
-from . import commands, helpers
+# Command modules are imported inside each command: they pull in rich,
+# pydantic and the crypto backends, which --version and --help never need.
 
 
 def is_interactive() -> bool:
@@ -22,6 +25,8 @@ def is_interactive() -> bool:
 
 
 app = typer.Typer(help="Desktop‑2FA — secure offline TOTP authenticator")
+agent_app = typer.Typer(help="Session key agent that caches unlocked vault keys")
+app.add_typer(agent_app, name="agent")
 
 
 @app.callback(invoke_without_command=True)
@@ -36,6 +41,14 @@ def main(
         "--password-file",
         help="File containing password for vault encryption/decryption",
     ),
+    profile: bool = typer.Option(
+        False,
+        "--profile",
+        help="Print per-phase timings and peak memory of the command to stderr",
+    ),
+    profile_format: str = typer.Option(
+        "text", "--profile-format", help="Profile output format: text or json"
+    ),
 ) -> None:
     """
     Global CLI callback — initializes context and handles --version and no-args case.
@@ -60,10 +73,77 @@ def main(
         print(f"Desktop-2FA v{__version__}")
         raise typer.Exit()
 
+    if profile:
+        _start_profiling(ctx, profile_format)
+
+    if os.getenv(METRICS_FILE_ENV):
+        _start_metrics(ctx)
+
+
+PROFILE_FORMATS = ("text", "json")
+
+
+def _start_profiling(ctx: typer.Context, fmt: str) -> None:
+    """Profile the selected command and report when its context closes."""
+    from contextlib import ExitStack
+
+    from desktop_2fa.utils.profiling import Profiler
+
+    if fmt not in PROFILE_FORMATS:
+        from . import helpers
+
+        helpers.print_error(
+            f"Unknown profile format '{fmt}'. Choose from: {', '.join(PROFILE_FORMATS)}"
+        )
+        raise typer.Exit(1)
+
+    profiler = Profiler()
+    phases = ExitStack()
+    profiler.start()
+    phases.enter_context(profiler.phase(f"command {ctx.invoked_subcommand}"))
+
+    def report() -> None:
+        phases.close()
+        profiler.stop()
+        text = profiler.format_json() if fmt == "json" else profiler.format_text()
+        print(text, file=sys.stderr)
+
+    ctx.call_on_close(report)
+
+
+def _start_metrics(ctx: typer.Context) -> None:
+    """Export vault metrics to the file named by METRICS_FILE_ENV."""
+    from desktop_2fa.utils import metrics
+
+    exporter = metrics.exporter_from_env()
+    if exporter is None:
+        return
+    metrics.register(exporter)
+
+    def flush() -> None:
+        metrics.unregister(exporter)
+        try:
+            exporter.flush()
+        except OSError as e:
+            # Metrics must never turn a successful command into a failure.
+            print(f"Warning: could not write metrics: {e}", file=sys.stderr)
+
+    ctx.call_on_close(flush)
+
 
 @app.command("list")
-def list_cmd(ctx: typer.Context) -> None:
-    commands.list_entries(ctx)
+def list_cmd(
+    ctx: typer.Context,
+    query: str = typer.Option(
+        None, "--filter", help="Only list entries whose names contain this text"
+    ),
+    fuzzy: bool = typer.Option(
+        False, "--fuzzy", help="Also list approximate matches for --filter"
+    ),
+) -> None:
+    from . import commands
+
+    commands.list_entries(ctx, query, fuzzy)
 
 
 @app.command("add")
@@ -72,6 +152,8 @@ def add_cmd(
     issuer: str = typer.Argument(None, help="Issuer name or otpauth:// URL"),
     secret: str = typer.Argument(None, help="TOTP secret (Base32)"),
 ) -> None:
+    from . import commands, helpers
+
     # Interactive mode: prompt for missing arguments
     interactive = ctx.obj.get("interactive", False)
     if interactive and (issuer is None or secret is None):
@@ -90,22 +172,54 @@ def add_cmd(
 
 
 @app.command("code")
-def code_cmd(ctx: typer.Context, name: str) -> None:
-    commands.generate_code(name, ctx)
+def code_cmd(
+    ctx: typer.Context,
+    name: str,
+    fuzzy: bool = typer.Option(
+        False,
+        "--fuzzy",
+        help="Use the best prefix or approximate match for NAME, refusing ties",
+    ),
+) -> None:
+    from . import commands
+
+    commands.generate_code(name, ctx, fuzzy)
+
+
+@app.command("codes")
+def codes_cmd(
+    ctx: typer.Context,
+    patterns: list[str] = typer.Argument(
+        None, help="Glob patterns matched against issuer and account name"
+    ),
+    fmt: str = typer.Option(
+        "table", "--format", "-f", help="Output format: table, json or ndjson"
+    ),
+) -> None:
+    """Print current codes for all matching entries with a single unlock."""
+    from . import commands
+
+    commands.generate_codes(patterns or [], fmt, ctx)
 
 
 @app.command("remove")
 def remove_cmd(ctx: typer.Context, name: str) -> None:
+    from . import commands
+
     commands.remove_entry(name, ctx)
 
 
 @app.command("rename")
 def rename_cmd(ctx: typer.Context, old: str, new: str) -> None:
+    from . import commands
+
     commands.rename_entry(old, new, ctx)
 
 
 @app.command("export")
 def export_cmd(ctx: typer.Context, path: str) -> None:
+    from . import commands
+
     commands.export_vault(path, ctx)
 
 
@@ -115,11 +229,34 @@ def import_cmd(
     source: str,
     force: bool = typer.Option(False, "--force", help="Overwrite existing vault"),
 ) -> None:
+    from . import commands
+
     commands.import_vault(source, force, ctx)
 
 
+@app.command("import-from")
+def import_from_cmd(
+    ctx: typer.Context,
+    fmt: str = typer.Argument(
+        ..., help="Export format: aegis, bitwarden, 1password, otpauth or freeotp"
+    ),
+    source: str = typer.Argument(
+        ..., help="Export file, or the otpauth:// URI for otpauth"
+    ),
+    source_password: str = typer.Option(
+        None, "--source-password", help="Password of an encrypted Aegis export"
+    ),
+) -> None:
+    """Add the entries of another authenticator's export with a single unlock."""
+    from . import commands
+
+    commands.import_entries(fmt, source, ctx, source_password)
+
+
 @app.command("backup")
 def backup_cmd(ctx: typer.Context) -> None:
+    from . import commands
+
     commands.backup_vault(ctx)
 
 
@@ -129,4 +266,101 @@ def init_vault_cmd(
     force: bool = typer.Option(False, "--force", help="Overwrite existing vault"),
 ) -> None:
     """Initialize a new encrypted vault."""
+    from . import commands
+
     commands.init_vault(force, ctx)
+
+
+@app.command("tune-kdf")
+def tune_kdf_cmd(
+    ctx: typer.Context,
+    target_ms: int = typer.Option(
+        500, "--target-ms", help="Target unlock time in milliseconds"
+    ),
+    max_memory_mib: int = typer.Option(
+        128, "--max-memory-mib", help="Upper bound on Argon2id memory in MiB"
+    ),
+    dry_run: bool = typer.Option(
+        False, "--dry-run", help="Only print the tuned parameters"
+    ),
+) -> None:
+    """Benchmark this host and store tuned Argon2id parameters in the vault."""
+    from . import commands
+
+    commands.tune_kdf(target_ms, max_memory_mib, dry_run, ctx)
+
+
+@app.command("compress")
+def compress_cmd(
+    ctx: typer.Context,
+    codec: str = typer.Argument(..., help="Compression codec: none, zlib or zstd"),
+) -> None:
+    """Compress the vault payload before encryption (or turn it off)."""
+    from . import commands
+
+    commands.set_compression(codec, ctx)
+
+
+@app.command("format")
+def format_cmd(
+    ctx: typer.Context,
+    payload_format: str = typer.Argument(
+        ..., metavar="FORMAT", help="Vault format: binary, json or segmented"
+    ),
+) -> None:
+    """Choose how the vault is laid out on disk.
+
+    "segmented" encrypts entries in pages so reading one code or changing
+    one entry only decrypts the pages involved.
+    """
+    from . import commands
+
+    commands.set_payload_format(payload_format, ctx)
+
+
+@agent_app.command("start")
+def agent_start_cmd(
+    socket_path: str = typer.Option(None, "--socket", help="Agent socket path"),
+    timeout: int = typer.Option(
+        DEFAULT_IDLE_TIMEOUT,
+        "--timeout",
+        help="Seconds an unused key is kept before it is wiped",
+    ),
+    foreground: bool = typer.Option(
+        False, "--foreground", help="Run in the foreground instead of forking"
+    ),
+) -> None:
+    """Start the agent; eval its output to export DESKTOP_2FA_AGENT_SOCK."""
+    from . import commands
+
+    commands.agent_start(socket_path, timeout, foreground)
+
+
+@agent_app.command("stop")
+def agent_stop_cmd(
+    socket_path: str = typer.Option(None, "--socket", help="Agent socket path"),
+) -> None:
+    """Wipe all cached keys and stop the agent."""
+    from . import commands
+
+    commands.agent_stop(socket_path)
+
+
+@agent_app.command("lock")
+def agent_lock_cmd(
+    socket_path: str = typer.Option(None, "--socket", help="Agent socket path"),
+) -> None:
+    """Wipe all cached keys but keep the agent running."""
+    from . import commands
+
+    commands.agent_lock(socket_path)
+
+
+@agent_app.command("status")
+def agent_status_cmd(
+    socket_path: str = typer.Option(None, "--socket", help="Agent socket path"),
+) -> None:
+    """Show whether an agent is running and how many keys it holds."""
+    from . import commands
+
+    commands.agent_status(socket_path)
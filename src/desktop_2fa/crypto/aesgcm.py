@@ -20,12 +20,13 @@ def encrypt(key: bytes, data: bytes) -> bytes:
     return nonce + aes.encrypt(nonce, data, None)
 
 
-def decrypt(key: bytes, blob: bytes) -> bytes:
+def decrypt(key: bytes, blob: bytes | memoryview) -> bytes:
     """Decrypt data using AES-GCM.
 
     Args:
         key: The decryption key (32 bytes for AES-256).
         blob: The encrypted data in the format: 12-byte nonce + ciphertext + 16-byte authentication tag.
+            A memoryview is decrypted in place, without copying the ciphertext.
 
     Returns:
         The decrypted plaintext data.
@@ -1,12 +1,113 @@
 """Argon2 key derivation utilities."""
 
+import os
+import struct
+import time
+from dataclasses import dataclass
+
 from argon2.low_level import Type, hash_secret_raw
 
+# Bounds accepted when reading parameters back from a vault header. They keep
+# a malicious or corrupted header from requesting absurd amounts of work.
+MIN_MEMORY_COST = 8  # KiB per lane, as required by Argon2
+MAX_MEMORY_COST = 4 * 1024 * 1024  # 4 GiB
+MAX_TIME_COST = 64
+MAX_PARALLELISM = 64
+
+# Cap on the lane count picked automatically for new vaults. Beyond this the
+# per-lane memory gets small and the speedup flattens out.
+MAX_DEFAULT_PARALLELISM = 16
+
+# Size of the serialized form written to vault headers.
+KDF_PARAMS_LEN = 12
+
+# Floor used by tune_kdf_params (OWASP minimum for Argon2id).
+TUNE_MIN_MEMORY_COST = 19 * 1024  # 19 MiB
+
+
+@dataclass(frozen=True)
+class KdfParams:
+    """Argon2id cost parameters.
+
+    Attributes:
+        time_cost: Number of passes over memory.
+        memory_cost: Memory size in KiB.
+        parallelism: Number of lanes (and threads).
+    """
+
+    time_cost: int = 4
+    memory_cost: int = 128 * 1024  # 128 MiB
+    parallelism: int = 2
+
+    def pack(self) -> bytes:
+        """Serialize to the 12-byte big-endian form stored in vault headers."""
+        return struct.pack(">III", self.time_cost, self.memory_cost, self.parallelism)
+
+    @classmethod
+    def unpack(cls, raw: bytes | memoryview) -> "KdfParams":
+        """Parse parameters written by pack().
+
+        Raises:
+            ValueError: If the parameters are outside the accepted bounds.
+        """
+        time_cost, memory_cost, parallelism = struct.unpack(">III", raw)
+        params = cls(time_cost, memory_cost, parallelism)
+        params.validate()
+        return params
+
+    def validate(self) -> None:
+        """Check the parameters against Argon2 and sanity bounds.
+
+        Raises:
+            ValueError: If any parameter is out of range.
+        """
+        if not 1 <= self.parallelism <= MAX_PARALLELISM:
+            raise ValueError("KDF parallelism out of range")
+        if not 1 <= self.time_cost <= MAX_TIME_COST:
+            raise ValueError("KDF time cost out of range")
+        if (
+            not MIN_MEMORY_COST * self.parallelism
+            <= self.memory_cost
+            <= MAX_MEMORY_COST
+        ):
+            raise ValueError("KDF memory cost out of range")
+
+
+# Parameters of version 1 vaults, which did not record them in the header.
+LEGACY_KDF_PARAMS = KdfParams()
+DEFAULT_KDF_PARAMS = KdfParams()
+
+
+def available_cpus() -> int:
+    """Return the number of CPUs this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+def default_kdf_params() -> KdfParams:
+    """Return the parameters used for newly created vaults.
 
-def derive_key(password: str, salt: bytes) -> bytes:
+    The cost (time_cost, memory_cost) matches DEFAULT_KDF_PARAMS, but the
+    memory is split across one lane per available CPU so derivation uses
+    the whole machine. The lane count is stored in the vault header, so a
+    vault created on a large machine still opens elsewhere, just with fewer
+    lanes running concurrently.
+    """
+    lanes = max(1, min(available_cpus(), MAX_DEFAULT_PARALLELISM))
+    return KdfParams(
+        time_cost=DEFAULT_KDF_PARAMS.time_cost,
+        memory_cost=DEFAULT_KDF_PARAMS.memory_cost,
+        parallelism=lanes,
+    )
+
+
+def derive_key(
+    password: str, salt: bytes, params: KdfParams = DEFAULT_KDF_PARAMS
+) -> bytes:
     """Derive a key from password and salt using Argon2id.
 
-    Argon2id parameters (version 1.3, stable for 2025-era hardware):
+    Default Argon2id parameters (version 1.3, stable for 2025-era hardware):
     - time_cost: 4 iterations (balances security and performance)
     - memory_cost: 131072 KiB (128 MiB) (resistant to GPU attacks)
     - parallelism: 2 threads (suitable for most systems)
@@ -15,10 +116,12 @@ def derive_key(password: str, salt: bytes) -> bytes:
 
     These parameters provide ~100ms derivation time on modern hardware
     while maintaining strong resistance to offline password guessing.
+    Vaults record the parameters they were sealed with, see tune_kdf_params.
 
     Args:
         password: The password string.
         salt: The salt bytes (must be 16 bytes).
+        params: The Argon2id cost parameters.
 
     Returns:
         The derived key bytes (32 bytes).
@@ -26,10 +129,61 @@ def derive_key(password: str, salt: bytes) -> bytes:
     key = hash_secret_raw(
         secret=password.encode(),
         salt=salt,
-        time_cost=4,
-        memory_cost=128 * 1024,  # 128 MiB
-        parallelism=2,
+        time_cost=params.time_cost,
+        memory_cost=params.memory_cost,
+        parallelism=params.parallelism,
         hash_len=32,
         type=Type.ID,
     )
     return key
+
+
+def measure_kdf(params: KdfParams) -> float:
+    """Time a single key derivation with the given parameters.
+
+    Returns:
+        The elapsed wall time in seconds.
+    """
+    salt = os.urandom(16)
+    start = time.perf_counter()
+    derive_key("benchmark", salt, params)
+    return time.perf_counter() - start
+
+
+def tune_kdf_params(
+    target_ms: float,
+    max_memory_cost: int = DEFAULT_KDF_PARAMS.memory_cost,
+    parallelism: int | None = None,
+    min_memory_cost: int = TUNE_MIN_MEMORY_COST,
+) -> KdfParams:
+    """Pick Argon2id parameters that take about target_ms on this host.
+
+    Memory is preferred over iterations: the largest memory cost up to
+    max_memory_cost that fits the budget in a single pass is chosen first,
+    then time_cost is raised to use up the remaining budget.
+
+    Args:
+        target_ms: Desired derivation time in milliseconds.
+        max_memory_cost: Upper bound on memory in KiB, clamped to
+            MAX_MEMORY_COST.
+        parallelism: Number of lanes; defaults to the number of CPUs.
+        min_memory_cost: Lower bound on memory in KiB.
+
+    Returns:
+        The tuned parameters.
+    """
+    if parallelism is None:
+        parallelism = available_cpus()
+    parallelism = max(1, min(parallelism, MAX_PARALLELISM))
+    min_memory_cost = max(min_memory_cost, MIN_MEMORY_COST * parallelism)
+    target = target_ms / 1000
+
+    memory_cost = min(max(max_memory_cost, min_memory_cost), MAX_MEMORY_COST)
+    while True:
+        elapsed = measure_kdf(KdfParams(1, memory_cost, parallelism))
+        if elapsed <= target or memory_cost <= min_memory_cost:
+            break
+        memory_cost = max(memory_cost // 2, min_memory_cost)
+
+    time_cost = max(1, min(int(target / elapsed), MAX_TIME_COST)) if elapsed else 1
+    return KdfParams(time_cost, memory_cost, parallelism)
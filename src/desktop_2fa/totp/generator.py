@@ -3,8 +3,163 @@
 import base64
 import hashlib
 import hmac
+import importlib
 import struct
 import time
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Optional, Protocol, Sequence
+
+if TYPE_CHECKING:
+    from desktop_2fa.vault.models import TotpEntry
+
+_DIGESTS: dict[str, Callable[..., Any]] = {
+    "SHA1": hashlib.sha1,
+    "SHA256": hashlib.sha256,
+    "SHA512": hashlib.sha512,
+}
+
+_B32_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ234567"
+_B32_CHARS = frozenset(_B32_ALPHABET)
+# Maps the RFC 4648 alphabet onto the digits int(..., 32) understands.
+_B32_TO_INT = str.maketrans(_B32_ALPHABET, "0123456789ABCDEFGHIJKLMNOPQRSTUV")
+
+# Groups smaller than this are truncated in pure Python even when NumPy is
+# available; below it the array setup costs more than it saves.
+NUMPY_MIN_BATCH = 256
+
+
+class TotpParams(Protocol):
+    """Anything carrying TOTP parameters, such as a vault TotpEntry."""
+
+    @property
+    def secret(self) -> str: ...
+
+    @property
+    def digits(self) -> int: ...
+
+    @property
+    def period(self) -> int: ...
+
+    @property
+    def algorithm(self) -> str: ...
+
+
+_COUNTER = struct.Struct(">Q")
+_WORD = struct.Struct(">I")
+
+
+class TotpGenerator:
+    """TOTP generator bound to a single secret.
+
+    The secret is base32-decoded and the HMAC key schedule (inner and outer
+    padded digests) computed once at construction. Each code then only
+    copies that state and hashes the 8-byte counter, which makes repeated
+    generation for the same entry (bulk export, watch loops, drift windows)
+    considerably cheaper than calling generate() each time.
+    """
+
+    __slots__ = ("digits", "period", "_mac", "_modulus")
+
+    def __init__(
+        self,
+        secret: str,
+        digits: int = 6,
+        period: int = 30,
+        algorithm: str = "SHA1",
+    ):
+        """Initialize the generator.
+
+        Args:
+            secret: The base32-encoded secret key.
+            digits: Number of digits in the code (default 6).
+            period: Time period in seconds (default 30).
+            algorithm: Hash algorithm ('SHA1', 'SHA256', 'SHA512').
+
+        Raises:
+            ValueError: If the algorithm is unsupported.
+        """
+        digestmod = _DIGESTS.get(algorithm.upper())
+        if digestmod is None:
+            raise ValueError("Unsupported algorithm")
+        key = base64.b32decode(secret, casefold=True)
+        self.digits = digits
+        self.period = period
+        self._mac = hmac.new(key, digestmod=digestmod)
+        self._modulus = 10**digits
+
+    @classmethod
+    def from_entry(cls, entry: "TotpEntry") -> "TotpGenerator":
+        """Create a generator for a vault entry."""
+        return cls(
+            secret=entry.secret,
+            digits=entry.digits,
+            period=entry.period,
+            algorithm=entry.algorithm,
+        )
+
+    def code_at_counter(self, counter: int) -> str:
+        """Return the code for a raw time-step counter."""
+        mac = self._mac.copy()
+        mac.update(_COUNTER.pack(counter))
+        h = mac.digest()
+        offset = h[-1] & 0x0F
+        code = (_WORD.unpack_from(h, offset)[0] & 0x7FFFFFFF) % self._modulus
+        return str(code).zfill(self.digits)
+
+    def code_at(self, timestamp: int | None = None) -> str:
+        """Return the code valid at a timestamp (defaults to current time)."""
+        if timestamp is None:
+            timestamp = int(time.time())
+        return self.code_at_counter(timestamp // self.period)
+
+    def codes_for(self, timestamps: Iterable[int]) -> list[str]:
+        """Return the codes for each timestamp, e.g. range(start, stop, period)."""
+        period = self.period
+        return [self.code_at_counter(ts // period) for ts in timestamps]
+
+    def verify(
+        self, code: str, timestamp: int | None = None, window: int = 1
+    ) -> Optional[int]:
+        """Check a code against the time steps around a timestamp.
+
+        All 2 * window + 1 candidate codes are computed and compared in
+        constant time, without stopping at the first match, so the timing
+        does not reveal which step matched.
+
+        Args:
+            code: The code to check.
+            timestamp: The reference timestamp (defaults to current time).
+            window: Number of steps tolerated on each side of the current one.
+
+        Returns:
+            The step offset that matched (0 for the current step, negative
+            for codes from the past), preferring the smallest absolute
+            offset, or None if no step matches.
+
+        Raises:
+            ValueError: If window is negative.
+        """
+        if window < 0:
+            raise ValueError("window must not be negative")
+        if timestamp is None:
+            timestamp = int(time.time())
+        counter = timestamp // self.period
+        expected = code.encode()
+        matched: Optional[int] = None
+        for step in range(2 * window + 1):
+            # 0, -1, +1, -2, +2, ...: the first match is the closest one.
+            offset = (step + 1) // 2 * (1 if step % 2 == 0 else -1)
+            if counter + offset < 0:
+                continue
+            candidate = self.code_at_counter(counter + offset).encode()
+            if hmac.compare_digest(candidate, expected) and matched is None:
+                matched = offset
+        return matched
+
+
+@lru_cache(maxsize=256)
+def _generator(secret: str, digits: int, period: int, algorithm: str) -> TotpGenerator:
+    return TotpGenerator(secret, digits, period, algorithm)
 
 
 def generate(
@@ -16,6 +171,9 @@ def generate(
 ) -> str:
     """Generate a TOTP code.
 
+    Generators are cached per (secret, digits, period, algorithm), so
+    repeated calls for the same entry skip decoding and key setup.
+
     Args:
         secret: The base32-encoded secret key.
         timestamp: The timestamp to use (defaults to current time).
@@ -26,25 +184,147 @@ def generate(
     Returns:
         The TOTP code as a string.
     """
+    return _generator(secret, digits, period, algorithm).code_at(timestamp)
+
+
+def verify(
+    secret: str,
+    code: str,
+    timestamp: int | None = None,
+    window: int = 1,
+    digits: int = 6,
+    period: int = 30,
+    algorithm: str = "SHA1",
+) -> Optional[int]:
+    """Verify a TOTP code allowing for clock drift.
+
+    Args:
+        secret: The base32-encoded secret key.
+        code: The code to check.
+        timestamp: The reference timestamp (defaults to current time).
+        window: Number of time steps tolerated before and after.
+        digits: Number of digits in the code (default 6).
+        period: Time period in seconds (default 30).
+        algorithm: Hash algorithm ('SHA1', 'SHA256', 'SHA512').
+
+    Returns:
+        The matched step offset (see TotpGenerator.verify), or None.
+    """
+    return _generator(secret, digits, period, algorithm).verify(code, timestamp, window)
+
+
+def _b32decode(secret: str) -> bytes:
+    """Decode a base32 secret, using int() for unpadded whole blocks.
+
+    For the common 16/32 character secrets this is about three times faster
+    than base64.b32decode; anything else goes through the standard decoder.
+    """
+    s = secret.upper()
+    if len(s) % 8 or not _B32_CHARS.issuperset(s):
+        return base64.b32decode(s)
+    return int(s.translate(_B32_TO_INT), 32).to_bytes(len(s) * 5 // 8, "big")
+
+
+@lru_cache(maxsize=1)
+def _numpy() -> Any:
+    """Import NumPy on first use, returning None if it is not installed."""
+    try:
+        return importlib.import_module("numpy")
+    except ImportError:
+        return None
+
+
+def _truncate(digests: list[bytes], digits: int) -> list[str]:
+    """Apply RFC 4226 dynamic truncation to HMAC digests in pure Python."""
+    modulus = 10**digits
+    out = []
+    for h in digests:
+        offset = h[-1] & 0x0F
+        value = (_WORD.unpack_from(h, offset)[0] & 0x7FFFFFFF) % modulus
+        out.append(str(value).zfill(digits))
+    return out
+
+
+def _truncate_numpy(np: Any, digests: list[bytes], digits: int) -> list[str]:
+    """Apply RFC 4226 dynamic truncation to equal-length digests with NumPy."""
+    n, size = len(digests), len(digests[0])
+    raw = np.frombuffer(b"".join(digests), dtype=np.uint8).reshape(n, size)
+    offsets = (raw[:, -1] & 0x0F).astype(np.intp)
+    cols = offsets[:, None] + np.arange(4)
+    b = raw[np.arange(n)[:, None], cols].astype(np.uint32)
+    values = ((b[:, 0] & 0x7F) << 24) | (b[:, 1] << 16) | (b[:, 2] << 8) | b[:, 3]
+    values %= 10**digits
+    out: list[str] = np.char.zfill(values.astype(str), digits).tolist()
+    return out
+
+
+# A decoded secret with its parameters: (key, digits, period, ALGORITHM).
+KeySpec = tuple[bytes, int, int, str]
+
+
+def key_specs(entries: Iterable[TotpParams]) -> list[KeySpec]:
+    """Decode the secrets of entries once for repeated bulk generation."""
+    return [
+        (_b32decode(e.secret), e.digits, e.period, e.algorithm.upper()) for e in entries
+    ]
+
+
+def generate_specs(
+    specs: Sequence[KeySpec], timestamp: int, use_numpy: bool | None = None
+) -> list[str]:
+    """Generate codes for pre-decoded key specs at one timestamp.
+
+    This is the engine behind generate_many(); see there for the arguments.
+    """
+    np = _numpy() if use_numpy is not False else None
+    if use_numpy and np is None:
+        raise ValueError("NumPy is not installed")
+
+    groups: dict[tuple[str, int, int], list[int]] = {}
+    for i, (_, digits, period, algorithm) in enumerate(specs):
+        groups.setdefault((algorithm, digits, period), []).append(i)
+
+    codes = [""] * len(specs)
+    for (algorithm, digits, period), indices in groups.items():
+        if algorithm not in _DIGESTS:
+            raise ValueError("Unsupported algorithm")
+        digest = algorithm.lower()
+        msg = _COUNTER.pack(timestamp // period)
+        digests = [hmac.digest(specs[i][0], msg, digest) for i in indices]
+        if np is not None and (use_numpy or len(digests) >= NUMPY_MIN_BATCH):
+            group_codes = _truncate_numpy(np, digests, digits)
+        else:
+            group_codes = _truncate(digests, digits)
+        for i, code in zip(indices, group_codes):
+            codes[i] = code
+    return codes
+
+
+def generate_many(
+    entries: Sequence[TotpParams],
+    timestamp: int | None = None,
+    use_numpy: bool | None = None,
+) -> list[str]:
+    """Generate codes for many entries at one timestamp.
+
+    Entries are grouped by (algorithm, digits, period) so each group shares
+    one counter message, secrets are decoded with a fast base32 path, HMACs
+    use the one-shot hmac.digest, and truncation and modulo run as array
+    operations when NumPy is installed (the ``fast`` extra), falling back to
+    pure Python. For very large sets see totp.pool.BulkGenerator.
+
+    Args:
+        entries: Objects with secret, digits, period and algorithm.
+        timestamp: The timestamp to use (defaults to current time).
+        use_numpy: Force (True) or disable (False) the NumPy path; by
+            default it is used for groups of NUMPY_MIN_BATCH or more.
+
+    Returns:
+        The codes, in the same order as entries.
+
+    Raises:
+        ValueError: If an entry uses an unsupported algorithm.
+    """
     if timestamp is None:
         timestamp = int(time.time())
-
-    counter = timestamp // period
-    key = base64.b32decode(secret, casefold=True)
-
-    algo = algorithm.casefold()
-    if algo == "sha1":
-        digestmod = hashlib.sha1
-    elif algo == "sha256":
-        digestmod = hashlib.sha256
-    elif algo == "sha512":
-        digestmod = hashlib.sha512
-    else:
-        raise ValueError("Unsupported algorithm")
-
-    msg = struct.pack(">Q", counter)
-    h = hmac.new(key, msg, digestmod).digest()
-    offset = h[-1] & 0x0F
-    code = (struct.unpack(">I", h[offset : offset + 4])[0] & 0x7FFFFFFF) % (10**digits)
-
-    return str(code).zfill(digits)
+    return generate_specs(key_specs(entries), timestamp, use_numpy)
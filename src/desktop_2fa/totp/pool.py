@@ -0,0 +1,102 @@
+"""Process-pool backend for bulk TOTP generation."""
+
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Optional, Sequence
+
+from .generator import KeySpec, TotpParams, generate_specs, key_specs
+
+# Below this many entries the pool's IPC overhead outweighs the extra cores
+# and codes are computed in-process.
+POOL_MIN_ENTRIES = 20_000
+
+# Number of tasks per worker each call is split into, for load balancing.
+CHUNKS_PER_WORKER = 4
+
+# Decoded secrets of the current worker process, set once by _init_worker.
+_worker_specs: Sequence[KeySpec] = ()
+
+
+def _init_worker(specs: Sequence[KeySpec]) -> None:
+    global _worker_specs
+    _worker_specs = specs
+
+
+def _generate_chunk(start: int, stop: int, timestamp: int) -> list[str]:
+    return generate_specs(_worker_specs[start:stop], timestamp)
+
+
+class BulkGenerator:
+    """Generates codes for a fixed, large set of entries repeatedly.
+
+    Secrets are decoded once. For sets of at least ``threshold`` entries a
+    ProcessPoolExecutor is started whose workers receive all decoded
+    secrets exactly once, in their initializer; every codes_at() call then
+    only ships (start, stop, timestamp) triples and the resulting codes.
+    Smaller sets, or workers=1, stay in-process.
+
+    Use as a context manager (or call close()) to shut the pool down.
+    """
+
+    def __init__(
+        self,
+        entries: Iterable[TotpParams],
+        workers: Optional[int] = None,
+        threshold: int = POOL_MIN_ENTRIES,
+    ):
+        """Prepare the entry set.
+
+        Args:
+            entries: Objects with secret, digits, period and algorithm.
+            workers: Number of worker processes (defaults to the CPU count).
+            threshold: Minimum number of entries before a pool is used.
+        """
+        self._specs = key_specs(entries)
+        self.workers = workers or os.cpu_count() or 1
+        self.use_pool = self.workers > 1 and len(self._specs) >= threshold
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def __len__(self) -> int:
+        return len(self._specs)
+
+    def __enter__(self) -> "BulkGenerator":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self._specs,),
+            )
+        return self._executor
+
+    def codes_at(self, timestamp: int | None = None) -> list[str]:
+        """Return the codes of all entries at a timestamp, in entry order."""
+        if timestamp is None:
+            timestamp = int(time.time())
+        if not self.use_pool:
+            return generate_specs(self._specs, timestamp)
+
+        n = len(self._specs)
+        chunk = math.ceil(n / (self.workers * CHUNKS_PER_WORKER))
+        pool = self._pool()
+        futures = [
+            pool.submit(_generate_chunk, start, min(start + chunk, n), timestamp)
+            for start in range(0, n, chunk)
+        ]
+        codes: list[str] = []
+        for future in futures:
+            codes.extend(future.result())
+        return codes
+
+    def close(self) -> None:
+        """Shut down the worker processes, if any were started."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
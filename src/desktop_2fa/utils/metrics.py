@@ -0,0 +1,315 @@
+"""Counters, gauges and histograms emitted by the vault through hooks.
+
+Library code reports measurements with ``inc``, ``set_gauge`` and
+``observe``. They are forwarded to every registered hook and cost a single
+list check while none is registered, so the vault stays instrumented
+permanently. ``OpenMetricsExporter`` is a built-in hook that accumulates
+the measurements across runs in an OpenMetrics text file, suitable for
+node_exporter's textfile collector.
+"""
+
+import math
+import os
+import re
+from bisect import bisect_left
+from pathlib import Path
+from typing import Optional, Protocol
+
+METRICS_FILE_ENV = "DESKTOP_2FA_METRICS_FILE"
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = tuple(float(1024 * 4**i) for i in range(9))  # 1 KiB .. 64 MiB
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class MetricsHook(Protocol):
+    """Receiver of the measurements reported through this module."""
+
+    def inc(self, name: str, value: float, labels: dict[str, str]) -> None:
+        """Add value to a counter."""
+
+    def set_gauge(self, name: str, value: float, labels: dict[str, str]) -> None:
+        """Set a gauge to value."""
+
+    def observe(self, name: str, value: float, labels: dict[str, str]) -> None:
+        """Record one sample of a histogram."""
+
+
+_hooks: list[MetricsHook] = []
+
+
+def register(hook: MetricsHook) -> None:
+    """Start forwarding measurements to hook."""
+    if hook not in _hooks:
+        _hooks.append(hook)
+
+
+def unregister(hook: MetricsHook) -> None:
+    """Stop forwarding measurements to hook; unknown hooks are ignored."""
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def enabled() -> bool:
+    """Return True if any hook is registered."""
+    return bool(_hooks)
+
+
+def inc(name: str, value: float = 1.0, **labels: str) -> None:
+    """Add value to the counter name."""
+    for hook in _hooks:
+        hook.inc(name, value, labels)
+
+
+def set_gauge(name: str, value: float, **labels: str) -> None:
+    """Set the gauge name to value."""
+    for hook in _hooks:
+        hook.set_gauge(name, value, labels)
+
+
+def observe(name: str, value: float, **labels: str) -> None:
+    """Record a sample of the histogram name."""
+    for hook in _hooks:
+        hook.observe(name, value, labels)
+
+
+def default_buckets(name: str) -> tuple[float, ...]:
+    """Pick histogram bucket bounds from the metric's unit suffix."""
+    return BYTES_BUCKETS if name.endswith("_bytes") else SECONDS_BUCKETS
+
+
+class _Histogram:
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        # One slot per bound plus +Inf; counts are per bucket, not cumulative.
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def merge(self, other: "_Histogram") -> None:
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.sum += other.sum
+
+
+_SAMPLE_RE = re.compile(r"^([a-zA-Z_:][\w:]*)(?:\{(.*)\})?\s+(\S+)")
+_LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def _key(labels: dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _unescape(value: str) -> str:
+    return re.sub(r"\\(.)", lambda m: "\n" if m[1] == "n" else m[1], value)
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _format_number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(int(value)) if value == int(value) else repr(value)
+
+
+class OpenMetricsExporter:
+    """Hook that accumulates measurements in an OpenMetrics text file.
+
+    Measurements are kept in memory until flush(), which adds them to the
+    counters and histograms already in the file, replaces gauges and
+    rewrites the file atomically. Concurrent flushes from separate
+    processes may lose one process's increments.
+    """
+
+    def __init__(self, path: str | Path):
+        """Initialize the exporter.
+
+        Args:
+            path: File the metrics are written to.
+        """
+        self.path = Path(path)
+        self._counters: dict[str, dict[Labels, float]] = {}
+        self._gauges: dict[str, dict[Labels, float]] = {}
+        self._histograms: dict[str, dict[Labels, _Histogram]] = {}
+
+    def inc(self, name: str, value: float, labels: dict[str, str]) -> None:
+        """Add value to a counter."""
+        series = self._counters.setdefault(name, {})
+        key = _key(labels)
+        series[key] = series.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, labels: dict[str, str]) -> None:
+        """Set a gauge to value."""
+        self._gauges.setdefault(name, {})[_key(labels)] = value
+
+    def observe(self, name: str, value: float, labels: dict[str, str]) -> None:
+        """Record one sample of a histogram."""
+        series = self._histograms.setdefault(name, {})
+        key = _key(labels)
+        if key not in series:
+            series[key] = _Histogram(default_buckets(name))
+        series[key].observe(value)
+
+    def flush(self) -> None:
+        """Merge the pending measurements into the file and clear them.
+
+        Raises:
+            OSError: If the file cannot be written.
+        """
+        if not (self._counters or self._gauges or self._histograms):
+            return
+        counters, gauges, histograms = self._read()
+        for name, series in self._counters.items():
+            merged = counters.setdefault(name, {})
+            for key, value in series.items():
+                merged[key] = merged.get(key, 0.0) + value
+        for name, series in self._gauges.items():
+            gauges.setdefault(name, {}).update(series)
+        for name, hseries in self._histograms.items():
+            hmerged = histograms.setdefault(name, {})
+            for key, hist in hseries.items():
+                old = hmerged.get(key)
+                # Series recorded with other bucket bounds cannot be merged
+                # and are started afresh.
+                if old is not None and old.bounds == hist.bounds:
+                    old.merge(hist)
+                else:
+                    hmerged[key] = hist
+
+        text = self._render(counters, gauges, histograms)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        temp_path.write_text(text, encoding="utf-8")
+        os.replace(temp_path, self.path)
+
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+
+    def _read(
+        self,
+    ) -> tuple[
+        dict[str, dict[Labels, float]],
+        dict[str, dict[Labels, float]],
+        dict[str, dict[Labels, _Histogram]],
+    ]:
+        """Parse a file previously written by this exporter.
+
+        A missing or unreadable file is treated as empty.
+        """
+        counters: dict[str, dict[Labels, float]] = {}
+        gauges: dict[str, dict[Labels, float]] = {}
+        buckets: dict[str, dict[Labels, list[tuple[float, float]]]] = {}
+        sums: dict[str, dict[Labels, float]] = {}
+        types: dict[str, str] = {}
+        try:
+            text = self.path.read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            text = ""
+
+        for line in text.splitlines():
+            if line.startswith("# TYPE "):
+                parts = line.split()
+                if len(parts) == 4:
+                    types[parts[2]] = parts[3]
+                continue
+            match = _SAMPLE_RE.match(line)
+            if not match:
+                continue
+            sample, raw_labels, raw_value = match.groups()
+            try:
+                value = float(raw_value)
+            except ValueError:
+                continue
+            labels = dict(
+                (k, _unescape(v)) for k, v in _LABEL_RE.findall(raw_labels or "")
+            )
+
+            if sample.endswith("_total") and types.get(sample[:-6]) == "counter":
+                counters.setdefault(sample[:-6], {})[_key(labels)] = value
+            elif types.get(sample) == "gauge":
+                gauges.setdefault(sample, {})[_key(labels)] = value
+            elif sample.endswith("_bucket") and "le" in labels:
+                name = sample[:-7]
+                le = float(labels.pop("le"))
+                buckets.setdefault(name, {}).setdefault(_key(labels), []).append(
+                    (le, value)
+                )
+            elif sample.endswith("_sum") and types.get(sample[:-4]) == "histogram":
+                sums.setdefault(sample[:-4], {})[_key(labels)] = value
+
+        histograms: dict[str, dict[Labels, _Histogram]] = {}
+        for name, series in buckets.items():
+            if types.get(name) != "histogram":
+                continue
+            for key, points in series.items():
+                points.sort()
+                hist = _Histogram(tuple(le for le, _ in points if not math.isinf(le)))
+                if len(hist.counts) != len(points):
+                    continue
+                previous = 0.0
+                for i, (_, cumulative) in enumerate(points):
+                    hist.counts[i] = int(cumulative - previous)
+                    previous = cumulative
+                hist.sum = sums.get(name, {}).get(key, 0.0)
+                histograms.setdefault(name, {})[key] = hist
+        return counters, gauges, histograms
+
+    @staticmethod
+    def _render(
+        counters: dict[str, dict[Labels, float]],
+        gauges: dict[str, dict[Labels, float]],
+        histograms: dict[str, dict[Labels, _Histogram]],
+    ) -> str:
+        lines: list[str] = []
+
+        def unit(name: str) -> None:
+            for suffix in ("seconds", "bytes"):
+                if name.endswith("_" + suffix):
+                    lines.append(f"# UNIT {name} {suffix}")
+
+        for name in sorted(counters):
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(counters[name].items()):
+                lines.append(
+                    f"{name}_total{_format_labels(key)} {_format_number(value)}"
+                )
+        for name in sorted(gauges):
+            lines.append(f"# TYPE {name} gauge")
+            unit(name)
+            for key, value in sorted(gauges[name].items()):
+                lines.append(f"{name}{_format_labels(key)} {_format_number(value)}")
+        for name in sorted(histograms):
+            lines.append(f"# TYPE {name} histogram")
+            unit(name)
+            for key, hist in sorted(histograms[name].items()):
+                cumulative = 0
+                for bound, count in zip((*hist.bounds, math.inf), hist.counts):
+                    cumulative += count
+                    labels = _format_labels((*key, ("le", _format_number(bound))))
+                    lines.append(f"{name}_bucket{labels} {cumulative}")
+                lines.append(
+                    f"{name}_sum{_format_labels(key)} {_format_number(hist.sum)}"
+                )
+                lines.append(f"{name}_count{_format_labels(key)} {cumulative}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+def exporter_from_env() -> Optional[OpenMetricsExporter]:
+    """Return an exporter for the file named in the environment, if any."""
+    path = os.getenv(METRICS_FILE_ENV)
+    if not path:
+        return None
+    return OpenMetricsExporter(path)
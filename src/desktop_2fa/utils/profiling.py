@@ -0,0 +1,156 @@
+"""Lightweight phase timing used by the CLI's --profile option.
+
+Code marks interesting regions with ``phase("name")``. Unless a Profiler
+has been activated this is a no-op costing one global lookup, so library
+code can stay instrumented permanently.
+"""
+
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional
+
+
+def _max_rss_kib() -> Optional[int]:
+    """Return the process's peak resident set size in KiB, if known."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+@dataclass
+class PhaseRecord:
+    """Timing and memory figures for one completed phase.
+
+    Attributes:
+        name: Slash-separated path of the phase, e.g. "vault.load/derive_key".
+        depth: Nesting level, 0 for top-level phases.
+        elapsed_ms: Wall time spent in the phase.
+        peak_heap_kib: Highest Python heap usage seen during the phase
+            (tracemalloc; excludes memory allocated by C libraries).
+        max_rss_kib: Process peak RSS when the phase ended, which does
+            include C allocations such as Argon2's memory.
+    """
+
+    name: str
+    depth: int
+    elapsed_ms: float = 0.0
+    peak_heap_kib: int = 0
+    max_rss_kib: Optional[int] = None
+    _start: float = field(default=0.0, repr=False)
+    _peak: int = field(default=0, repr=False)
+
+
+class Profiler:
+    """Collects nested phase timings and peak memory."""
+
+    def __init__(self, trace_memory: bool = True):
+        """Create an inactive profiler.
+
+        Args:
+            trace_memory: Track Python heap peaks with tracemalloc. This
+                slows allocation-heavy code noticeably.
+        """
+        self.trace_memory = trace_memory
+        self.records: list[PhaseRecord] = []
+        self._stack: list[PhaseRecord] = []
+        self._started_tracing = False
+
+    def start(self) -> None:
+        """Make this the active profiler."""
+        global _active
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        _active = self
+
+    def stop(self) -> None:
+        """Deactivate the profiler and stop memory tracing it started."""
+        global _active
+        if _active is self:
+            _active = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _heap_peak(self) -> int:
+        return tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as a child of the current phase."""
+        # tracemalloc has a single global peak: fold it into the enclosing
+        # phases before resetting it for this one.
+        peak = self._heap_peak()
+        for parent in self._stack:
+            parent._peak = max(parent._peak, peak)
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+
+        if self._stack:
+            name = f"{self._stack[-1].name}/{name}"
+        record = PhaseRecord(name=name, depth=len(self._stack))
+        self.records.append(record)
+        self._stack.append(record)
+        record._start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record.elapsed_ms = (time.perf_counter() - record._start) * 1000
+            self._stack.pop()
+            peak = self._heap_peak()
+            for r in (record, *self._stack):
+                r._peak = max(r._peak, peak)
+            record.peak_heap_kib = record._peak // 1024
+            record.max_rss_kib = _max_rss_kib()
+
+    def report(self) -> dict[str, Any]:
+        """Return the collected phases as a JSON-serializable dict."""
+        return {
+            "phases": [
+                {
+                    "name": r.name,
+                    "elapsed_ms": round(r.elapsed_ms, 3),
+                    "peak_heap_kib": r.peak_heap_kib,
+                    "max_rss_kib": r.max_rss_kib,
+                }
+                for r in self.records
+            ],
+            "max_rss_kib": _max_rss_kib(),
+        }
+
+    def format_text(self) -> str:
+        """Render the phases as an indented table."""
+        lines = [f"{'phase':<32} {'ms':>10} {'heap KiB':>10} {'RSS KiB':>10}"]
+        for r in self.records:
+            label = "  " * r.depth + r.name.rsplit("/", 1)[-1]
+            rss = "-" if r.max_rss_kib is None else str(r.max_rss_kib)
+            lines.append(
+                f"{label:<32} {r.elapsed_ms:>10.2f} {r.peak_heap_kib:>10} {rss:>10}"
+            )
+        return "\n".join(lines)
+
+    def format_json(self) -> str:
+        """Render the report as a single JSON document."""
+        return json.dumps(self.report())
+
+
+_active: Optional[Profiler] = None
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Record the enclosed block on the active profiler, if any."""
+    profiler = _active
+    if profiler is None:
+        yield
+        return
+    with profiler.phase(name):
+        yield
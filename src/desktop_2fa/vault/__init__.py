@@ -1,6 +1,26 @@
 """Desktop 2FA vault management package."""
 
-from .models import TotpEntry, VaultData
-from .vault import Vault
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .models import TotpEntry, VaultData
+    from .vault import Vault
+
+# The models pull in pydantic and the vault the crypto backends, so they are
+# imported on first use to keep CLI startup (--version, --help) fast.
+_LAZY = {
+    "TotpEntry": ".models",
+    "VaultData": ".models",
+    "Vault": ".vault",
+}
 
 __all__ = ["TotpEntry", "VaultData", "Vault"]
+
+
+def __getattr__(name: str) -> Any:
+    """Import the models and vault modules on first attribute access."""
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+
+    return getattr(importlib.import_module(_LAZY[name], __name__), name)
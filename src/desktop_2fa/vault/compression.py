@@ -0,0 +1,76 @@
+"""Optional compression of the vault payload before encryption."""
+
+import importlib
+import zlib
+from functools import lru_cache
+from typing import Any
+
+NONE = "none"
+ZLIB = "zlib"
+ZSTD = "zstd"
+
+# Codec ids as recorded in the vault header.
+CODECS = {NONE: 0, ZLIB: 1, ZSTD: 2}
+CODEC_NAMES = {code: name for name, code in CODECS.items()}
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+@lru_cache(maxsize=1)
+def _zstd() -> Any:
+    """Import zstandard on first use, returning None if it is not installed."""
+    try:
+        return importlib.import_module("zstandard")
+    except ImportError:
+        return None
+
+
+def available() -> list[str]:
+    """Return the codecs usable in this environment."""
+    return [name for name in CODECS if name != ZSTD or _zstd() is not None]
+
+
+def check(codec: str) -> None:
+    """Make sure a codec is known and usable.
+
+    Raises:
+        ValueError: If the codec is unknown or its module is not installed.
+    """
+    if codec not in CODECS:
+        raise ValueError(f"Unknown compression codec: {codec!r}")
+    if codec == ZSTD and _zstd() is None:
+        raise ValueError("zstd compression requires the 'zstd' extra (zstandard)")
+
+
+def compress(codec: str, data: bytes) -> bytes:
+    """Compress a payload with the given codec."""
+    check(codec)
+    if codec == ZLIB:
+        return zlib.compress(data, ZLIB_LEVEL)
+    if codec == ZSTD:
+        compressed: bytes = _zstd().ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+        return compressed
+    return data
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    """Reverse compress().
+
+    Raises:
+        ValueError: If the codec is unusable or the data does not decompress.
+    """
+    check(codec)
+    try:
+        if codec == ZLIB:
+            return zlib.decompress(data)
+        if codec == ZSTD:
+            zstd = _zstd()
+            try:
+                decompressed: bytes = zstd.ZstdDecompressor().decompress(data)
+            except zstd.ZstdError as e:
+                raise ValueError(str(e)) from e
+            return decompressed
+    except zlib.error as e:
+        raise ValueError(str(e)) from e
+    return data
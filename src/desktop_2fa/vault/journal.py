@@ -0,0 +1,259 @@
+"""Append-only journal of vault mutations.
+
+add_entry, remove_entry and rename_entry can be persisted by appending a
+record to a journal next to the vault file instead of rewriting the vault.
+Vault.load replays the journal, and Vault.save compacts it into the vault
+file once it grows past COMPACT_BYTES. Layout (little-endian):
+
+    journal  magic:4 version:u8 vault_sha256:32 record*
+    record   size:u32 sealed
+    sealed   AES-GCM(seq:u32 op:u8 body)
+
+vault_sha256 is the SHA-256 of the vault file the journal applies to, so a
+journal left behind by a compaction that was interrupted after the vault was
+replaced is recognised as stale and ignored. Records are sealed under a key
+derived from the vault key and that digest, and numbered from 0, so they
+cannot be moved between journals, reordered or dropped from the middle.
+A record cut short by a crash while appending is discarded. A record that
+fails authentication ends the journal: the records before it still apply,
+and the journal as read is copied to <journal>.corrupt before being cut
+back to them, so one damaged record never locks the vault. Records are not
+bound to a total count, so trailing records deleted from the file cannot be
+detected.
+
+The body of an ADD record is the binary payload (see payload.py) of the one
+entry added; REMOVE and RENAME carry the names passed to remove_entry and
+rename_entry as a payload.py text column. Replaying them in order against
+the vault file reproduces the vault the records were written from.
+"""
+
+import hashlib
+import os
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from ..crypto.aesgcm import decrypt, encrypt
+from . import payload
+from .models import TotpEntry, VaultData
+from .payload import _pack_text, _Reader
+from .segments import subkey
+
+JOURNAL_MAGIC = b"D2FJ"
+JOURNAL_VERSION = 1
+# Journal size past which Vault.save_changes() rewrites the vault instead.
+COMPACT_BYTES = 64 * 1024
+
+ADD = 1
+REMOVE = 2
+RENAME = 3
+
+_HEADER_LEN = len(JOURNAL_MAGIC) + 1 + hashlib.sha256().digest_size
+_U32 = struct.Struct("<I")
+_RECORD = struct.Struct("<IB")
+
+
+def journal_path(path: Path) -> Path:
+    """Return the journal file belonging to a vault file."""
+    return path.with_name(path.name + ".journal")
+
+
+def corrupt_path(path: Path) -> Path:
+    """Return where a journal with a damaged record is set aside."""
+    return path.with_name(path.name + ".corrupt")
+
+
+def file_stamp(st: os.stat_result) -> tuple[int, int, int]:
+    """Identify a version of a file cheaply, to notice it being replaced."""
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+@dataclass
+class Record:
+    """One journaled mutation.
+
+    Attributes:
+        op: ADD, REMOVE or RENAME.
+        entry: The entry added, for ADD.
+        names: The name removed, for REMOVE; old and new name, for RENAME.
+    """
+
+    op: int
+    entry: Optional[TotpEntry] = None
+    names: tuple[str, ...] = ()
+
+
+def encode_add(entry: TotpEntry) -> bytes:
+    return bytes([ADD]) + payload.encode(VaultData.model_construct(entries=[entry]))
+
+
+def encode_remove(name: str) -> bytes:
+    return bytes([REMOVE]) + _pack_text([name])
+
+
+def encode_rename(old: str, new: str) -> bytes:
+    return bytes([RENAME]) + _pack_text([old, new])
+
+
+def _decode(raw: bytes) -> Record:
+    op, body = raw[0], raw[1:]
+    if op == ADD:
+        entries = payload.decode(body).entries
+        if len(entries) != 1:
+            raise ValueError("Journal ADD record must hold one entry")
+        return Record(op, entry=entries[0])
+    if op in (REMOVE, RENAME):
+        n = 1 if op == REMOVE else 2
+        reader = _Reader(body)
+        names = tuple(reader.text(n))
+        if reader.offset != len(body):
+            raise ValueError("Trailing data in journal record")
+        return Record(op, names=names)
+    raise ValueError(f"Unknown journal record type {op}")
+
+
+@dataclass
+class Journal:
+    """The journal of one vault file, sealed under one vault key.
+
+    Attributes:
+        path: The journal file.
+        digest: SHA-256 of the vault file the journal applies to.
+        key: The key records are sealed under.
+        stamp: file_stamp() of the vault file.
+        seq: Number of records in the journal.
+        end: Length of the valid part of the journal file (0 if absent).
+        set_aside: Where read() copied the journal after finding a damaged
+            record, if it did.
+    """
+
+    path: Path
+    digest: bytes
+    key: bytes
+    stamp: tuple[int, int, int]
+    seq: int = 0
+    end: int = 0
+    set_aside: Optional[Path] = None
+
+    @classmethod
+    def for_vault(
+        cls,
+        path: Path,
+        vault_key: bytes,
+        vault_blob: bytes | memoryview,
+        st: os.stat_result,
+    ) -> "Journal":
+        """Create the journal of a vault file.
+
+        Args:
+            path: The vault file.
+            vault_key: The key the vault file is sealed with.
+            vault_blob: The contents of the vault file.
+            st: The vault file's stat result.
+        """
+        digest = hashlib.sha256(vault_blob).digest()
+        return cls(
+            journal_path(path),
+            digest,
+            subkey(vault_key, b"d2fa journal" + digest),
+            file_stamp(st),
+        )
+
+    def _header(self) -> bytes:
+        return JOURNAL_MAGIC + bytes([JOURNAL_VERSION]) + self.digest
+
+    def read(self) -> list[Record]:
+        """Read the records that apply to the vault file.
+
+        A missing journal, or one written for another version of the vault
+        file, holds no records. Reading stops at the first record that fails
+        authentication, is out of sequence or is malformed; the journal is
+        then copied to corrupt_path() and truncated to the records before
+        it, and set_aside records the copy.
+
+        Raises:
+            OSError: If the journal cannot be read or set aside.
+        """
+        try:
+            with open(self.path, "rb") as f:
+                blob = f.read()
+        except FileNotFoundError:
+            return []
+        if blob[:_HEADER_LEN] != self._header():
+            return []
+
+        records: list[Record] = []
+        offset = _HEADER_LEN
+        while offset + _U32.size <= len(blob):
+            (size,) = _U32.unpack_from(blob, offset)
+            start = offset + _U32.size
+            if start + size > len(blob):
+                break
+            try:
+                records.append(self._open(blob[start : start + size], len(records)))
+            except ValueError:
+                self._set_aside(blob, offset)
+                break
+            offset = start + size
+        self.seq = len(records)
+        self.end = offset
+        return records
+
+    def _open(self, sealed: bytes, seq: int) -> Record:
+        raw = decrypt(self.key, sealed)
+        if len(raw) < _RECORD.size:
+            raise ValueError("Truncated journal record")
+        if _U32.unpack_from(raw)[0] != seq:
+            raise ValueError("Journal records are out of sequence")
+        return _decode(raw[_U32.size :])
+
+    def _set_aside(self, blob: bytes, end: int) -> None:
+        """Keep a copy of the journal, then cut it back to its valid part."""
+        self.set_aside = corrupt_path(self.path)
+        fd = os.open(str(self.set_aside), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(blob)
+            f.flush()
+            os.fsync(fd)
+        with open(self.path, "r+b") as f:
+            f.truncate(end)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def size_after(self, records: list[bytes]) -> int:
+        """Return the journal size once records are appended."""
+        overhead = _U32.size + _U32.size + 12 + 16  # size, seq, nonce, tag
+        return (self.end or _HEADER_LEN) + sum(len(r) + overhead for r in records)
+
+    def append(self, records: list[bytes]) -> None:
+        """Append encoded records and fsync the journal.
+
+        Anything after the valid part of the file, such as a record cut
+        short by an earlier crash, is overwritten.
+
+        Raises:
+            OSError: If the journal cannot be written.
+        """
+        chunks = [] if self.end else [self._header()]
+        for i, record in enumerate(records):
+            sealed = encrypt(self.key, _U32.pack(self.seq + i) + record)
+            chunks += [_U32.pack(len(sealed)), sealed]
+        data = b"".join(chunks)
+
+        fd = os.open(str(self.path), os.O_WRONLY | os.O_CREAT, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.truncate(self.end)
+            f.seek(self.end)
+            f.write(data)
+            f.flush()
+            os.fsync(fd)
+        self.seq += len(records)
+        self.end += len(data)
+
+    def discard(self) -> None:
+        """Delete the journal file once its records are in the vault file."""
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
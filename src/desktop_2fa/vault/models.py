@@ -1,14 +1,21 @@
 """Pydantic models for vault data structures."""
 
 import base64
+import uuid
 from typing import Literal, Optional
 
 from pydantic import BaseModel, Field, field_validator
 
 
+def new_entry_id() -> str:
+    """Generate a random, stable identifier for a new entry."""
+    return uuid.uuid4().hex
+
+
 class TotpEntry(BaseModel):
     """Model for a TOTP entry in the vault."""
 
+    id: str = Field(default_factory=new_entry_id)
     issuer: Optional[str] = Field(None)
     account_name: Optional[str] = Field(None)
     secret: str = Field(...)
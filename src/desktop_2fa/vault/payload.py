@@ -0,0 +1,268 @@
+"""Compact binary encoding of the vault payload.
+
+The payload is column oriented so that encoding and decoding are a few
+bulk operations per field rather than per-entry work (little-endian,
+``n`` entries, text columns as described below):
+
+    header     version:u8 flags:u8 data_version:u32 n:u32
+    entry      flags[n]:u8 algorithm[n]:u8 digits[n]:u8 period[n]:u32
+    id         n * 16 raw bytes if every id is a UUID hex string, else text
+    issuer     text
+    account    text
+    secret     pad[n]:u8 length[n]:u32 raw_size:u32 raw text_size:u32 text
+
+A text column is ``length[n]:u32 size:u32 utf8`` with lengths counted in
+characters. Secrets in upper-case Base32 (``=`` padding only at the end)
+are stored as the raw bytes of their 8-character blocks, with ``pad``
+recording how many trailing ``=`` to restore; any other secret is kept as
+text, so every entry round-trips exactly.
+"""
+
+import base64
+import re
+import struct
+from itertools import accumulate, chain
+from typing import Any, Optional
+
+from .models import TotpEntry, VaultData
+
+PAYLOAD_VERSION = 1
+
+_HEADER = struct.Struct("<BBII")
+_U32 = struct.Struct("<I")
+
+# Payload flags.
+_RAW_IDS = 0x01
+
+# Entry flags.
+_NO_ISSUER = 0x01
+_NO_ACCOUNT = 0x02
+_RAW_SECRET = 0x04
+
+ALGORITHMS = ("SHA1", "SHA256", "SHA512")
+_ALGORITHM_CODES = {name: code for code, name in enumerate(ALGORITHMS)}
+_DIGITS = frozenset((6, 7, 8))
+
+_HEX = re.compile(r"[0-9a-f]*")
+_B32 = re.compile(r"[A-Z2-7]*")
+_BLOCKS = re.compile(r"[A-Z2-7]*={0,7}")
+# Base32 digits to the digits int() uses for base 32; padding becomes zero.
+_B32_TO_INT = str.maketrans(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZ234567=", "0123456789ABCDEFGHIJKLMNOPQRSTUV0"
+)
+
+# Every field of a decoded entry is overwritten, so the template's values
+# never show through.
+_TEMPLATE = TotpEntry.model_construct(secret="")
+
+
+def _entry(values: dict[str, Any]) -> TotpEntry:
+    # The payload was authenticated by AES-GCM and was produced from
+    # validated entries, so no validation is needed. model_copy() of a
+    # template skips the per-field default and alias handling of
+    # model_construct(), which costs more than the rest of decoding.
+    return _TEMPLATE.model_copy(update=values)
+
+
+def _pack_lengths(values: list[str]) -> bytes:
+    return struct.pack(f"<{len(values)}I", *map(len, values))
+
+
+def _pack_blob(blob: bytes) -> bytes:
+    return _U32.pack(len(blob)) + blob
+
+
+def _pack_text(values: list[str]) -> bytes:
+    return _pack_lengths(values) + _pack_blob("".join(values).encode("utf-8"))
+
+
+def _pack_ids(ids: list[str]) -> tuple[bool, bytes]:
+    """Pack an id column, as raw bytes if every id is a UUID hex string.
+
+    Returns whether the ids were packed raw, and the packed column.
+    """
+    if set(map(len, ids)) <= {32} and _HEX.fullmatch("".join(ids)):
+        return True, bytes.fromhex("".join(ids))
+    return False, _pack_text(ids)
+
+
+def _b32blocks(blocks: str) -> bytes:
+    # int() parses power-of-two bases in linear time, which is far faster
+    # than base64.b32decode's per-block loop.
+    if not blocks:
+        return b""
+    return int(blocks.translate(_B32_TO_INT), 32).to_bytes(len(blocks) * 5 // 8, "big")
+
+
+def _split_secrets(secrets: list[str]) -> tuple[list[bool], bytes, str, str]:
+    """Pick the secrets stored as raw blocks.
+
+    Returns the raw flag and trailing padding of each secret, plus the
+    concatenated raw and text secrets.
+    """
+    joined = "".join(secrets)
+    if {len(s) % 8 for s in secrets} <= {0} and _B32.fullmatch(joined):
+        return [True] * len(secrets), bytes(len(secrets)), joined, ""
+    raw = [len(s) % 8 == 0 and _BLOCKS.fullmatch(s) is not None for s in secrets]
+    pads = bytes(len(s) - len(s.rstrip("=")) if r else 0 for s, r in zip(secrets, raw))
+    blocks = "".join(s for s, r in zip(secrets, raw) if r)
+    text = "".join(s for s, r in zip(secrets, raw) if not r)
+    return raw, pads, blocks, text
+
+
+def encode(data: VaultData) -> bytes:
+    """Serialize vault data to the binary payload."""
+    entries = data.entries
+    n = len(entries)
+    ids = [e.id for e in entries]
+    issuers = [e.issuer for e in entries]
+    accounts = [e.account_name for e in entries]
+    secrets = [e.secret for e in entries]
+
+    raw_ids, packed_ids = _pack_ids(ids)
+    raw_secrets, pads, blocks, text_secrets = _split_secrets(secrets)
+    flags = bytes(
+        (issuer is None) * _NO_ISSUER
+        | (account is None) * _NO_ACCOUNT
+        | raw * _RAW_SECRET
+        for issuer, account, raw in zip(issuers, accounts, raw_secrets)
+    )
+
+    return b"".join(
+        (
+            _HEADER.pack(PAYLOAD_VERSION, _RAW_IDS if raw_ids else 0, data.version, n),
+            flags,
+            bytes([_ALGORITHM_CODES[e.algorithm] for e in entries]),
+            bytes([e.digits for e in entries]),
+            struct.pack(f"<{n}I", *[e.period for e in entries]),
+            packed_ids,
+            _pack_text([i or "" for i in issuers]),
+            _pack_text([a or "" for a in accounts]),
+            pads,
+            _pack_lengths(secrets),
+            _pack_blob(_b32blocks(blocks)),
+            _pack_blob(text_secrets.encode("utf-8")),
+        )
+    )
+
+
+class _Reader:
+    def __init__(self, raw: bytes) -> None:
+        self.view = memoryview(raw)
+        self.offset = 0
+
+    def take(self, size: int) -> memoryview:
+        end = self.offset + size
+        if end > len(self.view):
+            raise ValueError("Truncated vault payload")
+        chunk = self.view[self.offset : end]
+        self.offset = end
+        return chunk
+
+    def u32s(self, n: int) -> tuple[int, ...]:
+        return struct.unpack(f"<{n}I", self.take(4 * n))
+
+    def blob(self) -> memoryview:
+        (size,) = _U32.unpack(self.take(4))
+        return self.take(size)
+
+    def text(self, n: int) -> list[str]:
+        lengths = self.u32s(n)
+        return _split(str(self.blob(), "utf-8"), lengths)
+
+    def ids(self, n: int, raw: bool) -> list[str]:
+        """Read an id column written by _pack_ids."""
+        if not raw:
+            return self.text(n)
+        hex_ids = self.take(16 * n).hex()
+        return [hex_ids[i : i + 32] for i in range(0, 32 * n, 32)]
+
+
+def _split(text: str, lengths: tuple[int, ...]) -> list[str]:
+    ends = list(accumulate(lengths))
+    if (ends[-1] if ends else 0) != len(text):
+        raise ValueError("Inconsistent text column in vault payload")
+    return [text[a:b] for a, b in zip(chain((0,), ends), ends)]
+
+
+def _secrets(
+    flags: bytes, pads: bytes, lengths: tuple[int, ...], blocks: str, text: str
+) -> list[str]:
+    if not text and not any(pads):
+        return _split(blocks, lengths)
+    secrets = []
+    block_pos = text_pos = 0
+    for f, pad, length in zip(flags, pads, lengths):
+        if f & _RAW_SECRET:
+            end = block_pos + length
+            secret = blocks[block_pos:end]
+            block_pos = end
+            if pad:
+                secret = secret[:-pad] + "=" * pad
+        else:
+            end = text_pos + length
+            secret = text[text_pos:end]
+            text_pos = end
+        secrets.append(secret)
+    if block_pos != len(blocks) or text_pos != len(text):
+        raise ValueError("Inconsistent secret column in vault payload")
+    return secrets
+
+
+def decode(raw: bytes) -> VaultData:
+    """Deserialize a binary payload.
+
+    The payload is authenticated by AES-GCM before it gets here, so fields
+    are range-checked but entries are built without pydantic validation.
+
+    Raises:
+        ValueError: If the payload is malformed.
+    """
+    reader = _Reader(raw)
+    version, payload_flags, data_version, n = _HEADER.unpack(reader.take(_HEADER.size))
+    if version != PAYLOAD_VERSION:
+        raise ValueError(f"Unsupported vault payload version {version}")
+
+    flags = bytes(reader.take(n))
+    try:
+        algorithms = [ALGORITHMS[code] for code in reader.take(n)]
+    except IndexError:
+        raise ValueError("Unknown algorithm in vault payload") from None
+    digits = bytes(reader.take(n))
+    periods = reader.u32s(n)
+    if not _DIGITS.issuperset(digits) or (n and min(periods) == 0):
+        raise ValueError("Invalid entry parameters in vault payload")
+
+    ids = reader.ids(n, bool(payload_flags & _RAW_IDS))
+    issuers: list[Optional[str]] = list(reader.text(n))
+    accounts: list[Optional[str]] = list(reader.text(n))
+    pads = bytes(reader.take(n))
+    lengths = reader.u32s(n)
+    blocks = base64.b32encode(reader.blob()).decode("ascii")
+    secrets = _secrets(flags, pads, lengths, blocks, str(reader.blob(), "utf-8"))
+    if reader.offset != len(reader.view):
+        raise ValueError("Trailing data in vault payload")
+
+    for i, f in enumerate(flags):
+        if f & _NO_ISSUER:
+            issuers[i] = None
+        if f & _NO_ACCOUNT:
+            accounts[i] = None
+
+    entries = [
+        _entry(
+            {
+                "id": entry_id,
+                "issuer": issuer,
+                "account_name": account,
+                "secret": secret,
+                "digits": d,
+                "period": period,
+                "algorithm": algorithm,
+            }
+        )
+        for entry_id, issuer, account, secret, d, period, algorithm in zip(
+            ids, issuers, accounts, secrets, digits, periods, algorithms
+        )
+    ]
+    return VaultData.model_construct(version=data_version, entries=entries)
@@ -0,0 +1,173 @@
+"""In-memory search index over vault entry names."""
+
+import heapq
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from itertools import chain
+from typing import Iterable, NamedTuple
+
+from .models import TotpEntry
+
+# Score bands: every exact match outranks every prefix match, which
+# outranks every substring match, which outranks every fuzzy match.
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.8
+SUBSTRING_SCORE = 0.6
+FUZZY_SCORE = 0.5
+
+# Fuzzy matches need at least this trigram similarity (Jaccard index).
+MIN_FUZZY_SIMILARITY = 0.3
+
+
+class SearchHit(NamedTuple):
+    """A ranked search result."""
+
+    entry: TotpEntry
+    score: float
+
+
+def _trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """Prefix, substring and fuzzy lookup over issuer and account names.
+
+    Names are case-folded. Prefix queries use a sorted key list and
+    bisection; substring and fuzzy queries use a trigram inverted index
+    (names are padded so even one and two character queries produce
+    trigrams), so a query only touches entries sharing trigrams with it.
+    """
+
+    def __init__(self, entries: Iterable[TotpEntry]):
+        """Build the index.
+
+        Args:
+            entries: The entries to index; their order breaks score ties.
+        """
+        self._entries = list(entries)
+        self._keys: list[list[str]] = []
+        self._key_trigrams: dict[str, set[str]] = {}
+        self._sorted: list[tuple[str, int]] = []
+        self._postings: dict[str, set[int]] = {}
+        self._min_grams: list[int] = []
+        key_starts: list[int] = []
+        key_owners: list[int] = []
+        parts: list[str] = []
+        offset = 0
+
+        for i, entry in enumerate(self._entries):
+            keys = sorted(
+                {n.casefold() for n in (entry.issuer, entry.account_name) if n}
+            )
+            self._keys.append(keys)
+            grams: set[str] = set()
+            for key in keys:
+                self._sorted.append((key, i))
+                key_starts.append(offset)
+                key_owners.append(i)
+                parts.append(key)
+                offset += len(key) + 1
+                key_grams = self._key_trigrams.setdefault(key, _trigrams(key))
+                grams |= key_grams
+            self._min_grams.append(
+                min((len(self._key_trigrams[k]) for k in keys), default=0)
+            )
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(i)
+        self._sorted.sort()
+        # All keys joined by NULs, so substring search is a str.find() loop.
+        self._haystack = "\0".join(parts)
+        self._key_starts = key_starts
+        self._key_owners = key_owners
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _prefix(self, query: str) -> Iterable[int]:
+        pos = bisect_left(self._sorted, (query,))
+        while pos < len(self._sorted) and self._sorted[pos][0].startswith(query):
+            yield self._sorted[pos][1]
+            pos += 1
+
+    def _score(self, i: int, query: str, query_grams: set[str]) -> float:
+        best = 0.0
+        for key in self._keys[i]:
+            ratio = len(query) / len(key)
+            if key == query:
+                return EXACT_SCORE
+            if key.startswith(query):
+                best = max(best, PREFIX_SCORE + 0.1 * ratio)
+            elif query in key:
+                best = max(best, SUBSTRING_SCORE + 0.1 * ratio)
+            else:
+                key_grams = self._key_trigrams[key]
+                shared = len(query_grams & key_grams)
+                jaccard = shared / (len(query_grams) + len(key_grams) - shared)
+                if jaccard >= MIN_FUZZY_SIMILARITY:
+                    best = max(best, FUZZY_SCORE * jaccard)
+        return best
+
+    def search(
+        self, query: str, fuzzy: bool = True, limit: int | None = None
+    ) -> list[SearchHit]:
+        """Find entries whose issuer or account name matches the query.
+
+        Args:
+            query: The text to look for (case-insensitive).
+            fuzzy: Also return approximate matches (typos, transpositions).
+            limit: Maximum number of hits to return.
+
+        Returns:
+            Hits ordered by descending score, then by entry order.
+        """
+        query = query.casefold()
+        if not query:
+            return []
+        query_grams = _trigrams(query)
+
+        candidates = set(self._prefix(query))
+        if "\0" not in query:
+            candidates.update(self._containing(query))
+        threshold = SUBSTRING_SCORE
+        # Fuzzy matches always rank below substring matches, so they are
+        # only looked for when the better bands leave room in the limit.
+        if fuzzy and (limit is None or len(candidates) < limit):
+            candidates.update(self._similar(query_grams))
+            threshold = FUZZY_SCORE * MIN_FUZZY_SIMILARITY
+
+        scored = ((self._score(i, query, query_grams), i) for i in candidates)
+        hits = [(-score, i) for score, i in scored if score >= threshold]
+        if limit is not None and limit < len(hits):
+            hits = heapq.nsmallest(limit, hits)
+        else:
+            hits.sort()
+        return [SearchHit(self._entries[i], -score) for score, i in hits]
+
+    def _similar(self, query_grams: set[str]) -> Iterable[int]:
+        """Yield entries sharing enough trigrams to pass the fuzzy cutoff."""
+        # The trigrams an entry shares with the query bound the similarity
+        # of each of its names from above; entries whose bound falls short
+        # of the cutoff are dropped before scoring.
+        size = len(query_grams)
+        min_grams = self._min_grams
+        counts = Counter(
+            chain.from_iterable(self._postings.get(g, ()) for g in query_grams)
+        )
+        return (
+            i
+            for i, shared in counts.items()
+            if shared >= MIN_FUZZY_SIMILARITY * (size + min_grams[i] - shared)
+        )
+
+    def _containing(self, query: str) -> Iterable[int]:
+        """Yield entries with a name containing query as a substring."""
+        haystack, starts = self._haystack, self._key_starts
+        pos = haystack.find(query)
+        while pos >= 0:
+            key = bisect_right(starts, pos) - 1
+            yield self._key_owners[key]
+            if key + 1 == len(starts):
+                break
+            pos = haystack.find(query, starts[key + 1])
@@ -0,0 +1,488 @@
+"""Segmented vault body: an encrypted index plus individually encrypted pages.
+
+Entries are grouped into pages of up to PAGE_ENTRIES entries, each stored
+as the binary payload of its entries (see payload.py), compressed with the
+vault's codec and sealed with AES-GCM under a key derived from the vault
+key and the page id. The index, sealed under its own derived key, lists
+every entry's id, names and page in vault order, plus the length and
+SHA-256 of each page's ciphertext so pages cannot be swapped or rolled
+back. Body layout (little-endian):
+
+    body   index_size:u32 index page*
+    index  version:u8 flags:u8 data_version:u32 n_pages:u32 n_entries:u32
+           page_id[n_pages]:u32 size[n_pages]:u32 sha256[n_pages]:32
+           slot[n_entries]:u32 flags[n_entries]:u8 id issuer account
+
+with id, issuer and account as the id and text columns of payload.py and
+slot the position of the entry's page in the page table.
+
+Looking up, renaming or removing one entry decrypts the index and one
+page, and adding one decrypts at most the last page; the index is kept in
+hash maps, so none of them scans the entries. Saving re-encrypts
+only pages whose contents changed and copies the others verbatim.
+"""
+
+import hashlib
+import hmac
+import struct
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Optional, Union
+
+from ..crypto.aesgcm import decrypt, encrypt
+from . import compression, payload
+from .models import TotpEntry, VaultData, new_entry_id
+from .payload import _pack_ids, _pack_text, _Reader
+
+PAGE_ENTRIES = 64
+INDEX_VERSION = 1
+
+_U32 = struct.Struct("<I")
+_INDEX_HEADER = struct.Struct("<BBIII")
+_DIGEST_LEN = hashlib.sha256().digest_size
+
+# Index flags.
+_RAW_IDS = 0x01
+
+# Entry flags.
+_NO_ISSUER = 0x01
+_NO_ACCOUNT = 0x02
+
+
+def subkey(key: bytes, label: bytes) -> bytes:
+    """Derive a key for one part of the vault from the vault key.
+
+    This is HKDF-Expand (RFC 5869) for a single SHA-256 block, with the
+    Argon2id output as the pseudorandom key.
+    """
+    return hmac.digest(key, label + b"\x01", hashlib.sha256)
+
+
+def index_key(key: bytes) -> bytes:
+    return subkey(key, b"d2fa index")
+
+
+def page_key(key: bytes, page_id: int) -> bytes:
+    return subkey(key, b"d2fa page" + _U32.pack(page_id))
+
+
+def split_body(body: bytes | memoryview) -> tuple[memoryview, memoryview]:
+    """Split a segmented body into the sealed index and the page area.
+
+    Raises:
+        ValueError: If the body is truncated.
+    """
+    if len(body) < _U32.size:
+        raise ValueError("Segmented vault body is truncated")
+    (size,) = _U32.unpack_from(body)
+    end = _U32.size + size
+    if end > len(body):
+        raise ValueError("Segmented vault index is truncated")
+    view = memoryview(body)
+    return view[_U32.size : end], view[end:]
+
+
+@dataclass
+class Page:
+    """One sealed page as stored in the file."""
+
+    id: int
+    blob: bytes
+    # SHA-256 of the plaintext, known once the page has been decrypted.
+    digest: Optional[bytes] = None
+
+
+@dataclass
+class PageSet:
+    """The pages a vault was last loaded from or saved to.
+
+    Attributes:
+        key: The vault key the pages are sealed under.
+        codec: The compression codec of the pages.
+        pages: Pages by id.
+        page_of: Page id of every entry id.
+        written: Pages encrypted by the save that produced this set.
+    """
+
+    key: bytes
+    codec: str
+    pages: dict[int, Page] = field(default_factory=dict)
+    page_of: dict[str, int] = field(default_factory=dict)
+    written: int = 0
+
+
+# What a page should hold when sealing: a page kept as it is, or its entries.
+_PageContent = Union[Page, list[TotpEntry]]
+
+
+def _seal(
+    key: bytes,
+    codec: str,
+    data_version: int,
+    contents: dict[int, _PageContent],
+    previous: dict[int, Page],
+    ids: list[str],
+    issuers: list[Optional[str]],
+    accounts: list[Optional[str]],
+    page_ids: list[int],
+) -> tuple[bytes, PageSet]:
+    """Seal pages and the index into a body.
+
+    Args:
+        key: The vault key.
+        codec: The compression codec.
+        data_version: VaultData.version to record in the index.
+        contents: What each page id should hold; empty pages are dropped.
+        previous: Pages as last sealed under key and codec, whose
+            ciphertext is reused when a page's plaintext is unchanged.
+        ids, issuers, accounts, page_ids: Id, issuer, account name and
+            page id of every entry, in vault order.
+    """
+    pages = PageSet(key, codec)
+    for page_id in sorted(contents):
+        content = contents[page_id]
+        if isinstance(content, Page):
+            pages.pages[page_id] = content
+            continue
+        if not content:
+            continue
+        raw = payload.encode(VaultData.model_construct(entries=content))
+        digest = hashlib.sha256(raw).digest()
+        old = previous.get(page_id)
+        if old is not None and old.digest == digest:
+            blob = old.blob
+        else:
+            blob = encrypt(page_key(key, page_id), compression.compress(codec, raw))
+            pages.written += 1
+        pages.pages[page_id] = Page(page_id, blob, digest)
+
+    slots = {page_id: slot for slot, page_id in enumerate(pages.pages)}
+    blobs = [p.blob for p in pages.pages.values()]
+    pages.page_of = dict(zip(ids, page_ids))
+    raw_ids, packed_ids = _pack_ids(ids)
+    index = b"".join(
+        (
+            _INDEX_HEADER.pack(
+                INDEX_VERSION,
+                _RAW_IDS if raw_ids else 0,
+                data_version,
+                len(slots),
+                len(ids),
+            ),
+            struct.pack(f"<{len(slots)}I", *slots),
+            struct.pack(f"<{len(slots)}I", *map(len, blobs)),
+            b"".join(hashlib.sha256(blob).digest() for blob in blobs),
+            struct.pack(f"<{len(ids)}I", *map(slots.__getitem__, page_ids)),
+            bytes(
+                (issuer is None) * _NO_ISSUER | (account is None) * _NO_ACCOUNT
+                for issuer, account in zip(issuers, accounts)
+            ),
+            packed_ids,
+            _pack_text([i or "" for i in issuers]),
+            _pack_text([a or "" for a in accounts]),
+        )
+    )
+    sealed = encrypt(index_key(key), compression.compress(codec, index))
+    return b"".join([_U32.pack(len(sealed)), sealed, *blobs]), pages
+
+
+class Segments:
+    """Decrypted index of a segmented vault whose pages are read on demand.
+
+    Entries can be looked up, added, renamed and removed through the index,
+    decrypting only the pages involved; seal() then writes a new body that
+    reuses every other page as it is.
+    """
+
+    def __init__(self, raw: bytes, key: bytes, codec: str, area: memoryview):
+        """Parse a decrypted index.
+
+        Args:
+            raw: The decrypted, decompressed index.
+            key: The vault key.
+            codec: The compression codec of the pages.
+            area: The page area following the sealed index.
+
+        Raises:
+            ValueError: If the index is malformed or does not match the area.
+        """
+        reader = _Reader(raw)
+        version, index_flags, self.data_version, n_pages, n = _INDEX_HEADER.unpack(
+            reader.take(_INDEX_HEADER.size)
+        )
+        if version != INDEX_VERSION:
+            raise ValueError(f"Unsupported vault index version {version}")
+        page_ids = reader.u32s(n_pages)
+        sizes = reader.u32s(n_pages)
+        digests = bytes(reader.take(_DIGEST_LEN * n_pages))
+        slots = reader.u32s(n)
+        flags = bytes(reader.take(n))
+        ids = reader.ids(n, bool(index_flags & _RAW_IDS))
+        issuers: list[Optional[str]] = list(reader.text(n))
+        accounts: list[Optional[str]] = list(reader.text(n))
+        if reader.offset != len(reader.view):
+            raise ValueError("Trailing data in vault index")
+        if sum(sizes) != len(area):
+            raise ValueError("Vault pages do not match the index")
+        if n and max(slots) >= n_pages:
+            raise ValueError("Vault index refers to a missing page")
+        for i, f in enumerate(flags):
+            if f & _NO_ISSUER:
+                issuers[i] = None
+            if f & _NO_ACCOUNT:
+                accounts[i] = None
+
+        self.pages = PageSet(key, codec)
+        self._sealed_digests: dict[int, bytes] = {}
+        offset = 0
+        for i, (page_id, size) in enumerate(zip(page_ids, sizes)):
+            blob = bytes(area[offset : offset + size])
+            offset += size
+            self.pages.pages[page_id] = Page(page_id, blob)
+            self._sealed_digests[page_id] = digests[
+                i * _DIGEST_LEN : (i + 1) * _DIGEST_LEN
+            ]
+        entry_pages = [page_ids[slot] for slot in slots]
+        self.pages.page_of = dict(zip(ids, entry_pages))
+        if len(self.pages.page_of) != n:
+            raise ValueError("Duplicate entry id in vault index")
+
+        # The index: entry id -> (issuer, account name, page id) in vault
+        # order, id -> rank, name -> the earliest entry bearing it, and
+        # name -> ids for names several entries share.
+        self._rows = dict(zip(ids, zip(issuers, accounts, entry_pages)))
+        self._rank = dict(zip(ids, range(n)))
+        self._next_rank = n
+        self._by_name: dict[str, str] = {}
+        self._shared: dict[str, set[str]] = {}
+        # Entries come in rank order, so the first to claim a name is the
+        # earliest; this is _index_names() unrolled, as it runs per entry.
+        claim = self._by_name.setdefault
+        for entry_id, issuer, account in zip(ids, issuers, accounts):
+            if issuer is not None and claim(issuer, entry_id) != entry_id:
+                self._shared.setdefault(issuer, {self._by_name[issuer]}).add(entry_id)
+            if account is not None and claim(account, entry_id) != entry_id:
+                self._shared.setdefault(account, {self._by_name[account]}).add(entry_id)
+        # Entries per page id, and the highest page id in use.
+        self._occupancy = Counter(entry_pages)
+        self._last_page = max(self.pages.pages, default=-1)
+        # Decrypted pages, including ones added since the last seal:
+        # page id -> entry id -> entry.
+        self._cache: dict[int, dict[str, TotpEntry]] = {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _index_names(self, entry_id: str, *names: Optional[str]) -> None:
+        rank = self._rank[entry_id]
+        for name in names:
+            if name is None:
+                continue
+            holder = self._by_name.setdefault(name, entry_id)
+            if holder != entry_id:
+                self._shared.setdefault(name, {holder}).add(entry_id)
+                if rank < self._rank[holder]:
+                    self._by_name[name] = entry_id
+
+    def _unindex_names(self, entry_id: str, *names: Optional[str]) -> None:
+        for name in names:
+            if name is None:
+                continue
+            ids = self._shared.get(name)
+            if ids is None:
+                if self._by_name.get(name) == entry_id:
+                    del self._by_name[name]
+                continue
+            ids.discard(entry_id)
+            if self._by_name[name] == entry_id:
+                self._by_name[name] = min(ids, key=self._rank.__getitem__)
+            if len(ids) == 1:
+                del self._shared[name]
+
+    def _page(self, page_id: int) -> dict[str, TotpEntry]:
+        entries = self._cache.get(page_id)
+        if entries is not None:
+            return entries
+        page = self.pages.pages[page_id]
+        if not hmac.compare_digest(
+            hashlib.sha256(page.blob).digest(), self._sealed_digests[page_id]
+        ):
+            raise ValueError(f"Vault page {page_id} does not match the index")
+        raw = compression.decompress(
+            self.pages.codec, decrypt(page_key(self.pages.key, page_id), page.blob)
+        )
+        page.digest = hashlib.sha256(raw).digest()
+        entries = {e.id: e for e in payload.decode(raw).entries}
+        self._cache[page_id] = entries
+        return entries
+
+    def _entry(self, entry_id: str) -> TotpEntry:
+        try:
+            return self._page(self._rows[entry_id][2])[entry_id]
+        except KeyError:
+            raise ValueError("Vault index refers to a missing entry") from None
+
+    def find(self, name: str) -> Optional[TotpEntry]:
+        """Return the earliest entry whose issuer or account name is name.
+
+        Raises:
+            ValueError: If the entry's page is corrupted.
+        """
+        entry_id = self._by_name.get(name)
+        return None if entry_id is None else self._entry(entry_id)
+
+    def find_id(self, entry_id: str) -> Optional[TotpEntry]:
+        """Return the entry with the given id.
+
+        Raises:
+            ValueError: If the entry's page is corrupted.
+        """
+        return self._entry(entry_id) if entry_id in self._rows else None
+
+    def append(self, entry: TotpEntry) -> None:
+        """Add an entry to the last page, or to a new page if that is full.
+
+        Raises:
+            ValueError: If the last page is corrupted.
+        """
+        if entry.id in self._rows:
+            entry.id = new_entry_id()
+        last = self._last_page
+        if last < 0 or self._occupancy[last] >= PAGE_ENTRIES:
+            last = self._last_page = last + 1
+            self._cache[last] = {}
+        self._page(last)[entry.id] = entry
+        self._occupancy[last] += 1
+        self._rows[entry.id] = (entry.issuer, entry.account_name, last)
+        self._rank[entry.id] = self._next_rank
+        self._next_rank += 1
+        self._index_names(entry.id, entry.issuer, entry.account_name)
+
+    def remove(self, name: str) -> Optional[TotpEntry]:
+        """Remove the entry find(name) would return, if any.
+
+        Raises:
+            ValueError: If the entry's page is corrupted.
+        """
+        entry_id = self._by_name.get(name)
+        if entry_id is None:
+            return None
+        entry = self._entry(entry_id)
+        issuer, account, page_id = self._rows.pop(entry_id)
+        self._unindex_names(entry_id, issuer, account)
+        del self._rank[entry_id]
+        del self._cache[page_id][entry_id]
+        self._occupancy[page_id] -= 1
+        return entry
+
+    def rename(self, name: str, new: str) -> Optional[TotpEntry]:
+        """Set both names of the entry find(name) would return, if any.
+
+        Raises:
+            ValueError: If the entry's page is corrupted.
+        """
+        entry_id = self._by_name.get(name)
+        if entry_id is None:
+            return None
+        entry = self._entry(entry_id)
+        issuer, account, page_id = self._rows[entry_id]
+        self._unindex_names(entry_id, issuer, account)
+        entry.issuer = entry.account_name = new
+        self._rows[entry_id] = (new, new, page_id)
+        self._index_names(entry_id, new)
+        return entry
+
+    def seal(self) -> bytes:
+        """Write a body for the current entries under the key and codec loaded.
+
+        Pages never decrypted are copied as they are; decrypted ones are
+        re-encrypted only if their entries changed.
+        """
+        contents: dict[int, _PageContent] = dict(self.pages.pages)
+        for page_id, entries in self._cache.items():
+            contents[page_id] = list(entries.values())
+        rows = self._rows.values()
+        body, self.pages = _seal(
+            self.pages.key,
+            self.pages.codec,
+            self.data_version,
+            contents,
+            self.pages.pages,
+            list(self._rows),
+            [issuer for issuer, _, _ in rows],
+            [account for _, account, _ in rows],
+            [page_id for _, _, page_id in rows],
+        )
+        self._sealed_digests = {
+            page_id: hashlib.sha256(page.blob).digest()
+            for page_id, page in self.pages.pages.items()
+        }
+        self._cache = {
+            page_id: entries
+            for page_id, entries in self._cache.items()
+            if page_id in self.pages.pages
+        }
+        # Emptied pages were dropped; the next new page follows the others.
+        self._occupancy = +self._occupancy
+        self._last_page = max(self.pages.pages, default=-1)
+        return body
+
+    def materialize(self) -> VaultData:
+        """Decrypt every page and return the entries in vault order.
+
+        Raises:
+            ValueError: If a page is corrupted.
+        """
+        for page_id in self.pages.pages:
+            self._page(page_id)
+        return VaultData.model_construct(
+            version=self.data_version,
+            entries=[self._entry(entry_id) for entry_id in self._rows],
+        )
+
+
+def pack(
+    data: VaultData, key: bytes, codec: str, previous: Optional[PageSet]
+) -> tuple[bytes, PageSet]:
+    """Build a segmented body for the entries of data.
+
+    Entries keep the page they had in previous; new entries fill the last
+    page and then new ones. A page whose plaintext is unchanged and that is
+    sealed under the same key and codec is copied rather than re-encrypted.
+
+    Returns:
+        The body and the pages it holds, to pass as previous next time.
+    """
+    if previous is not None and (previous.key != key or previous.codec != codec):
+        previous = None
+    page_of = previous.page_of if previous is not None else {}
+
+    groups: dict[int, list[TotpEntry]] = {}
+    pending = []
+    for entry in data.entries:
+        page_id = page_of.get(entry.id)
+        if page_id is None:
+            pending.append(entry)
+        else:
+            groups.setdefault(page_id, []).append(entry)
+    next_id = max(groups, default=-1) + 1
+    last = max(groups) if groups else None
+    for entry in pending:
+        if last is None or len(groups[last]) >= PAGE_ENTRIES:
+            last, next_id = next_id, next_id + 1
+            groups[last] = []
+        groups[last].append(entry)
+
+    assigned = {e.id: page_id for page_id, group in groups.items() for e in group}
+    ids = [e.id for e in data.entries]
+    return _seal(
+        key,
+        codec,
+        data.version,
+        dict(groups),
+        previous.pages if previous is not None else {},
+        ids,
+        [e.issuer for e in data.entries],
+        [e.account_name for e in data.entries],
+        [assigned[i] for i in ids],
+    )
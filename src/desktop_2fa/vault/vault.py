@@ -1,21 +1,50 @@
 """Vault implementation for storing and managing TOTP entries."""
 
+import gc
+import hashlib
+import hmac
+import mmap
 import os
 import re
+import time
+import warnings
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterable, Iterator, Optional
 
 from pydantic import ValidationError
 
+from ..agent.client import agent_from_env
 from ..crypto.aesgcm import decrypt, encrypt
-from ..crypto.argon2 import derive_key
-from .models import TotpEntry, VaultData
+from ..crypto.argon2 import (
+    KDF_PARAMS_LEN,
+    LEGACY_KDF_PARAMS,
+    KdfParams,
+    default_kdf_params,
+    derive_key,
+)
+from ..utils import metrics
+from ..utils.profiling import phase
+from . import compression, journal, payload, segments
+from .models import TotpEntry, VaultData, new_entry_id
+from .search import SearchHit, SearchIndex
 
 # Vault file format constants
 VAULT_MAGIC = b"D2FA"
-VAULT_VERSION = b"\x01"
+VAULT_VERSION_1 = b"\x01"  # magic + version + salt, fixed legacy KDF parameters
+VAULT_VERSION_2 = b"\x02"  # magic + version + KDF parameters + salt, JSON payload
+VAULT_VERSION_3 = b"\x03"  # as version 2, binary payload (see payload.py)
+VAULT_VERSION_4 = b"\x04"  # magic + version + codec + KDF parameters + salt,
+# compressed binary payload
+VAULT_VERSION_5 = b"\x05"  # as version 4, segmented body (see segments.py)
+VAULT_VERSION = VAULT_VERSION_3
 HEADER_LEN = len(VAULT_MAGIC) + len(VAULT_VERSION)
 
+# Payload encodings accepted by Vault.payload_format.
+PAYLOAD_BINARY = "binary"
+PAYLOAD_JSON = "json"
+PAYLOAD_SEGMENTED = "segmented"
+
 
 class VaultError(Exception):
     """Base exception for vault-related errors."""
@@ -47,6 +76,85 @@ class VaultIOError(VaultError):
     pass
 
 
+class JournalWarning(UserWarning):
+    """Issued when a damaged vault journal was set aside on load."""
+
+    pass
+
+
+def _map(fd: int, size: int) -> memoryview:
+    """Map a file read-only, so parsing and decryption slice it without copies.
+
+    The mapping is released once the view and every slice of it are gone.
+    """
+    if size == 0:
+        # mmap cannot map an empty file.
+        return memoryview(b"")
+    return memoryview(mmap.mmap(fd, size, access=mmap.ACCESS_READ))
+
+
+@contextmanager
+def _gc_paused() -> Iterator[None]:
+    """Pause the cyclic garbage collector while entries are decoded.
+
+    Decoding allocates several containers per entry, and every few hundred
+    allocations the collector would traverse the ones made so far; decoded
+    entries hold no reference cycles, so none of that work finds garbage.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _unlock_key(password: str, salt: bytes, params: KdfParams) -> tuple[bytes, bool]:
+    """Derive the vault key, consulting the session agent first if one runs.
+
+    Returns the key and whether it came from the agent. A derived key is
+    not handed to the agent here: callers pass it to _share_key() once it
+    has decrypted the vault or sealed one that was written, so a mistyped
+    password never displaces the valid key.
+    """
+    agent = agent_from_env()
+    if agent is not None:
+        with phase("agent.get"):
+            key = agent.get_key(salt + params.pack(), password)
+        if key is not None:
+            metrics.inc("d2fa_vault_agent_lookups", result="hit")
+            return key, True
+        metrics.inc("d2fa_vault_agent_lookups", result="miss")
+    start = time.perf_counter()
+    with phase("derive_key"):
+        key = derive_key(password, salt, params)
+    metrics.observe(
+        "d2fa_vault_kdf_seconds",
+        time.perf_counter() - start,
+        time_cost=str(params.time_cost),
+        memory_kib=str(params.memory_cost),
+        lanes=str(params.parallelism),
+    )
+    return key, False
+
+
+def _share_key(password: str, salt: bytes, params: KdfParams, key: bytes) -> None:
+    """Hand a verified key to the session agent, if one runs.
+
+    Later invocations then skip Argon2id entirely.
+    """
+    agent = agent_from_env()
+    if agent is not None:
+        with phase("agent.put"):
+            agent.put_key(salt + params.pack(), password, key)
+
+
+def _dedupe_key(entry: TotpEntry) -> tuple[Optional[str], Optional[str], str]:
+    secret = entry.secret.replace(" ", "").rstrip("=").upper()
+    return entry.issuer, entry.account_name, secret
+
+
 class Vault:
     """Vault using Pydantic models for validation and structure."""
 
@@ -56,7 +164,176 @@ class Vault:
         Args:
             data: The vault data to initialize with.
         """
+        # Index of a segmented vault whose pages have not been decrypted yet;
+        # the first access to data decrypts them all.
+        self._lazy: Optional[segments.Segments] = None
+        # Pages of a segmented vault as last loaded or saved, so save() only
+        # re-encrypts the ones that changed.
+        self._pages: Optional[segments.PageSet] = None
         self.data = data or VaultData()
+        self.kdf_params = default_kdf_params()
+        # Encoding used by save(): the compact binary payload (version 3),
+        # the readable JSON payload of version 2 vaults or the segmented
+        # body of version 5 vaults.
+        self.payload_format = PAYLOAD_BINARY
+        # Codec applied to the binary payload before encryption (see
+        # compression.py); a compressed binary payload is saved as version 4.
+        # JSON payloads are never compressed.
+        self.compression = compression.NONE
+        # Hash index over the entries: id -> entry (in insertion order),
+        # issuer/account name -> ids, and id -> insertion rank so a name
+        # shared by several entries resolves to the earliest one.
+        self._by_id: dict[str, TotpEntry] = {}
+        self._by_name: dict[str, set[str]] = {}
+        self._rank: dict[str, int] = {}
+        self._next_rank = 0
+        # Set when removals made data.entries lag behind the index.
+        self._entries_stale = False
+        # Built lazily by search() and dropped whenever names change.
+        self._search_index: Optional[SearchIndex] = None
+        self._reindex()
+        # Salt and key the vault was last unlocked or sealed with, plus an
+        # HMAC of the password so save() only reuses them for that password.
+        self._salt: Optional[bytes] = None
+        self._key: Optional[bytes] = None
+        self._key_check: Optional[bytes] = None
+        self._key_params: Optional[KdfParams] = None
+        # Whether the session agent holds that key; a fresh one is only
+        # handed over once save() has written a vault sealed with it.
+        self._key_shared = False
+        # Journal of the vault file last loaded or saved, the records of the
+        # add/remove/rename calls made since, and the settings that file was
+        # written with (None once other changes were made), so save_changes()
+        # can append the records instead of rewriting the file.
+        self._journal: Optional[journal.Journal] = None
+        self._pending: list[bytes] = []
+        self._journal_base: Optional[tuple[str, str, KdfParams]] = None
+
+    @property
+    def data(self) -> VaultData:
+        """The vault contents, decrypting any pages not read yet."""
+        if self._lazy is not None:
+            self._materialize()
+        return self._data
+
+    @data.setter
+    def data(self, data: VaultData) -> None:
+        self._lazy = None
+        self._data = data
+        self._journal_base = None
+
+    def _materialize(self) -> None:
+        lazy, self._lazy = self._lazy, None
+        assert lazy is not None
+        with _gc_paused():
+            try:
+                with phase("pages"):
+                    self._data = lazy.materialize()
+            except ValueError as e:
+                self._lazy = lazy
+                raise CorruptedVault("Vault contains invalid data") from e
+            self._reindex()
+
+    def _settings(self) -> tuple[str, str, KdfParams]:
+        return self.payload_format, self.compression, self.kdf_params
+
+    def _entry_count(self) -> int:
+        return len(self._lazy) if self._lazy is not None else len(self._by_id)
+
+    def _remember_key(
+        self, password: str, salt: bytes, key: bytes, shared: bool
+    ) -> None:
+        self._salt = salt
+        self._key = key
+        self._key_shared = shared
+        self._key_check = hmac.digest(key, password.encode(), hashlib.sha256)
+        self._key_params = self.kdf_params
+
+    def _cached_key(self, password: str) -> Optional[tuple[bytes, bytes]]:
+        if self._salt is None or self._key is None or self._key_check is None:
+            return None
+        if self._key_params != self.kdf_params:
+            return None
+        check = hmac.digest(self._key, password.encode(), hashlib.sha256)
+        if not hmac.compare_digest(check, self._key_check):
+            return None
+        return self._salt, self._key
+
+    def _new_key(self, password: str) -> tuple[bytes, bytes]:
+        salt = os.urandom(16)
+        key, shared = _unlock_key(password, salt, self.kdf_params)
+        self._remember_key(password, salt, key, shared)
+        return salt, key
+
+    def rekey(
+        self, password: Optional[str] = None, kdf_params: Optional[KdfParams] = None
+    ) -> None:
+        """Derive a new key under a fresh random salt.
+
+        save() normally reuses the salt and key the vault was unlocked with;
+        call this to force a new salt (e.g. after a suspected leak), to
+        switch the vault to a different password or to change the Argon2id
+        cost parameters recorded in the header.
+
+        Args:
+            password: The password for the new key. If None, the default
+                internal password is used (for "no-password" vaults).
+            kdf_params: New Argon2id parameters; keeps the current ones if None.
+        """
+        self._journal_base = None
+        if password is None:
+            password = ""
+        if kdf_params is not None:
+            kdf_params.validate()
+            self.kdf_params = kdf_params
+        self._new_key(password)
+
+    def _index(self, entry: TotpEntry) -> None:
+        self._by_id[entry.id] = entry
+        self._rank[entry.id] = self._next_rank
+        self._next_rank += 1
+        self._index_names(entry)
+
+    def _index_names(self, entry: TotpEntry) -> None:
+        self._search_index = None
+        for name in (entry.issuer, entry.account_name):
+            if name is not None:
+                self._by_name.setdefault(name, set()).add(entry.id)
+
+    def _unindex_names(self, entry: TotpEntry) -> None:
+        self._search_index = None
+        for name in (entry.issuer, entry.account_name):
+            if name is None:
+                continue
+            ids = self._by_name.get(name)
+            if ids is not None:
+                ids.discard(entry.id)
+                if not ids:
+                    del self._by_name[name]
+
+    def _reindex(self) -> None:
+        """Rebuild the index from data.entries."""
+        self._by_id.clear()
+        self._by_name.clear()
+        self._rank.clear()
+        self._next_rank = 0
+        self._search_index = None
+        self._entries_stale = False
+        for entry in self.data.entries:
+            if entry.id in self._by_id:
+                entry.id = new_entry_id()
+            self._index(entry)
+
+    def _check_index(self) -> None:
+        """Resync after callers mutated the list returned by entries."""
+        if not self._entries_stale and len(self.data.entries) != len(self._by_id):
+            self._reindex()
+
+    def _sync_entries(self) -> None:
+        """Apply pending removals to data.entries."""
+        if self._entries_stale:
+            self.data.entries[:] = self._by_id.values()
+            self._entries_stale = False
 
     @property
     def entries(self) -> list[TotpEntry]:
@@ -65,6 +342,9 @@ class Vault:
         Returns:
             The list of TOTP entries.
         """
+        # Callers may change the list, which the journal cannot record.
+        self._journal_base = None
+        self._sync_entries()
         return self.data.entries
 
     def add_entry(
@@ -88,7 +368,51 @@ class Vault:
             account_name=account_name,
             secret=secret,
         )
-        self.data.entries.append(entry)
+        self._add(entry)
+        self._pending.append(journal.encode_add(entry))
+
+    def _add(self, entry: TotpEntry) -> None:
+        if self._lazy is not None:
+            try:
+                with phase("pages"):
+                    self._lazy.append(entry)
+            except ValueError as e:
+                raise CorruptedVault("Vault contains invalid data") from e
+            return
+        self._check_index()
+        self._index(entry)
+        if not self._entries_stale:
+            self.data.entries.append(entry)
+
+    def add_entries(self, entries: Iterable[TotpEntry]) -> list[TotpEntry]:
+        """Add prebuilt entries, skipping duplicates.
+
+        An entry is a duplicate if the vault, or an earlier entry of the
+        batch, already holds one with the same issuer, account name and
+        secret (compared ignoring case, spaces and padding).
+
+        Args:
+            entries: The entries to add.
+
+        Returns:
+            The entries that were added.
+        """
+        self._journal_base = None
+        self._check_index()
+        seen = {_dedupe_key(e) for e in self._by_id.values()}
+        added = []
+        for entry in entries:
+            key = _dedupe_key(entry)
+            if key in seen:
+                continue
+            seen.add(key)
+            if entry.id in self._by_id:
+                entry.id = new_entry_id()
+            self._index(entry)
+            added.append(entry)
+        if not self._entries_stale:
+            self.data.entries.extend(added)
+        return added
 
     def get_entry(self, issuer: str) -> TotpEntry:
         """Get a TOTP entry by issuer or account name.
@@ -101,11 +425,71 @@ class Vault:
 
         Raises:
             ValueError: If no entry is found.
+            CorruptedVault: If the page holding the entry is corrupted.
+        """
+        if self._lazy is not None:
+            return self._lazy_lookup(self._lazy.find, issuer)
+        self._check_index()
+        ids = self._by_name.get(issuer)
+        if not ids:
+            raise ValueError(f"Entry '{issuer}' not found")
+        if len(ids) == 1:
+            return self._by_id[next(iter(ids))]
+        return self._by_id[min(ids, key=self._rank.__getitem__)]
+
+    def get_entry_by_id(self, entry_id: str) -> TotpEntry:
+        """Get a TOTP entry by its stable id.
+
+        Raises:
+            ValueError: If no entry is found.
+            CorruptedVault: If the page holding the entry is corrupted.
+        """
+        if self._lazy is not None:
+            return self._lazy_lookup(self._lazy.find_id, entry_id)
+        self._check_index()
+        try:
+            return self._by_id[entry_id]
+        except KeyError:
+            raise ValueError(f"Entry '{entry_id}' not found") from None
+
+    def _lazy_lookup(
+        self, find: Callable[[str], Optional[TotpEntry]], key: str
+    ) -> TotpEntry:
+        """Find, change or remove an entry of a segmented vault.
+
+        find takes an issuer, account name or id and returns the entry it
+        acted on, or None if there is none; only that entry's page is
+        decrypted.
         """
-        for entry in self.entries:
-            if entry.issuer == issuer or entry.account_name == issuer:
-                return entry
-        raise ValueError(f"Entry '{issuer}' not found")
+        try:
+            with phase("pages"):
+                entry = find(key)
+        except ValueError as e:
+            raise CorruptedVault("Vault contains invalid data") from e
+        if entry is None:
+            raise ValueError(f"Entry '{key}' not found")
+        return entry
+
+    def search(
+        self, query: str, fuzzy: bool = True, limit: Optional[int] = None
+    ) -> list[SearchHit]:
+        """Find entries by prefix, substring or approximate name.
+
+        The search index is built on first use and kept until the entries
+        change.
+
+        Args:
+            query: The text to look for in issuer and account names.
+            fuzzy: Also return approximate matches.
+            limit: Maximum number of hits to return.
+
+        Returns:
+            Hits ordered from best to worst match.
+        """
+        self._check_index()
+        if self._search_index is None:
+            self._search_index = SearchIndex(self._by_id.values())
+        return self._search_index.search(query, fuzzy=fuzzy, limit=limit)
 
     def remove_entry(self, issuer: str) -> None:
         """Remove a TOTP entry by issuer or account name.
@@ -113,13 +497,65 @@ class Vault:
         Args:
             issuer: The issuer or account name of the entry to remove.
         """
+        self._remove(issuer)
+        self._pending.append(journal.encode_remove(issuer))
+
+    def _remove(self, issuer: str) -> None:
+        if self._lazy is not None:
+            self._lazy_lookup(self._lazy.remove, issuer)
+            return
+        self._check_index()
         entry = self.get_entry(issuer)
-        self.data.entries.remove(entry)
+        self._unindex_names(entry)
+        del self._by_id[entry.id]
+        del self._rank[entry.id]
+        # data.entries is rebuilt lazily on the next access to entries.
+        self._entries_stale = True
+
+    def rename_entry(self, old: str, new: str) -> TotpEntry:
+        """Rename an entry, setting both issuer and account name.
+
+        Args:
+            old: The current issuer or account name.
+            new: The new name.
+
+        Returns:
+            The renamed entry.
+        """
+        entry = self._rename(old, new)
+        self._pending.append(journal.encode_rename(old, new))
+        return entry
+
+    def _rename(self, old: str, new: str) -> TotpEntry:
+        if self._lazy is not None:
+            lazy = self._lazy
+            return self._lazy_lookup(lambda name: lazy.rename(name, new), old)
+        self._check_index()
+        entry = self.get_entry(old)
+        self._unindex_names(entry)
+        entry.issuer = new
+        entry.account_name = new
+        self._index_names(entry)
+        return entry
+
+    def _replay(self, records: list[journal.Record]) -> None:
+        """Apply journal records read on load."""
+        for record in records:
+            if record.op == journal.ADD:
+                assert record.entry is not None
+                self._add(record.entry)
+            elif record.op == journal.REMOVE:
+                self._remove(*record.names)
+            else:
+                self._rename(*record.names)
 
     @classmethod
     def load(cls, path: str | Path, password: Optional[str] = None) -> "Vault":
         """Load a vault from a file.
 
+        Journal records are replayed up to the first damaged one; if there is
+        one the journal is set aside and a JournalWarning is issued.
+
         Args:
             path: The file path to load from.
             password: The password to decrypt the vault. If None, a default
@@ -134,9 +570,23 @@ class Vault:
             InvalidPassword: If the password is incorrect.
             CorruptedVault: If the vault data is corrupted.
         """
+        start = time.perf_counter()
+        try:
+            with phase("vault.load"):
+                vault = cls._load(path, password)
+        except VaultError as e:
+            metrics.inc("d2fa_vault_failures", op="load", error=type(e).__name__)
+            raise
+        metrics.observe("d2fa_vault_unlock_seconds", time.perf_counter() - start)
+        metrics.set_gauge("d2fa_vault_entries", vault._entry_count())
+        return vault
+
+    @classmethod
+    def _load(cls, path: str | Path, password: Optional[str]) -> "Vault":
         try:
-            with open(path, "rb") as f:
-                blob = f.read()
+            with phase("read"), open(path, "rb") as f:
+                st = os.fstat(f.fileno())
+                blob = _map(f.fileno(), st.st_size)
         except OSError as e:
             raise VaultIOError(f"Failed to read vault file: {e}") from e
 
@@ -146,11 +596,39 @@ class Vault:
         # Check magic header and version
         if blob[:4] != VAULT_MAGIC:
             raise UnsupportedFormat("Invalid vault file format: incorrect magic header")
-        if blob[4:5] != VAULT_VERSION:
+        version = bytes(blob[4:5])
+        codec = compression.NONE
+        if version == VAULT_VERSION_1:
+            kdf_params = LEGACY_KDF_PARAMS
+            offset = HEADER_LEN
+        elif version in (
+            VAULT_VERSION_2,
+            VAULT_VERSION_3,
+            VAULT_VERSION_4,
+            VAULT_VERSION_5,
+        ):
+            start = HEADER_LEN
+            if version in (VAULT_VERSION_4, VAULT_VERSION_5):
+                try:
+                    codec = compression.CODEC_NAMES[blob[start]]
+                    compression.check(codec)
+                except (KeyError, ValueError) as e:
+                    raise UnsupportedFormat(
+                        f"Unsupported vault compression: {e}"
+                    ) from e
+                start += 1
+            offset = start + KDF_PARAMS_LEN
+            if len(blob) < offset + 16:
+                raise UnsupportedFormat("Vault file is too short or invalid format")
+            try:
+                kdf_params = KdfParams.unpack(blob[start:offset])
+            except ValueError as e:
+                raise UnsupportedFormat(f"Invalid vault header: {e}") from e
+        else:
             raise UnsupportedFormat("Unsupported vault file version")
 
-        # First 5 bytes: header, next 16: salt, rest: AES-GCM blob (nonce + ciphertext + tag)
-        salt, encrypted = blob[HEADER_LEN : HEADER_LEN + 16], blob[HEADER_LEN + 16 :]
+        # Header, then 16 bytes of salt, rest: AES-GCM blob (nonce + ciphertext + tag)
+        salt, encrypted = bytes(blob[offset : offset + 16]), blob[offset + 16 :]
 
         if len(encrypted) == 0:
             raise UnsupportedFormat("Vault file is invalid: empty encrypted blob")
@@ -159,61 +637,251 @@ class Vault:
         if password is None:
             password = ""
 
-        key = derive_key(password, salt)
+        key, shared = _unlock_key(password, salt, kdf_params)
+        log = journal.Journal.for_vault(Path(path), key, blob, st)
+        if version == VAULT_VERSION_5:
+            # Only the index is decrypted here; pages are read on demand.
+            try:
+                encrypted, pages = segments.split_body(encrypted)
+            except ValueError as e:
+                raise UnsupportedFormat(f"Invalid vault body: {e}") from e
+            sealing_key = segments.index_key(key)
+        else:
+            sealing_key = key
         try:
-            raw_json = decrypt(key, encrypted)
+            with phase("decrypt"):
+                raw = decrypt(sealing_key, encrypted)
         except ValueError as e:
             raise InvalidPassword("Invalid password or corrupted vault") from e
+        if not shared:
+            _share_key(password, salt, kdf_params, key)
+        # Drop the mapping before decoding, where memory use peaks (a
+        # segmented vault keeps its page area until the pages are copied).
+        del blob, encrypted
+
+        if codec != compression.NONE:
+            try:
+                with phase("decompress"):
+                    raw = compression.decompress(codec, raw)
+            except ValueError as e:
+                raise CorruptedVault("Vault payload does not decompress") from e
 
         # decrypt() zwraca bytes; Pydantic v2 akceptuje bytes jako JSON input.
+        lazy = None
+        with _gc_paused():
+            try:
+                with phase("parse"):
+                    if version == VAULT_VERSION_5:
+                        lazy = segments.Segments(raw, key, codec, pages)
+                        del pages
+                        data = VaultData()
+                    elif version in (VAULT_VERSION_3, VAULT_VERSION_4):
+                        data = payload.decode(raw)
+                    else:
+                        data = VaultData.model_validate_json(raw)
+            except (ValidationError, ValueError) as e:
+                # If Pydantic validation fails, it's corrupted data (not a password
+                # issue) because the decryption succeeded but the data structure
+                # is wrong
+                raise CorruptedVault("Vault contains invalid data") from e
+            with phase("index"):
+                vault = cls(data)
+        if lazy is not None:
+            vault._lazy = lazy
+            vault._pages = lazy.pages
+            vault.payload_format = PAYLOAD_SEGMENTED
+        elif version == VAULT_VERSION_2:
+            vault.payload_format = PAYLOAD_JSON
+        vault.kdf_params = kdf_params
+        vault.compression = codec
+        vault._remember_key(password, salt, key, shared=True)
+
+        vault._journal = log
         try:
-            data = VaultData.model_validate_json(raw_json)
-        except ValidationError as e:
-            # If Pydantic validation fails, it's corrupted data (not a password issue)
-            # because the decryption succeeded but the data structure is wrong
-            raise CorruptedVault("Vault contains invalid data") from e
-        return cls(data)
+            with phase("journal"):
+                vault._replay(vault._journal.read())
+        except OSError as e:
+            raise VaultIOError(f"Failed to read vault journal: {e}") from e
+        except ValueError as e:
+            raise CorruptedVault("Vault journal is corrupted") from e
+        if log.set_aside is not None:
+            warnings.warn(
+                f"Vault journal has a damaged record; it and the changes after it "
+                f"were not applied. The journal was copied to {log.set_aside}.",
+                JournalWarning,
+                stacklevel=3,
+            )
+        vault._pending.clear()
+        vault._journal_base = vault._settings()
+        return vault
 
     def save(self, path: str | Path, password: Optional[str] = None) -> None:
         """Save the vault to a file.
 
+        If the vault was loaded (or previously saved) with the same password,
+        the existing salt and key are reused and only a fresh AES-GCM nonce is
+        generated, so no key derivation takes place. Otherwise a new salt is
+        drawn and the key is derived once.
+
         Args:
             path: The file path to save to.
             password: The password to encrypt the vault. If None, a default
                 internal password is used (for "no-password" vaults).
 
+        Raises:
+            VaultIOError: If saving fails due to IO errors.
+        """
+        start = time.perf_counter()
+        try:
+            with phase("vault.save"):
+                size = self._save(Path(path), password)
+        except VaultError as e:
+            metrics.inc("d2fa_vault_failures", op="save", error=type(e).__name__)
+            raise
+        metrics.observe("d2fa_vault_save_seconds", time.perf_counter() - start)
+        metrics.observe("d2fa_vault_save_bytes", size)
+        metrics.set_gauge("d2fa_vault_entries", self._entry_count())
+
+    def save_changes(self, path: str | Path, password: Optional[str] = None) -> None:
+        """Persist the changes made since the vault was loaded or saved.
+
+        When they were all made through add_entry, remove_entry and
+        rename_entry and the vault file at path is the one the vault was
+        loaded from (or last saved to), with the same password and
+        settings, the changes are appended to the file's journal, costing
+        I/O in proportion to the changes rather than to the vault. Otherwise,
+        or once the journal would grow past journal.COMPACT_BYTES, this is
+        save(), which folds the journal into the vault file.
+
+        Args:
+            path: The vault file.
+            password: The vault password. If None, the default internal
+                password is used (for "no-password" vaults).
+
         Raises:
             VaultIOError: If saving fails due to IO errors.
         """
         path = Path(path)
+        log = self._journal
+        try:
+            current = journal.file_stamp(os.stat(path))
+        except OSError:
+            current = None
+        if (
+            log is None
+            or log.path != journal.journal_path(path)
+            or log.stamp != current
+            or self._journal_base != self._settings()
+            or self._cached_key("" if password is None else password) is None
+            or log.size_after(self._pending) > journal.COMPACT_BYTES
+        ):
+            self.save(path, password)
+            return
+        if not self._pending:
+            return
+
+        start = time.perf_counter()
+        size = log.end
+        try:
+            with phase("vault.save"), phase("journal"):
+                log.append(self._pending)
+        except OSError as e:
+            metrics.inc("d2fa_vault_failures", op="save", error="VaultIOError")
+            raise VaultIOError(f"Failed to write vault journal: {e}") from e
+        metrics.observe("d2fa_vault_save_seconds", time.perf_counter() - start)
+        metrics.observe("d2fa_vault_save_bytes", log.end - size)
+        metrics.inc("d2fa_vault_journal_records", len(self._pending))
+        metrics.set_gauge("d2fa_vault_entries", self._entry_count())
+        self._pending.clear()
+
+    def _save(self, path: Path, password: Optional[str]) -> int:
         path.parent.mkdir(parents=True, exist_ok=True)
 
         temp_path = path.with_suffix(".tmp")
 
         try:
-            header = VAULT_MAGIC + VAULT_VERSION
-            salt = os.urandom(16)
+            if self.payload_format == PAYLOAD_JSON:
+                version = VAULT_VERSION_2
+            elif self.payload_format == PAYLOAD_SEGMENTED:
+                compression.check(self.compression)
+                version = VAULT_VERSION_5
+            elif self.payload_format != PAYLOAD_BINARY:
+                raise ValueError(f"Unknown payload format: {self.payload_format!r}")
+            elif self.compression == compression.NONE:
+                version = VAULT_VERSION_3
+            else:
+                compression.check(self.compression)
+                version = VAULT_VERSION_4
+            header = VAULT_MAGIC + version
+            if version in (VAULT_VERSION_4, VAULT_VERSION_5):
+                header += bytes([compression.CODECS[self.compression]])
+            header += self.kdf_params.pack()
 
             # For "no-password" vaults we consistently use an empty password string.
             if password is None:
                 password = ""
 
-            key = derive_key(password, salt)
-
-            raw_json = self.data.model_dump_json().encode("utf-8")
-            encrypted = encrypt(key, raw_json)
-
-            fd = os.open(str(temp_path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
-            try:
-                with os.fdopen(fd, "wb") as f:
-                    f.write(header + salt + encrypted)
-                    f.flush()
-                    os.fsync(fd)
-            except:
-                os.close(fd)
-                raise
-
-            os.replace(temp_path, path)
+            salt, key = self._cached_key(password) or self._new_key(password)
+
+            lazy = self._lazy
+            if (
+                version == VAULT_VERSION_5
+                and lazy is not None
+                and lazy.pages.key == key
+                and lazy.pages.codec == self.compression
+            ):
+                # Nothing outside the index and the pages read so far has
+                # changed, so the other pages are copied as they are.
+                with phase("pages"):
+                    encrypted = lazy.seal()
+                self._pages = lazy.pages
+                metrics.inc("d2fa_vault_pages_written", self._pages.written)
+            elif version == VAULT_VERSION_5:
+                self._check_index()
+                self._sync_entries()
+                with phase("pages"):
+                    encrypted, self._pages = segments.pack(
+                        self.data, key, self.compression, self._pages
+                    )
+                metrics.inc("d2fa_vault_pages_written", self._pages.written)
+            else:
+                self._check_index()
+                self._sync_entries()
+                with phase("serialize"):
+                    if version == VAULT_VERSION_2:
+                        raw = self.data.model_dump_json().encode("utf-8")
+                    else:
+                        raw = payload.encode(self.data)
+                if version == VAULT_VERSION_4:
+                    with phase("compress"):
+                        raw = compression.compress(self.compression, raw)
+                with phase("encrypt"):
+                    encrypted = encrypt(key, raw)
+            blob = header + salt + encrypted
+
+            with phase("write"):
+                fd = os.open(
+                    str(temp_path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600
+                )
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        f.write(blob)
+                        f.flush()
+                        os.fsync(fd)
+                except:
+                    os.close(fd)
+                    raise
+
+                os.replace(temp_path, path)
+            # The vault file now holds everything the journal recorded.
+            self._journal = journal.Journal.for_vault(path, key, blob, os.stat(path))
+            self._journal.discard()
+            self._pending.clear()
+            self._journal_base = self._settings()
+            if not self._key_shared:
+                _share_key(password, salt, self.kdf_params, key)
+                self._key_shared = True
+            return len(blob)
         except OSError as e:
             if temp_path.exists():
                 try:
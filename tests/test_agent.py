@@ -0,0 +1,221 @@
+import signal
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterator
+
+import pytest
+
+from desktop_2fa.agent.client import AGENT_SOCK_ENV, AgentClient
+from desktop_2fa.agent.keystore import MAX_FAILURES, MAX_SLOTS, KeyStore, LockedBuffer
+from desktop_2fa.agent.server import AgentServer
+from desktop_2fa.vault import Vault
+from desktop_2fa.vault.vault import VaultIOError
+
+KEY = b"k" * 32
+
+
+@pytest.fixture
+def agent(tmp_path: Path) -> Iterator[AgentServer]:
+    server = AgentServer(tmp_path / "agent.sock", idle_timeout=60)
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    )
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_keystore_requires_matching_password() -> None:
+    store = KeyStore(idle_timeout=60)
+    store.put(b"id", "secret", KEY)
+
+    assert store.get(b"id", "secret") == KEY
+    assert store.get(b"id", "wrong") is None
+    assert store.get(b"other", "secret") is None
+
+
+def test_keystore_expires_idle_keys() -> None:
+    now = [0.0]
+    store = KeyStore(idle_timeout=10, clock=lambda: now[0])
+    store.put(b"id", "secret", KEY)
+
+    now[0] = 9.0
+    assert store.get(b"id", "secret") == KEY  # refreshes last use
+    now[0] = 18.0
+    assert store.get(b"id", "secret") == KEY
+    now[0] = 28.0
+    assert store.get(b"id", "secret") is None
+    assert len(store) == 0
+
+
+def test_keystore_wipes_key_after_repeated_wrong_passwords() -> None:
+    store = KeyStore(idle_timeout=60)
+    store.put(b"id", "secret", KEY)
+
+    for _ in range(MAX_FAILURES - 1):
+        assert store.get(b"id", "guess") is None
+    assert store.get(b"id", "secret") == KEY
+    assert store.get(b"id", "guess") is None
+    assert store.get(b"id", "secret") is None
+    assert len(store) == 0
+
+
+def test_keystore_evicts_least_recently_used_key() -> None:
+    now = [0.0]
+    store = KeyStore(idle_timeout=3600, clock=lambda: now[0])
+    for i in range(MAX_SLOTS):
+        now[0] = float(i)
+        store.put(bytes([i]), "secret", KEY)
+    now[0] = 100.0
+    assert store.get(bytes([0]), "secret") == KEY  # slot 1 is now the oldest
+
+    store.put(b"new", "secret", KEY)
+    assert len(store) == MAX_SLOTS
+    assert store.get(bytes([1]), "secret") is None
+    assert store.get(bytes([0]), "secret") == KEY
+    assert store.get(b"new", "secret") == KEY
+
+
+def test_locked_buffer_wipe() -> None:
+    buf = LockedBuffer(KEY)
+    assert buf.value() == KEY
+    buf.wipe()
+    assert buf.value() == b""
+    assert not buf.locked
+
+
+def test_agent_roundtrip(agent: AgentServer) -> None:
+    client = AgentClient(agent.socket_path)
+    assert client.get_key(b"salt", "pw") is None
+
+    client.put_key(b"salt", "pw", KEY)
+    assert client.get_key(b"salt", "pw") == KEY
+    assert client.get_key(b"salt", "nope") is None
+
+    assert client.request({"op": "lock"}) == {"ok": True}
+    assert client.get_key(b"salt", "pw") is None
+
+
+def test_agent_bad_request(agent: AgentServer) -> None:
+    client = AgentClient(agent.socket_path)
+    assert client.request({"op": "frobnicate"}) == {
+        "ok": False,
+        "error": "unknown op: frobnicate",
+    }
+    assert client.request({"nothing": 1}) == {"ok": False, "error": "bad request"}
+
+
+def test_agent_refuses_to_replace_a_regular_file(tmp_path: Path) -> None:
+    vault = tmp_path / "vault"
+    vault.write_bytes(b"precious")
+
+    with pytest.raises(FileExistsError):
+        AgentServer(vault, idle_timeout=60)
+    assert vault.read_bytes() == b"precious"
+
+
+def test_agent_close_leaves_replaced_path_alone(tmp_path: Path) -> None:
+    path = tmp_path / "agent.sock"
+    server = AgentServer(path, idle_timeout=60)
+    path.unlink()
+    path.write_bytes(b"not ours")
+
+    server.server_close()
+    assert path.read_bytes() == b"not ours"
+
+
+def test_agent_replaces_stale_socket(tmp_path: Path) -> None:
+    path = tmp_path / "agent.sock"
+    AgentServer(path, idle_timeout=60).socket.close()  # dies without cleanup
+
+    server = AgentServer(path, idle_timeout=60)
+    server.server_close()
+    assert not path.exists()
+
+
+def test_agent_removes_socket_on_sigterm(tmp_path: Path) -> None:
+    path = tmp_path / "agent.sock"
+    proc = subprocess.Popen(
+        [sys.executable, "-c", "from desktop_2fa.cli.main import app; app()"]
+        + ["agent", "start", "--foreground", "--socket", str(path)],
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 10
+        while not path.exists():
+            assert proc.poll() is None and time.monotonic() < deadline
+            time.sleep(0.05)
+        proc.send_signal(signal.SIGTERM)
+        assert proc.wait(timeout=10) == 0
+    finally:
+        proc.kill()
+    assert not path.exists()
+
+
+def test_agent_unreachable_is_a_miss(tmp_path: Path) -> None:
+    client = AgentClient(tmp_path / "missing.sock")
+    assert client.get_key(b"salt", "pw") is None
+    client.put_key(b"salt", "pw", KEY)  # must not raise
+
+
+def test_vault_load_skips_kdf_with_agent(
+    agent: AgentServer, tmp_path: Path, monkeypatch: Any
+) -> None:
+    monkeypatch.setenv(AGENT_SOCK_ENV, str(agent.socket_path))
+    path = tmp_path / "vault.bin"
+
+    vault = Vault()
+    vault.add_entry("GitHub", "JBSWY3DPEHPK3PXP")
+    vault.save(path, "pw")
+    assert len(agent.keys) == 1
+
+    def fail(*args: Any, **kwargs: Any) -> bytes:
+        raise AssertionError("derive_key should not run")
+
+    monkeypatch.setattr("desktop_2fa.vault.vault.derive_key", fail)
+    loaded = Vault.load(path, "pw")
+    assert loaded.get_entry("GitHub").secret == "JBSWY3DPEHPK3PXP"
+
+
+def test_vault_load_wrong_password_with_agent(
+    agent: AgentServer, tmp_path: Path, monkeypatch: Any
+) -> None:
+    from desktop_2fa.vault.vault import InvalidPassword
+
+    monkeypatch.setenv(AGENT_SOCK_ENV, str(agent.socket_path))
+    path = tmp_path / "vault.bin"
+    Vault().save(path, "pw")
+
+    with pytest.raises(InvalidPassword):
+        Vault.load(path, "not-pw")
+    assert len(agent.keys) == 1
+
+    # The failed attempt must not have displaced the valid key.
+    def fail(*args: Any, **kwargs: Any) -> bytes:
+        raise AssertionError("derive_key should not run")
+
+    monkeypatch.setattr("desktop_2fa.vault.vault.derive_key", fail)
+    Vault.load(path, "pw")
+
+
+def test_vault_shares_key_only_after_write(
+    agent: AgentServer, tmp_path: Path, monkeypatch: Any
+) -> None:
+    monkeypatch.setenv(AGENT_SOCK_ENV, str(agent.socket_path))
+    vault = Vault()
+    vault.rekey("pw")
+    assert len(agent.keys) == 0
+
+    # Replacing a non-empty directory fails after the vault was sealed.
+    (tmp_path / "dir" / "sub").mkdir(parents=True)
+    with pytest.raises(VaultIOError):
+        vault.save(tmp_path / "dir", "pw")
+    assert len(agent.keys) == 0
+
+    vault.save(tmp_path / "vault.bin", "pw")
+    assert len(agent.keys) == 1
@@ -60,6 +60,53 @@ def test_cli_code(fake_vault_env_cli: Path) -> None:
     assert code.isdigit()
 
 
+def test_cli_code_fuzzy(fake_vault_env_cli: Path) -> None:
+    runner.invoke(
+        app,
+        ["--password", TEST_PASSWORD, "add", "GitHub", "JBSWY3DPEHPK3PXP"],
+    )
+    exact = runner.invoke(app, ["--password", TEST_PASSWORD, "code", "GitHub"])
+    result = runner.invoke(
+        app, ["--password", TEST_PASSWORD, "code", "--fuzzy", "githb"]
+    )
+    assert result.exit_code == 0
+    assert result.stdout == exact.stdout
+    assert "Using GitHub" in result.stderr
+
+    missing = runner.invoke(
+        app, ["--password", TEST_PASSWORD, "code", "--fuzzy", "Dropbox"]
+    )
+    assert missing.exit_code != 0
+
+
+def test_cli_code_fuzzy_refuses_ties(fake_vault_env_cli: Path) -> None:
+    for issuer in ("GitHub", "GitLab"):
+        runner.invoke(
+            app,
+            ["--password", TEST_PASSWORD, "add", issuer, "JBSWY3DPEHPK3PXP"],
+        )
+    result = runner.invoke(app, ["--password", TEST_PASSWORD, "code", "--fuzzy", "git"])
+    assert result.exit_code == 1
+    assert result.stdout == ""
+    assert "GitHub" in result.stderr
+    assert "GitLab" in result.stderr
+
+
+def test_cli_list_filter(fake_vault_env_cli: Path) -> None:
+    for issuer in ("GitHub", "GitLab", "Slack"):
+        runner.invoke(
+            app,
+            ["--password", TEST_PASSWORD, "add", issuer, "JBSWY3DPEHPK3PXP"],
+        )
+    result = runner.invoke(
+        app, ["--password", TEST_PASSWORD, "list", "--filter", "git"]
+    )
+    assert result.exit_code == 0
+    assert "GitHub" in result.output
+    assert "GitLab" in result.output
+    assert "Slack" not in result.output
+
+
 def test_cli_remove(fake_vault_env_cli: Path) -> None:
     runner.invoke(
         app,
@@ -267,3 +314,67 @@ def test_cli_interactive_whitespace_input(
         app, ["--password", TEST_PASSWORD, "add", "GitHub", "JBSWY3DPEHPK3PXP"]
     )
     assert result.exit_code == 0  # Should not crash
+
+
+def test_cli_codes(fake_vault_env_cli: Path) -> None:
+    runner.invoke(
+        app,
+        ["--password", TEST_PASSWORD, "add", "GitHub", "JBSWY3DPEHPK3PXP"],
+    )
+    result = runner.invoke(app, ["--password", TEST_PASSWORD, "codes"])
+    assert result.exit_code == 0
+    label, code, remaining = result.output.split()
+    assert label == "GitHub"
+    assert len(code) == 6 and code.isdigit()
+    assert remaining.endswith("s")
+
+
+def test_cli_tune_kdf(fake_vault_env_cli: Path, monkeypatch: Any) -> None:
+    from desktop_2fa.crypto.argon2 import KdfParams
+
+    tuned = KdfParams(time_cost=1, memory_cost=8 * 1024, parallelism=1)
+    monkeypatch.setattr(
+        "desktop_2fa.crypto.argon2.tune_kdf_params", lambda *a, **k: tuned
+    )
+    runner.invoke(
+        app,
+        ["--password", TEST_PASSWORD, "add", "GitHub", "JBSWY3DPEHPK3PXP"],
+    )
+
+    result = runner.invoke(
+        app, ["--password", TEST_PASSWORD, "tune-kdf", "--target-ms", "50"]
+    )
+    assert result.exit_code == 0
+    assert "memory_cost=8 MiB" in result.output
+    assert "Vault KDF parameters updated." in result.output
+
+    vault = load_vault(fake_vault_env_cli, TEST_PASSWORD)
+    assert vault.kdf_params == tuned
+    assert vault.get_entry("GitHub").secret == "JBSWY3DPEHPK3PXP"
+
+
+def test_cli_tune_kdf_rejects_memory_limit(fake_vault_env_cli: Path) -> None:
+    for mib in ("0", "-1", "4097"):
+        result = runner.invoke(
+            app,
+            ["--password", TEST_PASSWORD, "tune-kdf", "--max-memory-mib", mib],
+        )
+        assert result.exit_code == 1
+        assert "Memory limit must be between 1 and 4096 MiB" in result.output
+
+
+def test_cli_tune_kdf_checks_password_first(
+    fake_vault_env_cli: Path, monkeypatch: Any
+) -> None:
+    def fail(*args: Any, **kwargs: Any) -> None:
+        raise AssertionError("benchmark ran")
+
+    monkeypatch.setattr("desktop_2fa.crypto.argon2.tune_kdf_params", fail)
+    runner.invoke(
+        app,
+        ["--password", TEST_PASSWORD, "add", "GitHub", "JBSWY3DPEHPK3PXP"],
+    )
+
+    result = runner.invoke(app, ["--password", "wrong", "tune-kdf"])
+    assert result.exit_code == 0
+    assert "Invalid vault password." in result.output
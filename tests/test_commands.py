@@ -108,6 +108,178 @@ def test_generate_code_missing_entry_raises(
         commands.generate_code("Nope", fake_ctx)
 
 
+def test_generate_codes_single_unlock(
+    fake_vault_env: Path, capsys: Any, fake_ctx: Any, monkeypatch: Any
+) -> None:
+    import json
+
+    from desktop_2fa.vault import Vault
+
+    vault = Vault()
+    vault.add_entry("GitHub", "JBSWY3DPEHPK3PXP")
+    vault.add_entry("GitLab", "JBSWY3DPEHPK3PXQ")
+    vault.add_entry("ACME", "JBSWY3DPEHPK3PXR", account_name="alice")
+    vault.save(fake_vault_env, TEST_PASSWORD)
+
+    loads = []
+    real_load = Vault.load
+
+    def counting_load(*args: Any, **kwargs: Any) -> Vault:
+        loads.append(args)
+        return real_load(*args, **kwargs)
+
+    monkeypatch.setattr(Vault, "load", counting_load)
+
+    commands.generate_codes(["git*"], "json", fake_ctx)
+    rows = json.loads(capsys.readouterr().out)
+    assert len(loads) == 1
+    assert [r["issuer"] for r in rows] == ["GitHub", "GitLab"]
+    for row in rows:
+        assert len(row["code"]) == 6 and row["code"].isdigit()
+        assert 1 <= row["remaining"] <= 30
+
+    commands.generate_codes([], "ndjson", fake_ctx)
+    lines = capsys.readouterr().out.strip().splitlines()
+    assert [json.loads(line)["issuer"] for line in lines] == [
+        "GitHub",
+        "GitLab",
+        "ACME",
+    ]
+
+    commands.generate_codes(["ALICE"], "table", fake_ctx)
+    out = capsys.readouterr().out.strip().splitlines()
+    assert len(out) == 1
+    assert out[0].startswith("ACME (alice)")
+
+
+def test_generate_codes_unknown_format(fake_vault_env: Path, fake_ctx: Any) -> None:
+    with pytest.raises(typer.Exit):
+        commands.generate_codes([], "xml", fake_ctx)
+
+
+def test_import_entries_single_unlock_and_save(
+    fake_vault_env: Path, tmp_path: Path, capsys: Any, fake_ctx: Any, monkeypatch: Any
+) -> None:
+    from desktop_2fa.vault import Vault
+
+    commands.add_entry("GitHub", "JBSWY3DPEHPK3PXP", fake_ctx)
+    export = tmp_path / "bitwarden.csv"
+    export.write_text(
+        "name,totp\n"
+        "GitHub,JBSWY3DPEHPK3PXP\n"
+        "GitLab,jbsw y3dp ehpk 3pxq\n"
+        "GitLab,JBSWY3DPEHPK3PXQ\n"
+        "Broken,not-base32!\n"
+        "Long,JBSWY3DPEHPK3PXPJBSWY3DPEH\n"
+    )
+    capsys.readouterr()
+
+    loads, saves = [], []
+    real_load, real_save = Vault.load, Vault.save
+    monkeypatch.setattr(
+        Vault, "load", lambda *a, **k: loads.append(a) or real_load(*a, **k)
+    )
+    monkeypatch.setattr(
+        Vault, "save", lambda *a, **k: saves.append(a) or real_save(*a, **k)
+    )
+
+    commands.import_entries("bitwarden", str(export), fake_ctx)
+    out = capsys.readouterr().out
+    assert (len(loads), len(saves)) == (1, 1)
+    assert "Imported 2 entries from bitwarden." in out
+    assert "Skipped 2 duplicates and 1 invalid rows" in out
+
+    vault = helpers.load_vault(fake_vault_env, TEST_PASSWORD)
+    assert [e.issuer for e in vault.entries] == ["GitHub", "GitLab", "Long"]
+    assert vault.get_entry("GitLab").secret == "JBSWY3DPEHPK3PXQ"
+    assert vault.get_entry("Long").secret == "JBSWY3DPEHPK3PXPJBSWY3DPEH======"
+
+
+def test_import_entries_nothing_new_skips_save(
+    fake_vault_env: Path, fake_ctx: Any, monkeypatch: Any
+) -> None:
+    from desktop_2fa.vault import Vault
+
+    commands.add_entry("GitHub", "JBSWY3DPEHPK3PXP", fake_ctx)
+    saves = []
+    monkeypatch.setattr(Vault, "save", lambda *a, **k: saves.append(a))
+
+    commands.import_entries(
+        "otpauth", "otpauth://totp/GitHub:GitHub?secret=JBSWY3DPEHPK3PXP", fake_ctx
+    )
+    assert saves == []
+
+
+def test_import_entries_unknown_format(fake_vault_env: Path, fake_ctx: Any) -> None:
+    with pytest.raises(typer.Exit):
+        commands.import_entries("xml", "export.xml", fake_ctx)
+
+
+def test_import_entries_unreadable_source(
+    fake_vault_env: Path, tmp_path: Path, fake_ctx: Any
+) -> None:
+    with pytest.raises(typer.Exit):
+        commands.import_entries("aegis", str(tmp_path / "missing.json"), fake_ctx)
+    bad = tmp_path / "bad.json"
+    bad.write_text("{not json")
+    with pytest.raises(typer.Exit):
+        commands.import_entries("aegis", str(bad), fake_ctx)
+    assert not fake_vault_env.exists()
+
+
+def test_set_compression(fake_vault_env: Path, capsys: Any, fake_ctx: Any) -> None:
+    from desktop_2fa.vault import Vault
+
+    commands.add_entry("GitHub", "JBSWY3DPEHPK3PXP", fake_ctx)
+    commands.set_compression("zlib", fake_ctx)
+
+    assert "compression set to zlib" in capsys.readouterr().out
+    assert fake_vault_env.read_bytes()[:5] == b"D2FA\x04"
+    vault = Vault.load(fake_vault_env, TEST_PASSWORD)
+    assert vault.compression == "zlib"
+    assert vault.get_entry("GitHub")
+
+
+def test_set_compression_unknown_codec(fake_vault_env: Path, fake_ctx: Any) -> None:
+    with pytest.raises(typer.Exit):
+        commands.set_compression("lz4", fake_ctx)
+
+
+def test_set_payload_format(fake_vault_env: Path, capsys: Any, fake_ctx: Any) -> None:
+    from desktop_2fa.vault import Vault
+
+    commands.add_entry("GitHub", "JBSWY3DPEHPK3PXP", fake_ctx)
+    commands.set_payload_format("segmented", fake_ctx)
+
+    assert "format set to segmented" in capsys.readouterr().out
+    assert fake_vault_env.read_bytes()[:5] == b"D2FA\x05"
+    commands.add_entry("GitLab", "JBSWY3DPEHPK3PXP", fake_ctx)
+    vault = Vault.load(fake_vault_env, TEST_PASSWORD)
+    assert vault.payload_format == "segmented"
+    assert vault.get_entry("GitLab")
+
+
+def test_set_payload_format_json_survives_edits(
+    fake_vault_env: Path, fake_ctx: Any
+) -> None:
+    from desktop_2fa.vault import Vault
+
+    commands.add_entry("GitHub", "JBSWY3DPEHPK3PXP", fake_ctx)
+    commands.set_payload_format("json", fake_ctx)
+    commands.add_entry("GitLab", "JBSWY3DPEHPK3PXP", fake_ctx)
+
+    vault = Vault.load(fake_vault_env, TEST_PASSWORD)
+    assert vault.payload_format == "json"
+    assert vault.get_entry("GitLab")
+    vault.save(fake_vault_env, TEST_PASSWORD)
+    assert fake_vault_env.read_bytes()[4] == 0x02
+
+
+def test_set_payload_format_unknown(fake_vault_env: Path, fake_ctx: Any) -> None:
+    with pytest.raises(typer.Exit):
+        commands.set_payload_format("xml", fake_ctx)
+
+
 def test_remove_entry(fake_vault_env: Path, fake_ctx: Any) -> None:
     commands.add_entry("GitHub", "JBSWY3DPEHPK3PXP", fake_ctx)
     commands.remove_entry("GitHub", fake_ctx)
@@ -116,6 +288,20 @@ def test_remove_entry(fake_vault_env: Path, fake_ctx: Any) -> None:
     assert len(vault.entries) == 0
 
 
+def test_mutations_append_to_journal(fake_vault_env: Path, fake_ctx: Any) -> None:
+    commands.add_entry("GitHub", "JBSWY3DPEHPK3PXP", fake_ctx)
+    vault_bytes = fake_vault_env.read_bytes()
+
+    commands.add_entry("GitLab", "JBSWY3DPEHPK3PXP", fake_ctx)
+    commands.rename_entry("GitHub", "Hub", fake_ctx)
+    commands.remove_entry("GitLab", fake_ctx)
+
+    assert fake_vault_env.read_bytes() == vault_bytes
+    assert fake_vault_env.with_name(fake_vault_env.name + ".journal").exists()
+    vault = helpers.load_vault(fake_vault_env, TEST_PASSWORD)
+    assert [e.issuer for e in vault.entries] == ["Hub"]
+
+
 def test_remove_entry_missing_raises(fake_vault_env: Path, fake_ctx: Any) -> None:
     # Create empty vault
     from desktop_2fa.vault import Vault
@@ -165,6 +351,28 @@ def test_export_vault(
     assert "Exported vault to:" in out
 
 
+def _salt(path: Path) -> bytes:
+    from desktop_2fa.crypto.argon2 import KDF_PARAMS_LEN
+
+    offset = 5 + KDF_PARAMS_LEN  # version 3 header
+    return path.read_bytes()[offset : offset + 16]
+
+
+def test_copies_get_fresh_salt(
+    fake_vault_env: Path, tmp_path: Path, fake_ctx: Any
+) -> None:
+    commands.add_entry("GitHub", "JBSWY3DPEHPK3PXP", fake_ctx)
+    export_path = tmp_path / "export.bin"
+    commands.export_vault(str(export_path), fake_ctx)
+    commands.backup_vault(fake_ctx)
+    backup_path = fake_vault_env.with_suffix(".backup.bin")
+
+    salts = {_salt(fake_vault_env), _salt(export_path), _salt(backup_path)}
+    assert len(salts) == 3
+    for copy in (export_path, backup_path):
+        assert helpers.load_vault(copy, TEST_PASSWORD).get_entry("GitHub")
+
+
 def test_export_vault_missing_file(
     fake_vault_env: Path, tmp_path: Path, monkeypatch: Any, capsys: Any, fake_ctx: Any
 ) -> None:
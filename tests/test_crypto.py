@@ -3,7 +3,15 @@ import os
 import pytest
 
 from desktop_2fa.crypto.aesgcm import decrypt, encrypt
-from desktop_2fa.crypto.argon2 import derive_key
+from desktop_2fa.crypto.argon2 import (
+    DEFAULT_KDF_PARAMS,
+    MAX_DEFAULT_PARALLELISM,
+    MAX_MEMORY_COST,
+    KdfParams,
+    default_kdf_params,
+    derive_key,
+    tune_kdf_params,
+)
 
 
 def test_encrypt_decrypt() -> None:
@@ -48,3 +56,53 @@ def test_encrypt_decrypt_large_data() -> None:
     enc = encrypt(key, data)
     dec = decrypt(key, enc)
     assert dec == data
+
+
+def test_kdf_params_pack_roundtrip() -> None:
+    params = KdfParams(time_cost=3, memory_cost=64 * 1024, parallelism=4)
+    assert KdfParams.unpack(params.pack()) == params
+
+
+def test_kdf_params_validate() -> None:
+    with pytest.raises(ValueError, match="parallelism"):
+        KdfParams(parallelism=0).validate()
+    with pytest.raises(ValueError, match="memory"):
+        KdfParams(memory_cost=8, parallelism=4).validate()
+
+
+def test_derive_key_depends_on_params() -> None:
+    salt = os.urandom(16)
+    cheap = KdfParams(time_cost=1, memory_cost=1024, parallelism=1)
+    assert derive_key("password", salt, cheap) != derive_key(
+        "password", salt, KdfParams(time_cost=2, memory_cost=1024, parallelism=1)
+    )
+
+
+def test_tune_kdf_params_respects_bounds() -> None:
+    params = tune_kdf_params(
+        target_ms=20, max_memory_cost=4 * 1024, parallelism=2, min_memory_cost=1024
+    )
+    assert params.parallelism == 2
+    assert 1024 <= params.memory_cost <= 4 * 1024
+    assert params.time_cost >= 1
+    params.validate()
+
+
+def test_tune_kdf_params_clamps_memory(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("desktop_2fa.crypto.argon2.measure_kdf", lambda p: 0.0)
+    params = tune_kdf_params(
+        target_ms=20, max_memory_cost=64 * MAX_MEMORY_COST, parallelism=1
+    )
+    assert params.memory_cost == MAX_MEMORY_COST
+    params.validate()
+
+
+def test_default_kdf_params_follow_cpu_count(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("desktop_2fa.crypto.argon2.available_cpus", lambda: 6)
+    params = default_kdf_params()
+    assert params.parallelism == 6
+    assert params.memory_cost == DEFAULT_KDF_PARAMS.memory_cost
+    assert params.time_cost == DEFAULT_KDF_PARAMS.time_cost
+
+    monkeypatch.setattr("desktop_2fa.crypto.argon2.available_cpus", lambda: 256)
+    assert default_kdf_params().parallelism == MAX_DEFAULT_PARALLELISM
@@ -0,0 +1,98 @@
+from concurrent.futures import Future
+from typing import Any, Optional
+
+import pytest
+
+from desktop_2fa.cli.import_validation import RowError, normalize_row, validate_rows
+
+
+def _rows(n: int) -> list[dict[str, Any]]:
+    rows: list[dict[str, Any]] = []
+    for i in range(n):
+        row = {
+            "issuer": f"i{i}",
+            "account_name": f"a{i}",
+            "secret": "jbsw y3dp ehpk 3pxp",
+            "digits": 6,
+            "period": 30,
+            "algorithm": "SHA1",
+        }
+        if i % 7 == 3:
+            row["secret"] = "not base32!"
+        elif i % 7 == 5:
+            row["digits"] = 9
+        rows.append(row)
+    return rows
+
+
+def test_normalize_row_cleans_secret() -> None:
+    entry = normalize_row({"issuer": "GitHub", "secret": "jbsw y3dp ehpk 3pxp"})
+    assert entry.secret == "JBSWY3DPEHPK3PXP"
+    entry = normalize_row({"issuer": "Long", "secret": "JBSWY3DPEHPK3PXPJBSWY3DPEH"})
+    assert entry.secret == "JBSWY3DPEHPK3PXPJBSWY3DPEH======"
+
+
+def test_normalize_row_reports_reason() -> None:
+    with pytest.raises(ValueError, match="Base32"):
+        normalize_row({"issuer": "x", "secret": ""})
+    with pytest.raises(ValueError, match="digits"):
+        normalize_row({"issuer": "x", "secret": "JBSWY3DPEHPK3PXP", "digits": 9})
+
+
+def test_validate_rows_in_process_below_threshold() -> None:
+    entries, errors = validate_rows(iter(_rows(20)), workers=4, threshold=100)
+    assert [e.issuer for e in entries] == [
+        f"i{i}" for i in range(20) if i % 7 not in (3, 5)
+    ]
+    assert [e.row for e in errors] == [4, 6, 11, 13, 18, 20]
+    assert errors[0] == RowError(4, "secret is not valid Base32")
+
+
+def test_validate_rows_pool_matches_in_process(monkeypatch: Any) -> None:
+    monkeypatch.setattr("desktop_2fa.cli.import_validation.CHUNK_ROWS", 50)
+    rows = _rows(500)
+    expected, expected_errors = validate_rows(rows, workers=1)
+    entries, errors = validate_rows(iter(rows), workers=2, threshold=100)
+
+    def fields(e: Any) -> tuple[Any, ...]:
+        return (e.issuer, e.account_name, e.secret, e.digits, e.algorithm)
+
+    assert [fields(e) for e in entries] == [fields(e) for e in expected]
+    assert len({e.id for e in entries}) == len(entries)
+    assert errors == expected_errors
+
+
+def test_validate_rows_bounds_chunks_in_flight(monkeypatch: Any) -> None:
+    outstanding: list[int] = []
+
+    class Done(Future[Any]):
+        def result(self, timeout: Optional[float] = None) -> Any:
+            outstanding.append(outstanding[-1] - 1)
+            return super().result(timeout)
+
+    class InlinePool:
+        def __init__(self, max_workers: int) -> None:
+            pass
+
+        def __enter__(self) -> "InlinePool":
+            return self
+
+        def __exit__(self, *exc: object) -> None:
+            pass
+
+        def submit(self, fn: Any, *args: Any) -> Future[Any]:
+            outstanding.append((outstanding[-1] if outstanding else 0) + 1)
+            future = Done()
+            future.set_result(fn(*args))
+            return future
+
+    monkeypatch.setattr("desktop_2fa.cli.import_validation.CHUNK_ROWS", 10)
+    monkeypatch.setattr(
+        "desktop_2fa.cli.import_validation.ProcessPoolExecutor", InlinePool
+    )
+    rows = _rows(500)
+    entries, errors = validate_rows(iter(rows), workers=2, threshold=20)
+
+    assert max(outstanding) == 2 * 2
+    assert outstanding[-1] == 0
+    assert len(entries) + len(errors) == len(rows)
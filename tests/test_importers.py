@@ -1,9 +1,23 @@
+import base64
+import hashlib
+import io
+import json
+import os
 import pathlib
+from typing import Any, Iterator
+from xml.etree import ElementTree as ET
 
 import pytest
 
 from desktop_2fa.cli.importers import (
+    AegisPasswordRequired,
+    _JsonStream,
     import_from_format,
+    iter_1password_csv,
+    iter_aegis_json,
+    iter_bitwarden_csv,
+    iter_freeotp_xml,
+    iter_from_format,
     parse_1password_csv,
     parse_aegis_json,
     parse_bitwarden_csv,
@@ -12,6 +26,18 @@ from desktop_2fa.cli.importers import (
 )
 
 
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7])
+def test_json_stream_numbers_across_chunks(chunk_size: int) -> None:
+    """Numbers split by a read boundary decode whole."""
+    for text in ("1234", "-12.5e3", "12.5", "1e10"):
+        assert _JsonStream(io.StringIO(text), chunk_size).value() == json.loads(text)
+
+    text = '[12.5, -0.25, 1234, 6e2, true, "x", null]'
+    stream = _JsonStream(io.StringIO(text), chunk_size)
+    values = [stream.value() for _ in stream.items()]
+    assert values == json.loads(text)
+
+
 def test_parse_aegis_json() -> None:
     """Test parsing Aegis JSON format."""
     content = """{
@@ -238,3 +264,169 @@ def test_import_from_format_unsupported() -> None:
     """Test import_from_format with unsupported format."""
     with pytest.raises(ValueError, match="Unsupported format"):
         import_from_format("unsupported", "dummy")
+
+
+def test_iter_bitwarden_csv_is_lazy() -> None:
+    """Entries are yielded before the rest of the export is read."""
+    consumed = []
+
+    def lines() -> Iterator[str]:
+        yield "name,totp\n"
+        yield "GitHub,JBSWY3DPEHPK3PXP\n"
+        for i in range(1000):
+            consumed.append(i)
+            yield f"Site {i},\n"
+
+    entries = iter_bitwarden_csv(lines())
+    assert next(entries)["issuer"] == "GitHub"
+    assert len(consumed) <= 1
+    assert list(entries) == []
+    assert len(consumed) == 1000
+
+
+def test_iter_1password_csv_quoted_newline() -> None:
+    """Quoted fields spanning lines are parsed as one row."""
+    content = 'title,notes,otp\n"GitHub","line one\nline two",JBSWY3DPEHPK3PXP\n'
+    entries = list(iter_1password_csv(io.StringIO(content, newline="")))
+    assert len(entries) == 1
+    assert entries[0]["secret"] == "JBSWY3DPEHPK3PXP"
+
+
+def test_iter_from_format_streams_file(tmp_path: pathlib.Path) -> None:
+    """iter_from_format reads CSV exports incrementally from disk."""
+    csv_file = tmp_path / "bitwarden.csv"
+    csv_file.write_text("name,totp\n" + "Site,\n" * 10_000 + "Last,JBSWY3DPEHPK3PXP\n")
+
+    entries = list(iter_from_format("bitwarden", str(csv_file)))
+    assert [e["issuer"] for e in entries] == ["Last"]
+
+
+def test_iter_from_format_unsupported_raises_eagerly() -> None:
+    """Unsupported formats fail before iteration starts."""
+    with pytest.raises(ValueError, match="Unsupported format"):
+        iter_from_format("unsupported", "dummy")
+
+
+def test_iter_freeotp_xml_yields_before_end_of_file() -> None:
+    """Tokens are yielded as parsed; a later syntax error surfaces later."""
+    token = "<token><label>GitHub:me</label><secret>JBSWY3DPEHPK3PXP</secret></token>"
+    content = "<tokens><group>" + token + " " * 100_000 + "<token><broken"
+    entries = iter_freeotp_xml(io.StringIO(content))
+
+    first = next(entries)
+    assert (first["issuer"], first["account_name"]) == ("GitHub", "me")
+    with pytest.raises(ET.ParseError):
+        next(entries)
+
+
+def test_iter_freeotp_xml_from_path(tmp_path: pathlib.Path) -> None:
+    """Nested tokens are found and tokens without secrets skipped."""
+    xml_file = tmp_path / "freeotp.xml"
+    xml_file.write_text(
+        "<tokens><token><issuer>A</issuer><label>a</label><secret>S1</secret>"
+        "</token><group><token><issuer>B</issuer><label>b</label>"
+        "<secret>S2</secret></token></group><token><label>c</label></token>"
+        "</tokens>"
+    )
+    entries = list(iter_freeotp_xml(str(xml_file)))
+    assert [(e["issuer"], e["secret"]) for e in entries] == [("A", "S1"), ("B", "S2")]
+
+
+def _aegis_db(n: int) -> dict[str, Any]:
+    return {
+        "version": 2,
+        "entries": [
+            {
+                "type": "totp" if i % 2 == 0 else "hotp",
+                "uuid": f"uuid-{i}",
+                "name": f"account{i}",
+                "issuer": f"issuer{i}",
+                "info": {
+                    "secret": "JBSWY3DPEHPK3PXP",
+                    "algo": "SHA256",
+                    "digits": 8,
+                    "period": 30,
+                },
+            }
+            for i in range(n)
+        ],
+    }
+
+
+def _encrypted_aegis(db: dict[str, Any], password: str) -> str:
+    """Build an encrypted export the way Aegis does (scrypt + AES-GCM)."""
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+    master_key = os.urandom(32)
+    salt = os.urandom(32)
+    key = hashlib.scrypt(password.encode(), salt=salt, n=2**10, r=8, p=1, dklen=32)
+    slot_nonce = os.urandom(12)
+    sealed_key = AESGCM(key).encrypt(slot_nonce, master_key, None)
+    db_nonce = os.urandom(12)
+    sealed_db = AESGCM(master_key).encrypt(db_nonce, json.dumps(db).encode(), None)
+    return json.dumps(
+        {
+            "version": 1,
+            "header": {
+                "slots": [
+                    {"type": 2, "uuid": "bio", "key": "00"},
+                    {
+                        "type": 1,
+                        "uuid": "pw",
+                        "key": sealed_key[:-16].hex(),
+                        "key_params": {
+                            "nonce": slot_nonce.hex(),
+                            "tag": sealed_key[-16:].hex(),
+                        },
+                        "n": 2**10,
+                        "r": 8,
+                        "p": 1,
+                        "salt": salt.hex(),
+                    },
+                ],
+                "params": {"nonce": db_nonce.hex(), "tag": sealed_db[-16:].hex()},
+            },
+            "db": base64.b64encode(sealed_db[:-16]).decode(),
+        }
+    )
+
+
+def test_iter_aegis_json_plain_export_small_chunks() -> None:
+    """A real-layout export parses the same across tiny read sizes."""
+    content = json.dumps(
+        {"version": 1, "header": {"slots": None, "params": None}, "db": _aegis_db(6)},
+        indent=4,
+    )
+
+    class Trickle(io.StringIO):
+        def read(self, size: int | None = -1) -> str:
+            return super().read(7)
+
+    entries = list(iter_aegis_json(Trickle(content)))
+    assert [e["issuer"] for e in entries] == ["issuer0", "issuer2", "issuer4"]
+    assert entries[0]["algorithm"] == "SHA256"
+    assert entries[0]["digits"] == 8
+    assert entries == parse_aegis_json(content)
+
+
+def test_iter_aegis_json_yields_before_end_of_file() -> None:
+    """Entries are yielded as read; a later syntax error surfaces later."""
+    first = json.dumps(_aegis_db(1)["entries"][0])
+    entries = iter_aegis_json(io.StringIO('{"entries": [' + first + ", {broken"))
+    assert next(entries)["issuer"] == "issuer0"
+    with pytest.raises(ValueError):
+        next(entries)
+
+
+def test_iter_aegis_json_encrypted(tmp_path: pathlib.Path) -> None:
+    """Encrypted exports are decrypted with the password slot."""
+    export = tmp_path / "aegis.json"
+    export.write_text(_encrypted_aegis(_aegis_db(4), "hunter22"))
+
+    entries = list(iter_aegis_json(str(export), "hunter22"))
+    assert [e["issuer"] for e in entries] == ["issuer0", "issuer2"]
+
+    with pytest.raises(AegisPasswordRequired):
+        list(iter_aegis_json(str(export)))
+    with pytest.raises(ValueError, match="Invalid password"):
+        list(iter_aegis_json(str(export), "wrong"))
@@ -0,0 +1,120 @@
+from pathlib import Path
+from typing import Any, Iterator
+
+import pytest
+from typer.testing import CliRunner
+
+from desktop_2fa.cli.main import app
+from desktop_2fa.utils import metrics
+from desktop_2fa.utils.metrics import METRICS_FILE_ENV, OpenMetricsExporter
+from desktop_2fa.vault import Vault
+from desktop_2fa.vault.vault import InvalidPassword
+
+TEST_PASSWORD = "jawislajawisla"
+runner = CliRunner()
+
+
+class RecordingHook:
+    def __init__(self) -> None:
+        self.events: list[tuple[str, str, float, dict[str, str]]] = []
+
+    def inc(self, name: str, value: float, labels: dict[str, str]) -> None:
+        self.events.append(("inc", name, value, labels))
+
+    def set_gauge(self, name: str, value: float, labels: dict[str, str]) -> None:
+        self.events.append(("gauge", name, value, labels))
+
+    def observe(self, name: str, value: float, labels: dict[str, str]) -> None:
+        self.events.append(("observe", name, value, labels))
+
+    def names(self) -> list[str]:
+        return [name for _, name, _, _ in self.events]
+
+
+@pytest.fixture
+def hook() -> Iterator[RecordingHook]:
+    recorder = RecordingHook()
+    metrics.register(recorder)
+    yield recorder
+    metrics.unregister(recorder)
+
+
+def test_vault_lifecycle_metrics(tmp_path: Path, hook: RecordingHook) -> None:
+    path = tmp_path / "vault"
+    Vault().save(path, TEST_PASSWORD)
+    assert hook.names() == [
+        "d2fa_vault_kdf_seconds",
+        "d2fa_vault_save_seconds",
+        "d2fa_vault_save_bytes",
+        "d2fa_vault_entries",
+    ]
+    assert hook.events[2][2] == path.stat().st_size
+
+    hook.events.clear()
+    Vault.load(path, TEST_PASSWORD)
+    assert hook.names() == [
+        "d2fa_vault_kdf_seconds",
+        "d2fa_vault_unlock_seconds",
+        "d2fa_vault_entries",
+    ]
+    assert set(hook.events[0][3]) == {"time_cost", "memory_kib", "lanes"}
+
+    hook.events.clear()
+    with pytest.raises(InvalidPassword):
+        Vault.load(path, "wrong password")
+    assert hook.events[-1] == (
+        "inc",
+        "d2fa_vault_failures",
+        1.0,
+        {"op": "load", "error": "InvalidPassword"},
+    )
+
+
+def test_unregistered_hook_receives_nothing(tmp_path: Path) -> None:
+    recorder = RecordingHook()
+    metrics.register(recorder)
+    metrics.unregister(recorder)
+    metrics.inc("anything")
+    assert recorder.events == []
+    assert not metrics.enabled()
+
+
+def test_exporter_accumulates_across_flushes(tmp_path: Path) -> None:
+    path = tmp_path / "metrics.prom"
+    for _ in range(2):
+        exporter = OpenMetricsExporter(path)
+        exporter.inc("d2fa_vault_failures", 1, {"op": "load", "error": "X"})
+        exporter.set_gauge("d2fa_vault_entries", 7, {})
+        exporter.observe("d2fa_vault_unlock_seconds", 0.3, {})
+        exporter.observe("d2fa_vault_unlock_seconds", 20.0, {})
+        exporter.flush()
+
+    lines = path.read_text().splitlines()
+    assert 'd2fa_vault_failures_total{error="X",op="load"} 2' in lines
+    assert "d2fa_vault_entries 7" in lines
+    assert "# UNIT d2fa_vault_unlock_seconds seconds" in lines
+    assert 'd2fa_vault_unlock_seconds_bucket{le="0.25"} 0' in lines
+    assert 'd2fa_vault_unlock_seconds_bucket{le="0.5"} 2' in lines
+    assert 'd2fa_vault_unlock_seconds_bucket{le="+Inf"} 4' in lines
+    assert "d2fa_vault_unlock_seconds_sum 40.6" in lines
+    assert "d2fa_vault_unlock_seconds_count 4" in lines
+    assert lines[-1] == "# EOF"
+
+
+def test_cli_writes_metrics_file(tmp_path: Path, monkeypatch: Any) -> None:
+    metrics_file = tmp_path / "metrics.prom"
+    monkeypatch.setenv(METRICS_FILE_ENV, str(metrics_file))
+    monkeypatch.setattr(
+        "desktop_2fa.cli.helpers.get_vault_path", lambda: str(tmp_path / "vault")
+    )
+
+    result = runner.invoke(
+        app, ["--password", TEST_PASSWORD, "add", "GitHub", "JBSWY3DPEHPK3PXP"]
+    )
+    assert result.exit_code == 0
+    runner.invoke(app, ["--password", "not the password", "list"])
+
+    text = metrics_file.read_text()
+    assert "d2fa_vault_save_bytes_count 1" in text
+    assert 'd2fa_vault_failures_total{error="InvalidPassword",op="load"} 1' in text
+    assert not metrics.enabled()
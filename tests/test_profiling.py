@@ -0,0 +1,95 @@
+import json
+from pathlib import Path
+from typing import Any
+
+from typer.testing import CliRunner
+
+from desktop_2fa.cli.main import app
+from desktop_2fa.utils import profiling
+from desktop_2fa.utils.profiling import Profiler, phase
+from desktop_2fa.vault import Vault
+
+TEST_PASSWORD = "jawislajawisla"
+runner = CliRunner()
+
+
+def test_phase_is_noop_without_profiler() -> None:
+    assert profiling._active is None
+    with phase("anything"):
+        pass
+    assert profiling._active is None
+
+
+def test_profiler_records_nested_phases() -> None:
+    profiler = Profiler()
+    profiler.start()
+    try:
+        with phase("outer"):
+            with phase("inner"):
+                blob = bytearray(512 * 1024)
+            del blob
+    finally:
+        profiler.stop()
+
+    assert [(r.name, r.depth) for r in profiler.records] == [
+        ("outer", 0),
+        ("outer/inner", 1),
+    ]
+    outer, inner = profiler.records
+    assert outer.elapsed_ms >= inner.elapsed_ms >= 0
+    assert inner.peak_heap_kib >= 512
+    assert outer.peak_heap_kib >= inner.peak_heap_kib
+    assert profiling._active is None
+
+
+def test_vault_load_and_save_phases(tmp_path: Path) -> None:
+    path = tmp_path / "vault"
+    Vault().save(path, TEST_PASSWORD)
+
+    profiler = Profiler(trace_memory=False)
+    profiler.start()
+    try:
+        Vault.load(path, TEST_PASSWORD).save(path, TEST_PASSWORD)
+    finally:
+        profiler.stop()
+
+    names = [r.name for r in profiler.records]
+    assert names == [
+        "vault.load",
+        "vault.load/read",
+        "vault.load/derive_key",
+        "vault.load/decrypt",
+        "vault.load/parse",
+        "vault.load/index",
+        "vault.load/journal",
+        "vault.save",
+        "vault.save/serialize",
+        "vault.save/encrypt",
+        "vault.save/write",
+    ]
+
+
+def test_cli_profile_json(tmp_path: Path, monkeypatch: Any) -> None:
+    monkeypatch.setattr(
+        "desktop_2fa.cli.helpers.get_vault_path", lambda: str(tmp_path / "vault")
+    )
+    runner.invoke(
+        app, ["--password", TEST_PASSWORD, "add", "GitHub", "JBSWY3DPEHPK3PXP"]
+    )
+
+    result = runner.invoke(
+        app,
+        ["--profile", "--profile-format", "json", "--password", TEST_PASSWORD, "list"],
+    )
+    assert result.exit_code == 0
+    assert "- GitHub (GitHub)" in result.stdout
+    report = json.loads(result.stderr.strip().splitlines()[-1])
+    names = [p["name"] for p in report["phases"]]
+    assert names[0] == "command list"
+    assert "command list/vault.load/derive_key" in names
+    assert profiling._active is None
+
+
+def test_cli_profile_rejects_unknown_format() -> None:
+    result = runner.invoke(app, ["--profile", "--profile-format", "xml", "list"])
+    assert result.exit_code == 1
@@ -0,0 +1,82 @@
+import time
+
+from desktop_2fa.vault import Vault
+from desktop_2fa.vault.models import TotpEntry
+from desktop_2fa.vault.search import EXACT_SCORE, SearchIndex
+
+
+def _entry(issuer: str, account: str | None = None) -> TotpEntry:
+    return TotpEntry(
+        issuer=issuer, account_name=account or issuer, secret="JBSWY3DPEHPK3PXP"
+    )
+
+
+def _names(
+    index: SearchIndex, query: str, fuzzy: bool = True, limit: int | None = None
+) -> list[str]:
+    return [str(hit.entry.issuer) for hit in index.search(query, fuzzy, limit)]
+
+
+def test_search_ranks_exact_prefix_substring_fuzzy() -> None:
+    index = SearchIndex(
+        [_entry("MyGitHub"), _entry("GitHub Enterprise"), _entry("GitHub")]
+    )
+
+    hits = index.search("github")
+    assert [h.entry.issuer for h in hits] == [
+        "GitHub",
+        "GitHub Enterprise",
+        "MyGitHub",
+    ]
+    assert hits[0].score == EXACT_SCORE
+    assert hits[0].score > hits[1].score > hits[2].score
+
+
+def test_search_is_case_insensitive_and_matches_account() -> None:
+    index = SearchIndex([_entry("Google", "alice@example.com"), _entry("AWS")])
+    assert _names(index, "ALICE") == ["Google"]
+    assert _names(index, "example.com") == ["Google"]
+
+
+def test_search_fuzzy_tolerates_typos() -> None:
+    index = SearchIndex([_entry("Cloudflare"), _entry("Dropbox")])
+    assert _names(index, "clodflare") == ["Cloudflare"]
+    assert _names(index, "clodflare", fuzzy=False) == []
+
+
+def test_search_short_and_empty_queries() -> None:
+    index = SearchIndex([_entry("AWS"), _entry("Slack")])
+    assert _names(index, "a", fuzzy=False) == ["AWS", "Slack"]
+    assert index.search("") == []
+    assert index.search("zz") == []
+
+
+def test_search_limit_keeps_best_hits() -> None:
+    index = SearchIndex([_entry(f"svc{i}") for i in range(50)] + [_entry("svc")])
+    assert _names(index, "svc", limit=2) == ["svc", "svc0"]
+
+
+def test_vault_search_tracks_changes() -> None:
+    vault = Vault()
+    vault.add_entry("GitHub", "JBSWY3DPEHPK3PXP")
+    assert [h.entry.issuer for h in vault.search("git")] == ["GitHub"]
+
+    vault.rename_entry("GitHub", "Work")
+    assert vault.search("git") == []
+    vault.add_entry("GitLab", "JBSWY3DPEHPK3PXP")
+    assert [h.entry.issuer for h in vault.search("git")] == ["GitLab"]
+    vault.remove_entry("GitLab")
+    assert vault.search("git") == []
+
+
+def test_search_large_vault_is_fast() -> None:
+    index = SearchIndex(
+        _entry(f"service{i}", f"user{i}@example.com") for i in range(10_000)
+    )
+    start = time.perf_counter()
+    hits = index.search("service9999", limit=1)
+    elapsed = time.perf_counter() - start
+
+    assert hits[0].entry.issuer == "service9999"
+    # Generous bound for slow CI machines; typically well under 1 ms.
+    assert elapsed < 0.05
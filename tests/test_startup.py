@@ -0,0 +1,46 @@
+import subprocess
+import sys
+
+# Modules that must not be imported just to build the CLI app; they are
+# loaded by the commands that need them.
+HEAVY_MODULES = ("rich", "pydantic", "pydantic_core", "cryptography", "argon2")
+
+# Import time attributed to desktop_2fa itself, excluding typer. Generous
+# for slow CI machines: eager imports used to cost ~90 ms here.
+OWN_IMPORT_BUDGET_US = 25_000
+
+
+def _importtime(module: str) -> dict[str, int]:
+    """Return the cumulative import time in microseconds of each module."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_cli_import_skips_heavy_modules() -> None:
+    times = _importtime("desktop_2fa.cli.main")
+    loaded = {name.split(".")[0] for name in times}
+    assert loaded.isdisjoint(HEAVY_MODULES)
+
+
+def test_cli_import_time_budget() -> None:
+    times = _importtime("desktop_2fa.cli.main")
+    own = times["desktop_2fa.cli.main"] - times.get("typer", 0)
+    assert own < OWN_IMPORT_BUDGET_US
+
+
+def test_vault_package_imports_lazily() -> None:
+    times = _importtime("desktop_2fa.vault")
+    assert "desktop_2fa.vault.vault" not in times
+    assert "pydantic" not in times
@@ -1,6 +1,15 @@
+import base64
+
 import pytest
 
-from desktop_2fa.totp.generator import generate
+from desktop_2fa.totp.generator import (
+    TotpGenerator,
+    _b32decode,
+    generate,
+    generate_many,
+    verify,
+)
+from desktop_2fa.vault.models import TotpEntry
 
 SECRET = "JBSWY3DPEHPK3PXP"  # poprawny base32
 
@@ -47,3 +56,129 @@ def test_totp_different_digits() -> None:
 def test_totp_unsupported_algorithm() -> None:
     with pytest.raises(ValueError):
         generate(SECRET, timestamp=0, digits=6, period=30, algorithm="MD5")
+
+
+# RFC 6238 appendix B test vectors (8 digits, 30 s period).
+RFC_SECRETS = {
+    "SHA1": base64.b32encode(b"12345678901234567890").decode(),
+    "SHA256": base64.b32encode(b"12345678901234567890123456789012").decode(),
+    "SHA512": base64.b32encode(b"1234567890" * 6 + b"1234").decode(),
+}
+RFC_VECTORS = [
+    (59, "94287082", "46119246", "90693936"),
+    (1111111109, "07081804", "68084774", "25091201"),
+    (1234567890, "89005924", "91819424", "93441116"),
+    (20000000000, "65353130", "77737706", "47863826"),
+]
+
+
+@pytest.mark.parametrize("timestamp,sha1,sha256,sha512", RFC_VECTORS)
+def test_totp_rfc6238_vectors(
+    timestamp: int, sha1: str, sha256: str, sha512: str
+) -> None:
+    for algorithm, expected in (("SHA1", sha1), ("SHA256", sha256), ("SHA512", sha512)):
+        secret = RFC_SECRETS[algorithm]
+        assert generate(secret, timestamp, digits=8, algorithm=algorithm) == expected
+        gen = TotpGenerator(secret, digits=8, algorithm=algorithm)
+        assert gen.code_at(timestamp) == expected
+
+
+def test_totp_generator_codes_for_range() -> None:
+    gen = TotpGenerator(SECRET)
+    codes = gen.codes_for(range(0, 300, 30))
+
+    assert len(codes) == 10
+    assert codes == [generate(SECRET, timestamp=t) for t in range(0, 300, 30)]
+    # Reusing the pre-keyed state must not leak between calls.
+    assert gen.code_at(0) == codes[0]
+
+
+def test_totp_generator_from_entry() -> None:
+    entry = TotpEntry(
+        issuer="X", account_name="X", secret=SECRET, digits=8, algorithm="SHA256"
+    )
+    gen = TotpGenerator.from_entry(entry)
+
+    assert gen.code_at(0) == generate(SECRET, 0, digits=8, algorithm="SHA256")
+
+
+def test_totp_generator_unsupported_algorithm() -> None:
+    with pytest.raises(ValueError):
+        TotpGenerator(SECRET, algorithm="MD5")
+
+
+def test_verify_returns_drift_offset() -> None:
+    now = 1_000_000
+    for offset in (-2, -1, 0, 1, 2):
+        code = generate(SECRET, timestamp=now + offset * 30)
+        assert verify(SECRET, code, timestamp=now, window=2) == offset
+
+
+def test_verify_outside_window() -> None:
+    now = 1_000_000
+    code = generate(SECRET, timestamp=now + 3 * 30)
+    assert verify(SECRET, code, timestamp=now, window=2) is None
+    assert verify(SECRET, "000000x", timestamp=now) is None
+
+
+def test_verify_window_zero_and_negative() -> None:
+    now = 1_000_000
+    gen = TotpGenerator(SECRET)
+    assert gen.verify(gen.code_at(now), timestamp=now, window=0) == 0
+    assert gen.verify(gen.code_at(now - 30), timestamp=now, window=0) is None
+    with pytest.raises(ValueError):
+        gen.verify("123456", timestamp=now, window=-1)
+
+
+def test_verify_near_epoch_skips_negative_counters() -> None:
+    assert verify(SECRET, generate(SECRET, timestamp=0), timestamp=0, window=3) == 0
+
+
+def _bulk_entries() -> list[TotpEntry]:
+    return [
+        TotpEntry(
+            issuer=f"i{n}",
+            account_name=f"a{n}",
+            secret=base64.b32encode(bytes([n]) * (10 + n % 23)).decode(),
+            digits=(6, 7, 8)[n % 3],
+            period=(30, 60)[n % 2],
+            algorithm=("SHA1", "SHA256", "SHA512")[n % 5 % 3],
+        )
+        for n in range(60)
+    ]
+
+
+def test_generate_many_matches_generate() -> None:
+    entries = _bulk_entries()
+    expected = [
+        generate(e.secret, 1_234_567, e.digits, e.period, e.algorithm) for e in entries
+    ]
+    assert generate_many(entries, 1_234_567, use_numpy=False) == expected
+    assert generate_many([], 1_234_567) == []
+
+
+def test_generate_many_numpy_path() -> None:
+    pytest.importorskip("numpy")
+    entries = _bulk_entries()
+    assert generate_many(entries, 99, use_numpy=True) == generate_many(
+        entries, 99, use_numpy=False
+    )
+
+
+def test_generate_many_unsupported_algorithm() -> None:
+    class Entry:
+        secret = SECRET
+        digits = 6
+        period = 30
+        algorithm = "MD5"
+
+    with pytest.raises(ValueError):
+        generate_many([Entry()], 0)
+
+
+@pytest.mark.parametrize("length", [1, 5, 10, 16, 20, 32, 64])
+def test_fast_b32decode(length: int) -> None:
+    raw = bytes(range(256))[:length]
+    secret = base64.b32encode(raw).decode()
+    assert _b32decode(secret) == raw
+    assert _b32decode(secret.lower()) == raw
@@ -0,0 +1,42 @@
+import base64
+
+from desktop_2fa.totp.generator import generate_many
+from desktop_2fa.totp.pool import BulkGenerator
+from desktop_2fa.vault.models import TotpEntry
+
+
+def _entries(n: int) -> list[TotpEntry]:
+    return [
+        TotpEntry(
+            issuer=f"i{i}",
+            account_name=f"a{i}",
+            secret=base64.b32encode(i.to_bytes(4, "big") * 5).decode(),
+            digits=(6, 8)[i % 2],
+            algorithm=("SHA1", "SHA256", "SHA512")[i % 3],
+        )
+        for i in range(n)
+    ]
+
+
+def test_bulk_generator_in_process_below_threshold() -> None:
+    entries = _entries(50)
+    with BulkGenerator(entries, workers=4, threshold=1000) as bulk:
+        assert not bulk.use_pool
+        assert bulk.codes_at(1_000_000) == generate_many(entries, 1_000_000)
+        assert bulk._executor is None
+
+
+def test_bulk_generator_pool_matches_in_process() -> None:
+    entries = _entries(500)
+    with BulkGenerator(entries, workers=2, threshold=100) as bulk:
+        assert bulk.use_pool
+        for ts in (0, 1_000_000, 2_000_000_000):
+            assert bulk.codes_at(ts) == generate_many(entries, ts)
+    assert bulk._executor is None
+
+
+def test_bulk_generator_single_worker_stays_in_process() -> None:
+    bulk = BulkGenerator(_entries(10), workers=1, threshold=0)
+    assert not bulk.use_pool
+    assert len(bulk) == 10
+    assert len(bulk.codes_at()) == 10
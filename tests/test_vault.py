@@ -1,10 +1,14 @@
+import warnings
 from pathlib import Path
 from typing import Any
 
 import pytest
 
+from desktop_2fa.crypto.argon2 import KdfParams
 from desktop_2fa.vault import Vault
-from desktop_2fa.vault.models import TotpEntry
+from desktop_2fa.vault.models import TotpEntry, VaultData
+
+_FAST_KDF = KdfParams(time_cost=1, memory_cost=8 * 1024, parallelism=1)
 
 
 def test_vault_roundtrip(tmp_path: Path) -> None:
@@ -79,7 +83,7 @@ def test_vault_load_unsupported_version(tmp_path: Path) -> None:
     path = tmp_path / "vault.bin"
 
     # Create a file with unsupported version
-    invalid_data = b"D2FA" + b"\x02" + b"16byte_salt_here" + b"encrypted_data"
+    invalid_data = b"D2FA" + b"\x7f" + b"16byte_salt_here" + b"encrypted_data"
     path.write_bytes(invalid_data)
 
     with pytest.raises(Exception, match="Unsupported vault file version"):
@@ -304,3 +308,638 @@ def test_vault_load_file_too_short(tmp_path: Path) -> None:
 
     with pytest.raises(Exception, match="Vault file is too short or invalid format"):
         Vault.load(str(path))
+
+
+def test_vault_load_empty_file(tmp_path: Path) -> None:
+    from desktop_2fa.vault.vault import UnsupportedFormat
+
+    path = tmp_path / "vault.bin"
+    path.write_bytes(b"")
+    with pytest.raises(UnsupportedFormat, match="too short"):
+        Vault.load(str(path))
+
+
+@pytest.mark.skipif(not Path("/proc/self/maps").exists(), reason="needs procfs")
+@pytest.mark.parametrize("payload_format", ["binary", "segmented"])
+def test_vault_load_releases_file_mapping(tmp_path: Path, payload_format: str) -> None:
+    """Vault.load maps the file only while decrypting it."""
+    from desktop_2fa.vault.vault import InvalidPassword
+
+    path = tmp_path / "vault.bin"
+    vault = _payload_vault()
+    vault.payload_format = payload_format
+    vault.save(str(path), password="pw")
+
+    loaded = Vault.load(str(path), password="pw")
+    assert str(path) not in Path("/proc/self/maps").read_text()
+    assert loaded.get_entry("GitHub").secret == "JBSWY3DPEHPK3PXP"
+
+    with pytest.raises(InvalidPassword):
+        Vault.load(str(path), password="wrong")
+    assert str(path) not in Path("/proc/self/maps").read_text()
+
+
+def _salt(path: Path) -> bytes:
+    """Return the salt of a version 2 vault file."""
+    return path.read_bytes()[17:33]
+
+
+def test_vault_save_reuses_unlock_key(tmp_path: Path, monkeypatch: Any) -> None:
+    """Saving a loaded vault re-encrypts under the same salt without a KDF run."""
+    path = tmp_path / "vault.bin"
+
+    vault = Vault()
+    vault.add_entry("Test", "JBSWY3DPEHPK3PXP")
+    vault.save(str(path), password="pw")
+    salt = _salt(path)
+
+    loaded = Vault.load(str(path), password="pw")
+
+    def fail(*args: Any, **kwargs: Any) -> bytes:
+        raise AssertionError("derive_key should not run")
+
+    monkeypatch.setattr("desktop_2fa.vault.vault.derive_key", fail)
+    loaded.add_entry("Other", "JBSWY3DPEHPK3PXP")
+    loaded.save(str(path), password="pw")
+    monkeypatch.undo()
+
+    assert _salt(path) == salt
+    assert len(Vault.load(str(path), password="pw").entries) == 2
+
+
+def test_vault_save_with_new_password_derives_new_key(tmp_path: Path) -> None:
+    """A different password on save never reuses the cached key."""
+    path = tmp_path / "vault.bin"
+
+    vault = Vault()
+    vault.save(str(path), password="old")
+    salt = _salt(path)
+
+    vault.save(str(path), password="new")
+    assert _salt(path) != salt
+    Vault.load(str(path), password="new")
+    with pytest.raises(Exception, match="Invalid password"):
+        Vault.load(str(path), password="old")
+
+
+def test_vault_rekey_changes_salt(tmp_path: Path) -> None:
+    """rekey() draws a fresh salt that the next save uses."""
+    path = tmp_path / "vault.bin"
+
+    vault = Vault()
+    vault.save(str(path), password="pw")
+    salt = _salt(path)
+
+    vault.rekey("pw")
+    vault.save(str(path), password="pw")
+    assert _salt(path) != salt
+    Vault.load(str(path), password="pw")
+
+
+def test_vault_header_records_kdf_params(tmp_path: Path) -> None:
+    """Version 3 headers carry the Argon2id parameters used to seal the vault."""
+    from desktop_2fa.crypto.argon2 import KdfParams
+
+    path = tmp_path / "vault.bin"
+    params = KdfParams(time_cost=1, memory_cost=8 * 1024, parallelism=1)
+
+    vault = Vault()
+    vault.add_entry("Test", "JBSWY3DPEHPK3PXP")
+    vault.rekey("pw", kdf_params=params)
+    vault.save(str(path), password="pw")
+
+    raw = path.read_bytes()
+    assert raw[:5] == b"D2FA\x03"
+    assert KdfParams.unpack(raw[5:17]) == params
+
+    loaded = Vault.load(str(path), password="pw")
+    assert loaded.kdf_params == params
+    assert loaded.get_entry("Test").secret == "JBSWY3DPEHPK3PXP"
+
+
+def test_vault_load_version1_upgrades_on_save(tmp_path: Path) -> None:
+    """Legacy version 1 vaults load with the fixed parameters and save as v3."""
+    from desktop_2fa.crypto.aesgcm import encrypt
+    from desktop_2fa.crypto.argon2 import LEGACY_KDF_PARAMS, derive_key
+
+    path = tmp_path / "vault.bin"
+    salt = b"16byte_salt_here"
+    key = derive_key("pw", salt)
+    payload = b'{"entries": [{"issuer": "Old", "secret": "JBSWY3DPEHPK3PXP"}]}'
+    path.write_bytes(b"D2FA\x01" + salt + encrypt(key, payload))
+
+    vault = Vault.load(str(path), password="pw")
+    assert vault.kdf_params == LEGACY_KDF_PARAMS
+    vault.save(str(path), password="pw")
+
+    assert path.read_bytes()[:5] == b"D2FA\x03"
+    assert _salt(path) == salt
+    assert Vault.load(str(path), password="pw").get_entry("Old")
+
+
+def test_vault_load_rejects_absurd_kdf_params(tmp_path: Path) -> None:
+    """Out-of-range parameters in the header are rejected before any KDF run."""
+    import struct
+
+    path = tmp_path / "vault.bin"
+    params = struct.pack(">III", 1, 0xFFFFFFFF, 1)
+    path.write_bytes(b"D2FA\x02" + params + b"16byte_salt_here" + b"x" * 40)
+
+    with pytest.raises(Exception, match="Invalid vault header"):
+        Vault.load(str(path))
+
+
+def test_new_vault_uses_cpu_sized_lanes(tmp_path: Path, monkeypatch: Any) -> None:
+    """New vaults pick their lane count from the host and record it."""
+    from desktop_2fa.crypto.argon2 import KdfParams
+
+    monkeypatch.setattr("desktop_2fa.crypto.argon2.available_cpus", lambda: 3)
+    path = tmp_path / "vault.bin"
+    Vault().save(str(path), password="pw")
+
+    assert KdfParams.unpack(path.read_bytes()[5:17]).parallelism == 3
+    assert Vault.load(str(path), password="pw").kdf_params.parallelism == 3
+
+
+def test_vault_index_lookup_and_remove() -> None:
+    """Lookups by issuer, account name and id go through the hash index."""
+    vault = Vault()
+    vault.add_entry("GitHub", "JBSWY3DPEHPK3PXP", account_name="alice")
+    vault.add_entry("GitLab", "JBSWY3DPEHPK3PXQ")
+    vault.add_entry("Mail", "JBSWY3DPEHPK3PXR", account_name="alice")
+
+    assert vault.get_entry("GitHub").account_name == "alice"
+    # A shared name resolves to the earliest added entry, as before.
+    assert vault.get_entry("alice").issuer == "GitHub"
+    entry = vault.get_entry("GitLab")
+    assert vault.get_entry_by_id(entry.id) is entry
+
+    vault.remove_entry("alice")
+    assert vault.get_entry("alice").issuer == "Mail"
+    assert [e.issuer for e in vault.entries] == ["GitLab", "Mail"]
+    with pytest.raises(ValueError, match="not found"):
+        vault.get_entry("GitHub")
+    with pytest.raises(ValueError, match="not found"):
+        vault.get_entry_by_id("missing")
+
+
+def test_vault_rename_keeps_index_consistent() -> None:
+    vault = Vault()
+    vault.add_entry("GitHub", "JBSWY3DPEHPK3PXP")
+    entry = vault.rename_entry("GitHub", "Work")
+
+    assert vault.get_entry("Work") is entry
+    with pytest.raises(ValueError, match="not found"):
+        vault.get_entry("GitHub")
+    vault.remove_entry("Work")
+    assert vault.entries == []
+
+
+def test_vault_entry_ids_survive_roundtrip(tmp_path: Path) -> None:
+    path = tmp_path / "vault.bin"
+    vault = Vault()
+    vault.add_entry("A", "JBSWY3DPEHPK3PXP")
+    vault.add_entry("B", "JBSWY3DPEHPK3PXQ")
+    vault.remove_entry("A")
+    vault.save(str(path), password="pw")
+
+    loaded = Vault.load(str(path), password="pw")
+    assert [e.issuer for e in loaded.entries] == ["B"]
+    assert loaded.entries[0].id == vault.get_entry("B").id
+
+
+def test_vault_index_follows_direct_list_mutation() -> None:
+    """Callers that edit the entries list directly do not desync lookups."""
+    vault = Vault()
+    vault.add_entry("A", "JBSWY3DPEHPK3PXP")
+    vault.entries.clear()
+    with pytest.raises(ValueError, match="not found"):
+        vault.get_entry("A")
+
+    vault.entries.append(
+        TotpEntry(issuer="B", account_name="B", secret="JBSWY3DPEHPK3PXP")
+    )
+    assert vault.get_entry("B").issuer == "B"
+
+
+def test_vault_add_entries_dedupes() -> None:
+    vault = Vault()
+    vault.add_entry("GitHub", "JBSWY3DPEHPK3PXP")
+    added = vault.add_entries(
+        [
+            TotpEntry(
+                issuer="GitHub", account_name="GitHub", secret="jbswy3dpehpk3pxp"
+            ),
+            TotpEntry(issuer="GitHub", account_name="work", secret="JBSWY3DPEHPK3PXP"),
+            TotpEntry(issuer="GitHub", account_name="work", secret="JBSWY3DPEHPK3PXP"),
+        ]
+    )
+    assert [e.account_name for e in added] == ["work"]
+    assert [e.account_name for e in vault.entries] == ["GitHub", "work"]
+    assert vault.get_entry("work") is added[0]
+
+
+def _payload_vault() -> Vault:
+    vault = Vault(
+        VaultData(
+            entries=[
+                TotpEntry(
+                    issuer="GitHub",
+                    account_name="me@example.com",
+                    secret="JBSWY3DPEHPK3PXP",
+                ),
+                TotpEntry(
+                    issuer="Zażółć",
+                    account_name=None,
+                    secret="jbswy3dpehpk3pxp",
+                    digits=8,
+                    period=60,
+                    algorithm="SHA512",
+                ),
+                TotpEntry(
+                    id="custom-id",
+                    issuer=None,
+                    account_name="",
+                    secret="GEZDGNBVGY3TQOJQ",
+                    algorithm="SHA256",
+                ),
+                TotpEntry(issuer="Padded", account_name="a", secret="MZXW6==="),
+            ]
+        )
+    )
+    vault.kdf_params = _FAST_KDF
+    return vault
+
+
+def test_binary_payload_roundtrip() -> None:
+    """The binary payload reproduces every field, raw or text-encoded."""
+    from desktop_2fa.vault import payload
+
+    data = _payload_vault().data
+    decoded = payload.decode(payload.encode(data))
+    assert decoded.model_dump() == data.model_dump()
+    assert len(payload.encode(data)) < len(data.model_dump_json())
+    first, second = decoded.entries[:2]
+    assert first.model_fields_set == set(TotpEntry.model_fields)
+    assert first.model_fields_set is not second.model_fields_set
+
+
+def test_binary_payload_rejects_malformed_input() -> None:
+    from desktop_2fa.vault import payload
+
+    raw = payload.encode(_payload_vault().data)
+    for bad in (b"", raw[:-1], raw + b"x", b"\x09" + raw[1:]):
+        with pytest.raises(ValueError):
+            payload.decode(bad)
+
+
+@pytest.mark.parametrize(
+    ("payload_format", "version"),
+    [("binary", b"\x03"), ("json", b"\x02"), ("segmented", b"\x05")],
+)
+def test_vault_payload_format_selects_header_version(
+    tmp_path: Path, payload_format: str, version: bytes
+) -> None:
+    """Every payload encoding saves and loads; the header records which one."""
+    path = tmp_path / "vault.bin"
+    vault = _payload_vault()
+    vault.payload_format = payload_format
+    vault.save(str(path), password="pw")
+
+    assert path.read_bytes()[:5] == b"D2FA" + version
+    loaded = Vault.load(str(path), password="pw")
+    assert loaded.data.model_dump() == vault.data.model_dump()
+
+
+def test_vault_json_payload_kept_on_save(tmp_path: Path) -> None:
+    path = tmp_path / "vault.bin"
+    vault = _payload_vault()
+    vault.payload_format = "json"
+    vault.save(str(path), password="pw")
+
+    loaded = Vault.load(str(path), password="pw")
+    assert loaded.payload_format == "json"
+    loaded.save(str(path), password="pw")
+    assert path.read_bytes()[:5] == b"D2FA\x02"
+
+
+def test_vault_load_corrupted_binary_payload(tmp_path: Path) -> None:
+    """A binary payload that decrypts but does not decode is CorruptedVault."""
+    from desktop_2fa.crypto.aesgcm import encrypt
+    from desktop_2fa.crypto.argon2 import derive_key
+    from desktop_2fa.vault.vault import CorruptedVault
+
+    path = tmp_path / "vault.bin"
+    salt = b"16byte_salt_here"
+    key = derive_key("pw", salt, _FAST_KDF)
+    path.write_bytes(
+        b"D2FA\x03" + _FAST_KDF.pack() + salt + encrypt(key, b"\x01garbage")
+    )
+
+    with pytest.raises(CorruptedVault):
+        Vault.load(str(path), password="pw")
+
+
+@pytest.mark.parametrize("codec", ["zlib", "zstd"])
+def test_vault_compressed_payload_roundtrip(tmp_path: Path, codec: str) -> None:
+    """Compressed vaults are saved as version 4 and keep their codec."""
+    if codec == "zstd":
+        pytest.importorskip("zstandard")
+    path = tmp_path / "vault.bin"
+    vault = _payload_vault()
+    for i in range(200):
+        vault.add_entry(f"issuer{i}", "JBSWY3DPEHPK3PXP")
+    vault.save(str(path), password="pw")
+    plain_size = path.stat().st_size
+
+    vault.compression = codec
+    vault.save(str(path), password="pw")
+    raw = path.read_bytes()
+    assert raw[:5] == b"D2FA\x04"
+    assert len(raw) < plain_size
+
+    loaded = Vault.load(str(path), password="pw")
+    assert loaded.compression == codec
+    assert loaded.kdf_params == _FAST_KDF
+    assert loaded.data.model_dump() == vault.data.model_dump()
+
+    loaded.compression = "none"
+    loaded.save(str(path), password="pw")
+    assert path.read_bytes()[:5] == b"D2FA\x03"
+
+
+def test_vault_save_rejects_unknown_compression(tmp_path: Path) -> None:
+    vault = _payload_vault()
+    vault.compression = "lz4"
+    with pytest.raises(ValueError, match="Unknown compression codec"):
+        vault.save(str(tmp_path / "vault.bin"), password="pw")
+
+
+def test_vault_load_rejects_unknown_compression(tmp_path: Path) -> None:
+    from desktop_2fa.vault.vault import UnsupportedFormat
+
+    path = tmp_path / "vault.bin"
+    path.write_bytes(
+        b"D2FA\x04\x09" + _FAST_KDF.pack() + b"16byte_salt_here" + b"x" * 40
+    )
+
+    with pytest.raises(UnsupportedFormat, match="compression"):
+        Vault.load(str(path), password="pw")
+
+
+def test_vault_load_corrupted_compressed_payload(tmp_path: Path) -> None:
+    """A payload that decrypts but does not decompress is CorruptedVault."""
+    from desktop_2fa.crypto.aesgcm import encrypt
+    from desktop_2fa.crypto.argon2 import derive_key
+    from desktop_2fa.vault.vault import CorruptedVault
+
+    path = tmp_path / "vault.bin"
+    salt = b"16byte_salt_here"
+    key = derive_key("pw", salt, _FAST_KDF)
+    path.write_bytes(
+        b"D2FA\x04\x01" + _FAST_KDF.pack() + salt + encrypt(key, b"not zlib")
+    )
+
+    with pytest.raises(CorruptedVault):
+        Vault.load(str(path), password="pw")
+
+
+def _segmented_vault(path: Path, entries: int = 200) -> Vault:
+    vault = Vault()
+    vault.kdf_params = _FAST_KDF
+    vault.payload_format = "segmented"
+    for i in range(entries):
+        vault.add_entry(f"issuer{i}", "JBSWY3DPEHPK3PXP")
+    vault.save(str(path), password="pw")
+    return vault
+
+
+def test_segmented_vault_decrypts_one_page_per_lookup(tmp_path: Path) -> None:
+    path = tmp_path / "vault.bin"
+    vault = _segmented_vault(path)
+    assert vault._pages is not None and len(vault._pages.pages) == 4
+
+    loaded = Vault.load(str(path), password="pw")
+    assert loaded.payload_format == "segmented"
+    assert loaded.get_entry("issuer150").issuer == "issuer150"
+    assert loaded._lazy is not None and len(loaded._lazy._cache) == 1
+    with pytest.raises(ValueError, match="not found"):
+        loaded.get_entry("missing")
+
+    assert [e.issuer for e in loaded.entries] == [f"issuer{i}" for i in range(200)]
+    assert loaded._lazy is None
+
+
+def test_segmented_vault_rewrites_only_changed_pages(tmp_path: Path) -> None:
+    path = tmp_path / "vault.bin"
+    _segmented_vault(path)
+
+    vault = Vault.load(str(path), password="pw")
+    vault.rename_entry("issuer10", "renamed")
+    vault.save(str(path), password="pw")
+    assert vault._pages is not None and vault._pages.written == 1
+
+    vault = Vault.load(str(path), password="pw")
+    vault.add_entry("added", "JBSWY3DPEHPK3PXP")
+    vault.remove_entry("issuer100")
+    vault.save(str(path), password="pw")
+    assert vault._pages is not None and vault._pages.written == 2
+    assert vault._lazy is not None
+
+    loaded = Vault.load(str(path), password="pw")
+    issuers = [e.issuer for e in loaded.entries]
+    assert len(issuers) == 200
+    assert issuers[10] == "renamed" and issuers[-1] == "added"
+    assert "issuer100" not in issuers
+    with pytest.raises(ValueError, match="not found"):
+        loaded.remove_entry("issuer100")
+
+    # A new password re-encrypts every page.
+    loaded.save(str(path), password="new")
+    assert loaded._pages is not None and loaded._pages.written == 4
+    assert len(Vault.load(str(path), password="new").entries) == 200
+
+
+def test_segmented_vault_index_tracks_names_and_pages(tmp_path: Path) -> None:
+    path = tmp_path / "vault.bin"
+    _segmented_vault(path)
+
+    vault = Vault.load(str(path), password="pw")
+    vault.add_entry("issuer5", "GEZDGNBVGY3TQOJQ")
+    assert vault.get_entry("issuer5").secret == "JBSWY3DPEHPK3PXP"
+    vault.remove_entry("issuer5")
+    entry = vault.get_entry("issuer5")
+    assert entry.secret == "GEZDGNBVGY3TQOJQ"
+    assert vault.get_entry_by_id(entry.id) is entry
+
+    # Emptying the last page drops it on save; the next entry opens a new one.
+    vault.remove_entry("issuer5")
+    for i in range(192, 200):
+        vault.remove_entry(f"issuer{i}")
+    vault.save(str(path), password="pw")
+    assert vault._pages is not None and sorted(vault._pages.pages) == [0, 1, 2]
+    vault.add_entry("after", "JBSWY3DPEHPK3PXP")
+    vault.save(str(path), password="pw")
+    assert sorted(vault._pages.pages) == [0, 1, 2, 3]
+
+    loaded = Vault.load(str(path), password="pw")
+    issuers = [e.issuer for e in loaded.entries]
+    assert issuers == [f"issuer{i}" for i in range(192) if i != 5] + ["after"]
+
+
+def test_segmented_vault_detects_tampered_page(tmp_path: Path) -> None:
+    from desktop_2fa.vault.vault import CorruptedVault, InvalidPassword
+
+    path = tmp_path / "vault.bin"
+    _segmented_vault(path)
+    raw = bytearray(path.read_bytes())
+    raw[-1] ^= 0x01
+    path.write_bytes(bytes(raw))
+
+    loaded = Vault.load(str(path), password="pw")
+    assert loaded.get_entry("issuer0").issuer == "issuer0"
+    with pytest.raises(CorruptedVault):
+        loaded.get_entry("issuer199")
+    with pytest.raises(InvalidPassword):
+        Vault.load(str(path), password="wrong")
+
+
+def _journaled_vault(path: Path) -> Vault:
+    vault = _payload_vault()
+    vault.save(str(path), password="pw")
+    return Vault.load(str(path), password="pw")
+
+
+def test_save_changes_appends_to_journal(tmp_path: Path) -> None:
+    path = tmp_path / "vault.bin"
+    vault = _journaled_vault(path)
+    original = path.read_bytes()
+
+    vault.add_entry("Added", "JBSWY3DPEHPK3PXP")
+    vault.rename_entry("GitHub", "Renamed")
+    vault.remove_entry("Padded")
+    vault.save_changes(str(path), password="pw")
+    vault.add_entry("Later", "JBSWY3DPEHPK3PXP")
+    vault.save_changes(str(path), password="pw")
+
+    assert path.read_bytes() == original
+    assert (tmp_path / "vault.bin.journal").exists()
+    expected = [e.model_dump() for e in vault.entries]
+    loaded = Vault.load(str(path), password="pw")
+    assert [e.model_dump() for e in loaded.entries] == expected
+    assert [e.issuer for e in loaded.entries][-2:] == ["Added", "Later"]
+
+    loaded.save(str(path), password="pw")
+    assert not (tmp_path / "vault.bin.journal").exists()
+    reloaded = Vault.load(str(path), password="pw")
+    assert [e.model_dump() for e in reloaded.entries] == expected
+
+
+def test_save_changes_compacts_large_journal(tmp_path: Path, monkeypatch: Any) -> None:
+    from desktop_2fa.vault import journal
+
+    monkeypatch.setattr(journal, "COMPACT_BYTES", 200)
+    path = tmp_path / "vault.bin"
+    vault = _journaled_vault(path)
+    vault.add_entry("First", "JBSWY3DPEHPK3PXP")
+    vault.save_changes(str(path), password="pw")
+    assert (tmp_path / "vault.bin.journal").exists()
+
+    vault.add_entry("Second", "JBSWY3DPEHPK3PXP")
+    vault.save_changes(str(path), password="pw")
+    assert not (tmp_path / "vault.bin.journal").exists()
+    assert Vault.load(str(path), password="pw").get_entry("Second")
+
+
+def test_save_changes_falls_back_to_save(tmp_path: Path) -> None:
+    """Changes the journal cannot record rewrite the vault file."""
+    path = tmp_path / "vault.bin"
+    journal_file = tmp_path / "vault.bin.journal"
+
+    vault = _journaled_vault(path)
+    vault.compression = "zlib"
+    vault.add_entry("Added", "JBSWY3DPEHPK3PXP")
+    vault.save_changes(str(path), password="pw")
+    assert path.read_bytes()[:5] == b"D2FA\x04"
+    assert not journal_file.exists()
+
+    vault = Vault.load(str(path), password="pw")
+    vault.entries.pop()
+    vault.save_changes(str(path), password="pw")
+    assert not journal_file.exists()
+
+    vault = Vault.load(str(path), password="pw")
+    vault.remove_entry("GitHub")
+    vault.save_changes(str(path), password="new")
+    assert not journal_file.exists()
+    with pytest.raises(ValueError, match="not found"):
+        Vault.load(str(path), password="new").get_entry("GitHub")
+
+
+def test_journal_ignores_stale_and_torn_records(tmp_path: Path) -> None:
+    path = tmp_path / "vault.bin"
+    journal_file = tmp_path / "vault.bin.journal"
+    vault = _journaled_vault(path)
+    vault.add_entry("Added", "JBSWY3DPEHPK3PXP")
+    vault.save_changes(str(path), password="pw")
+    vault.add_entry("Torn", "JBSWY3DPEHPK3PXP")
+    vault.save_changes(str(path), password="pw")
+
+    # A crash while appending leaves a partial last record.
+    journal_file.write_bytes(journal_file.read_bytes()[:-5])
+    loaded = Vault.load(str(path), password="pw")
+    assert loaded.get_entry("Added")
+    with pytest.raises(ValueError, match="not found"):
+        loaded.get_entry("Torn")
+    loaded.add_entry("Next", "JBSWY3DPEHPK3PXP")
+    loaded.save_changes(str(path), password="pw")
+    assert Vault.load(str(path), password="pw").get_entry("Next")
+
+    # A compaction interrupted before the journal was removed.
+    stale = journal_file.read_bytes()
+    loaded.save(str(path), password="pw")
+    journal_file.write_bytes(stale)
+    issuers = [e.issuer for e in Vault.load(str(path), password="pw").entries]
+    assert issuers.count("Added") == 1 and issuers.count("Next") == 1
+
+
+def test_journal_sets_aside_tampered_record(tmp_path: Path) -> None:
+    from desktop_2fa.vault.vault import JournalWarning
+
+    path = tmp_path / "vault.bin"
+    journal_file = tmp_path / "vault.bin.journal"
+    vault = _journaled_vault(path)
+    vault.add_entry("Kept", "JBSWY3DPEHPK3PXP")
+    vault.save_changes(str(path), password="pw")
+    vault.add_entry("Tampered", "JBSWY3DPEHPK3PXP")
+    vault.save_changes(str(path), password="pw")
+
+    raw = bytearray(journal_file.read_bytes())
+    raw[-1] ^= 0x01
+    journal_file.write_bytes(bytes(raw))
+    with pytest.warns(JournalWarning, match="damaged record"):
+        loaded = Vault.load(str(path), password="pw")
+    assert loaded.get_entry("Kept")
+    with pytest.raises(ValueError, match="not found"):
+        loaded.get_entry("Tampered")
+    assert (tmp_path / "vault.bin.journal.corrupt").read_bytes() == bytes(raw)
+
+    # The damaged tail is gone, so the next load is clean.
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert Vault.load(str(path), password="pw").get_entry("Kept")
+
+
+def test_segmented_vault_replays_journal_lazily(tmp_path: Path) -> None:
+    path = tmp_path / "vault.bin"
+    _segmented_vault(path)
+
+    vault = Vault.load(str(path), password="pw")
+    vault.rename_entry("issuer5", "renamed")
+    vault.remove_entry("issuer6")
+    vault.save_changes(str(path), password="pw")
+
+    loaded = Vault.load(str(path), password="pw")
+    assert loaded._lazy is not None
+    assert loaded.get_entry("renamed").account_name == "renamed"
+    assert len(loaded._lazy) == 199